@@ -0,0 +1,208 @@
+# backend/analytics.py
+"""
+Rollup analytics reservasi di collection reservation_rollups.
+Satu dokumen per slot kunjungan (WIB), _id = slot key "YYYY-MM-DDTHH:MM":
+    {date, hour, weekday (1=Senin..7=Minggu), reservations, guests,
+     status: {pending: n, ...}, guests_by_status: {confirmed: g, ...}}
+Dokumen di-$inc setiap kali reservasi dibuat, berubah status, atau dihapus,
+jadi dashboard cukup membaca bucket dalam rentang tanggal (O(bucket), bukan
+O(reservasi)). rebuild_rollups() menghitung ulang semuanya dengan $merge.
+"""
+from fastapi import HTTPException
+from datetime import date, timedelta
+from pymongo import UpdateOne
+import logging
+
+from availability import parse_visit_time, WIB
+
+logger = logging.getLogger(__name__)
+
+ROLLUPS_COLLECTION = "reservation_rollups"
+RESERVATIONS_COLLECTION = "reservations"
+
+# Maksimal rentang tanggal untuk satu query stats
+MAX_STATS_DAYS = 366
+
+WEEKDAY_NAMES = ["Senin", "Selasa", "Rabu", "Kamis", "Jumat", "Sabtu", "Minggu"]
+
+
+def bucket_for(doc: dict) -> str | None:
+    """Slot key a reservation is counted under (legacy docs: visit hour)."""
+    if isinstance(doc.get("slot"), str):
+        return doc["slot"]
+    try:
+        visit = parse_visit_time(doc.get("date"))
+    except HTTPException:
+        return None
+    return f"{visit.date().isoformat()}T{visit.hour:02d}:00"
+
+
+def _contribution(doc: dict) -> dict:
+    guests = doc.get("guests", 0) or 0
+    status = doc.get("status") or "pending"
+    return {
+        "reservations": 1,
+        "guests": guests,
+        f"status.{status}": 1,
+        f"guests_by_status.{status}": guests,
+    }
+
+
+def _add(deltas: dict, doc: dict | None, sign: int):
+    if not doc:
+        return
+    bucket = bucket_for(doc)
+    if not bucket:
+        return
+    fields = deltas.setdefault(bucket, {})
+    for field, value in _contribution(doc).items():
+        fields[field] = fields.get(field, 0) + sign * value
+
+
+def _ops(changes: list) -> list:
+    deltas = {}
+    for before, after in changes:
+        _add(deltas, before, -1)
+        _add(deltas, after, +1)
+    ops = []
+    for bucket, fields in deltas.items():
+        fields = {field: value for field, value in fields.items() if value}
+        if not fields:
+            continue
+        day = date.fromisoformat(bucket[:10])
+        ops.append(UpdateOne(
+            {"_id": bucket},
+            {
+                "$inc": fields,
+                "$setOnInsert": {"date": bucket[:10], "hour": int(bucket[11:13]), "weekday": day.isoweekday()},
+            },
+            upsert=True,
+        ))
+    return ops
+
+
+async def track_reservation(db, before: dict | None, after: dict | None):
+    """Apply rollup deltas for a reservation change (insert: before=None, delete: after=None)."""
+    await track_reservations_bulk(db, [(before, after)])
+
+
+async def track_reservations_bulk(db, changes: list):
+    ops = _ops(changes)
+    if ops:
+        await db[ROLLUPS_COLLECTION].bulk_write(ops, ordered=False)
+
+
+# Visit time of a reservation inside an aggregation, same rules as parse_visit_time():
+# BSON date as is; ISO string (legacy, before migrate_reservation_dates.py) with
+# its own offset / Z, or naive = WIB; anything unparseable -> null (skipped)
+_STRING_HAS_OFFSET = {"$regexMatch": {"input": "$date", "regex": r"T.*(Z|[+-]\d{2}:?\d{2})$"}}
+_VISIT_TIME = {"$switch": {
+    "branches": [
+        {"case": {"$eq": [{"$type": "$date"}, "date"]}, "then": "$date"},
+        {"case": {"$ne": [{"$type": "$date"}, "string"]}, "then": None},
+        {"case": _STRING_HAS_OFFSET, "then": {"$dateFromString": {"dateString": "$date", "onError": None}}},
+    ],
+    "default": {"$dateFromString": {"dateString": "$date", "timezone": "+07:00", "onError": None}},
+}}
+
+
+async def rebuild_rollups(db) -> int:
+    """Recompute every bucket from the reservations collection with $merge.
+
+    Buckets follow bucket_for(): the slot key, else the visit hour in WIB, also
+    for legacy string dates. Not atomic with concurrent writes; run it when
+    traffic is quiet.
+    """
+    await db[ROLLUPS_COLLECTION].delete_many({})
+    pipeline = [
+        {"$match": {"$or": [{"slot": {"$type": "string"}}, {"date": {"$type": ["date", "string"]}}]}},
+        {"$project": {
+            "bucket": {"$cond": [
+                {"$eq": [{"$type": "$slot"}, "string"]},
+                "$slot",
+                {"$dateToString": {"format": "%Y-%m-%dT%H:00", "date": _VISIT_TIME, "timezone": "+07:00"}},
+            ]},
+            "status": {"$ifNull": ["$status", "pending"]},
+            "guests": {"$ifNull": ["$guests", 0]},
+        }},
+        {"$match": {"bucket": {"$type": "string"}}},
+        {"$group": {"_id": {"bucket": "$bucket", "status": "$status"}, "n": {"$sum": 1}, "guests": {"$sum": "$guests"}}},
+        {"$group": {
+            "_id": "$_id.bucket",
+            "reservations": {"$sum": "$n"},
+            "guests": {"$sum": "$guests"},
+            "status": {"$push": {"k": "$_id.status", "v": "$n"}},
+            "guests_by_status": {"$push": {"k": "$_id.status", "v": "$guests"}},
+        }},
+        {"$addFields": {
+            "date": {"$substrCP": ["$_id", 0, 10]},
+            "hour": {"$toInt": {"$substrCP": ["$_id", 11, 2]}},
+            "weekday": {"$isoDayOfWeek": {"$dateFromString": {"dateString": {"$substrCP": ["$_id", 0, 10]}}}},
+            "status": {"$arrayToObject": "$status"},
+            "guests_by_status": {"$arrayToObject": "$guests_by_status"},
+        }},
+        {"$merge": {"into": ROLLUPS_COLLECTION, "whenMatched": "replace", "whenNotMatched": "insert"}},
+    ]
+    await db[RESERVATIONS_COLLECTION].aggregate(pipeline).to_list(None)
+    buckets = await db[ROLLUPS_COLLECTION].estimated_document_count()
+    logger.info(f"📊 Reservation rollups rebuilt ({buckets} buckets)")
+    return buckets
+
+
+async def ensure_rollups(db):
+    """Build the rollups on first start (empty collection, existing reservations)."""
+    if await db[ROLLUPS_COLLECTION].estimated_document_count() == 0:
+        if await db[RESERVATIONS_COLLECTION].estimated_document_count() > 0:
+            await rebuild_rollups(db)
+
+
+def _rate(part: int, whole: int) -> float | None:
+    return round(part / whole, 4) if whole else None
+
+
+async def stats(db, start: date, end: date) -> dict:
+    """Dashboard numbers for visits between `start` and `end` (inclusive), from the rollups only."""
+    if end < start:
+        raise HTTPException(status_code=400, detail="Rentang tanggal tidak valid")
+    if (end - start).days >= MAX_STATS_DAYS:
+        raise HTTPException(status_code=400, detail=f"Maksimal {MAX_STATS_DAYS} hari per query")
+    upper = (end + timedelta(days=1)).isoformat()
+
+    per_day, per_slot, per_weekday, statuses = {}, {}, {}, {}
+    totals = {"reservations": 0, "guests": 0, "covers": 0}
+    async for bucket in db[ROLLUPS_COLLECTION].find({"_id": {"$gte": start.isoformat(), "$lt": upper}}):
+        # Covers = tamu dari reservasi yang dikonfirmasi
+        covers = (bucket.get("guests_by_status") or {}).get("confirmed", 0)
+        reservations, guests = bucket.get("reservations", 0), bucket.get("guests", 0)
+        totals["reservations"] += reservations
+        totals["guests"] += guests
+        totals["covers"] += covers
+        for status, count in (bucket.get("status") or {}).items():
+            statuses[status] = statuses.get(status, 0) + count
+
+        day = per_day.setdefault(bucket["date"], {"date": bucket["date"], "reservations": 0, "guests": 0, "covers": 0})
+        slot = per_slot.setdefault(bucket["_id"][11:], {"time": bucket["_id"][11:], "reservations": 0, "guests": 0, "covers": 0})
+        weekday = per_weekday.setdefault(bucket["weekday"], {
+            "weekday": bucket["weekday"], "name": WEEKDAY_NAMES[bucket["weekday"] - 1], "reservations": 0, "guests": 0, "covers": 0,
+        })
+        for row in (day, slot, weekday):
+            row["reservations"] += reservations
+            row["guests"] += guests
+            row["covers"] += covers
+
+    decided = statuses.get("confirmed", 0) + statuses.get("declined", 0)
+    return {
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "timezone": str(WIB),
+        "totals": totals,
+        "status": statuses,
+        "rates": {
+            "confirmation": _rate(statuses.get("confirmed", 0), decided),
+            "decline": _rate(statuses.get("declined", 0), decided),
+            "cancellation": _rate(statuses.get("cancelled", 0), totals["reservations"]),
+        },
+        "covers_per_day": sorted(per_day.values(), key=lambda row: row["date"]),
+        "guests_per_slot": sorted(per_slot.values(), key=lambda row: row["time"]),
+        "busiest_weekdays": sorted(per_weekday.values(), key=lambda row: row["covers"], reverse=True),
+    }
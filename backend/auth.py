@@ -3,21 +3,27 @@ from fastapi import APIRouter, HTTPException, Depends
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
 from jose import jwt, JWTError
 from datetime import datetime, timedelta
-from motor.motor_asyncio import AsyncIOMotorClient
 from passlib.context import CryptContext
 from pydantic import BaseModel, EmailStr
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import logging
 import os
 import random
 import string
+import time
 from dotenv import load_dotenv
 from fastapi import Request
 from email_service import send_otp_email
+from cache import TTLCache
+from pymongo import IndexModel
 
 # === Load environment variables ===
 load_dotenv()
 
 # === Setup Router ===
 router = APIRouter(prefix="/auth", tags=["Auth"])
+logger = logging.getLogger(__name__)
 
 # === JWT CONFIG ===
 SECRET_KEY = os.getenv("SECRET_KEY", "supersecretkey")
@@ -27,35 +33,147 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 60
 # === Password Hashing ===
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
-# === Setup MongoDB ===
-mongo_url = os.getenv("MONGO_URL", "mongodb://localhost:27017")
-client = AsyncIOMotorClient(mongo_url)
-db_name = os.getenv("DB_NAME", "loreomah")
-db = client[db_name]
-users_collection = db["users"]
+# bcrypt sengaja lambat (ratusan ms per hash), jadi hash/verify dijalankan di
+# thread pool terpisah agar event loop tetap melayani request lain.
+# bcrypt melepas GIL selama hashing, sehingga thread pool sudah cukup paralel.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+# Batas antrian: jika lebih banyak dari ini yang menunggu, request ditolak 503
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
+
+_password_executor = ThreadPoolExecutor(
+    max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt"
+)
+_password_pending = 0
+_password_rejected = 0
+
+
+async def _run_password_job(func, *args):
+    """Run a bcrypt job on the bounded pool, or 503 when the queue is full."""
+    global _password_pending, _password_rejected
+    # Counter hanya disentuh dari event loop, jadi tidak perlu lock
+    if _password_pending >= PASSWORD_HASH_MAX_PENDING:
+        _password_rejected += 1
+        raise HTTPException(
+            status_code=503,
+            detail="Server sedang sibuk, silakan coba lagi sebentar lagi",
+            headers={"Retry-After": "1"},
+        )
+    _password_pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_password_executor, func, *args)
+    finally:
+        _password_pending -= 1
+
+
+async def hash_password(password: str) -> str:
+    return await _run_password_job(pwd_context.hash, password)
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await _run_password_job(pwd_context.verify, plain_password, hashed_password)
+
+
+def password_pool_stats() -> dict:
+    return {
+        "workers": PASSWORD_HASH_WORKERS,
+        "max_pending": PASSWORD_HASH_MAX_PENDING,
+        "pending": _password_pending,
+        "rejected": _password_rejected,
+    }
+
+
+def shutdown_password_pool():
+    _password_executor.shutdown(wait=False, cancel_futures=True)
+
+# === MongoDB ===
+# Memakai client bersama dari database.py lewat app.state.db
+USERS_COLLECTION = "users"
+
+
+INDEXES = {
+    USERS_COLLECTION: [IndexModel("email", unique=True)],
+}
+
+
+def _users(request: Request):
+    return request.app.state.db[USERS_COLLECTION]
 
 # === OAuth2 Scheme ===
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 
-async def get_user_from_token(token: str = Depends(oauth2_scheme)):
+# === Auth Cache ===
+# Claims JWT yang sudah didecode (key: token) dan principal user yang ramping
+# (key: email, tanpa password/avatar/OTP) disimpan sementara supaya request
+# terautentikasi tidak selalu decode JWT + find_one ke MongoDB.
+# invalidate_user() hanya berlaku di worker ini; worker lain membaca ulang role
+# dari database paling lambat setelah AUTH_CLAIMS_TTL, jadi admin yang dicabut
+# (atau user yang dihapus) tidak lama memegang akses lama.
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "4096"))
+AUTH_CLAIMS_TTL = float(os.getenv("AUTH_CLAIMS_TTL", "5"))
+AUTH_PRINCIPAL_TTL = float(os.getenv("AUTH_PRINCIPAL_TTL", "60"))
+
+PRINCIPAL_PROJECTION = {"_id": 0, "password": 0, "avatar_url": 0, "otp_code": 0, "otp_expires_at": 0}
+
+_claims_cache = TTLCache(maxsize=AUTH_CACHE_SIZE, ttl=AUTH_CLAIMS_TTL)
+_principal_cache = TTLCache(maxsize=AUTH_CACHE_SIZE, ttl=AUTH_PRINCIPAL_TTL)
+
+
+async def _load_principal(request: Request, email: str):
+    principal = _principal_cache.get(email)
+    if principal is None:
+        principal = await _users(request).find_one({"email": email}, PRINCIPAL_PROJECTION)
+        if not principal:
+            raise HTTPException(status_code=404, detail="User not found")
+        _principal_cache.set(email, principal)
+    return principal
+
+
+def invalidate_user(email: str):
+    """Drop cached principal and claims for a user after their document changes."""
+    _principal_cache.pop(email)
+    _claims_cache.discard_where(lambda _token, claims: claims["sub"] == email)
+
+
+def auth_cache_stats() -> dict:
+    return {"claims": _claims_cache.stats(), "principals": _principal_cache.stats()}
+
+
+async def get_token_claims(request: Request, token: str = Depends(oauth2_scheme)):
+    claims = _claims_cache.get(token)
+    if claims is not None and claims["exp"] > time.time():
+        return claims
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if not email:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        user = await users_collection.find_one({"email": email}, {"password": 0, "_id": 0})
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-        return user
     except JWTError:
+        _claims_cache.pop(token)
         raise HTTPException(status_code=401, detail="Invalid or expired token")
+    email: str = payload.get("sub")
+    if not email:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    # Role diambil langsung dari database (bukan principal cache) setiap claims kedaluwarsa
+    _principal_cache.pop(email)
+    principal = await _load_principal(request, email)
+    claims = {"sub": email, "role": principal.get("role"), "exp": payload.get("exp", 0)}
+    _claims_cache.set(token, claims, ttl=claims["exp"] - time.time())
+    return claims
 
 
-async def require_admin(user: dict = Depends(get_user_from_token)):
-    if user.get("role") != "admin":
+async def get_user_from_token(request: Request, claims: dict = Depends(get_token_claims)):
+    return await _load_principal(request, claims["sub"])
+
+
+async def require_admin(claims: dict = Depends(get_token_claims)):
+    # Cukup dari claims yang sudah dicache, tanpa query ke database
+    if claims.get("role") != "admin":
         raise HTTPException(status_code=403, detail="Admin privileges required")
-    return user
+    return {"email": claims["sub"], "role": claims["role"]}
+
+
+@router.get("/cache-stats")
+async def get_auth_cache_stats(admin: dict = Depends(require_admin)):
+    return auth_cache_stats()
 
 # === Pydantic Models ===
 class RegisterRequest(BaseModel):
@@ -79,6 +197,17 @@ class TokenResponse(BaseModel):
 def generate_otp(length=6):
     return ''.join(random.choices(string.digits, k=length))
 
+
+def _queue_otp_email(email: str, otp_code: str, username: str):
+    # Tanpa email OTP user tidak bisa verifikasi; OTP sudah tersimpan, jadi cukup minta coba lagi
+    if not send_otp_email(email, otp_code, username):
+        logger.warning(f"⚠️ Email queue full, OTP email to {email} not sent")
+        raise HTTPException(
+            status_code=503,
+            detail="Email verifikasi belum bisa dikirim, silakan coba lagi sebentar lagi",
+            headers={"Retry-After": "5"},
+        )
+
 # === Helper: JWT Token Generator ===
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
     to_encode = data.copy()
@@ -89,12 +218,13 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
 
 # === REGISTER ADMIN ===
 @router.post("/admin/register")
-async def admin_register(payload: RegisterRequest):
+async def admin_register(request: Request, payload: RegisterRequest):
+    users_collection = _users(request)
     existing_user = await users_collection.find_one({"email": payload.email})
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    hashed_pw = pwd_context.hash(payload.password)
+    hashed_pw = await hash_password(payload.password)
     new_user = {
         "email": payload.email,
         "password": hashed_pw,
@@ -107,12 +237,13 @@ async def admin_register(payload: RegisterRequest):
 
 # === LOGIN ADMIN ===
 @router.post("/admin/login", response_model=TokenResponse)
-async def admin_login(form_data: OAuth2PasswordRequestForm = Depends()):
+async def admin_login(request: Request, form_data: OAuth2PasswordRequestForm = Depends()):
+    users_collection = _users(request)
     user = await users_collection.find_one({"email": form_data.username})
     if not user:
         logging.warning(f"Admin login failed: User not found - {form_data.username}")
         raise HTTPException(status_code=400, detail="Invalid credentials")
-    if not pwd_context.verify(form_data.password, user["password"]):
+    if not await verify_password(form_data.password, user["password"]):
         logging.warning(f"Admin login failed: Wrong password - {form_data.username}")
         raise HTTPException(status_code=400, detail="Invalid credentials")
     if user.get("role") != "admin":
@@ -136,7 +267,8 @@ async def admin_login(form_data: OAuth2PasswordRequestForm = Depends()):
 
 # === REGISTER USER ===
 @router.post("/user/register")
-async def user_register(payload: RegisterRequest):
+async def user_register(request: Request, payload: RegisterRequest):
+    users_collection = _users(request)
     existing_user = await users_collection.find_one({"email": payload.email})
     
     # If user exists and already verified, reject registration
@@ -149,7 +281,7 @@ async def user_register(payload: RegisterRequest):
     
     # If user exists but not verified, update their data and resend OTP
     if existing_user:
-        hashed_pw = pwd_context.hash(payload.password)
+        hashed_pw = await hash_password(payload.password)
         await users_collection.update_one(
             {"email": payload.email},
             {"$set": {
@@ -160,14 +292,15 @@ async def user_register(payload: RegisterRequest):
                 "updated_at": datetime.utcnow()
             }}
         )
-        send_otp_email(payload.email, otp_code, payload.email.split('@')[0])
+        invalidate_user(payload.email)
+        _queue_otp_email(payload.email, otp_code, payload.email.split('@')[0])
         return {
             "message": "✅ Kode OTP baru telah dikirim ke email Anda.",
             "email": payload.email
         }
     
     # Create new user if doesn't exist
-    hashed_pw = pwd_context.hash(payload.password)
+    hashed_pw = await hash_password(payload.password)
     new_user = {
         "email": payload.email,
         "password": hashed_pw,
@@ -182,7 +315,7 @@ async def user_register(payload: RegisterRequest):
     await users_collection.insert_one(new_user)
     
     # Send OTP via email
-    send_otp_email(payload.email, otp_code, payload.email.split('@')[0])
+    _queue_otp_email(payload.email, otp_code, payload.email.split('@')[0])
     
     return {
         "message": "✅ Pendaftaran berhasil! Silakan cek email Anda untuk kode verifikasi OTP.",
@@ -191,7 +324,8 @@ async def user_register(payload: RegisterRequest):
 
 # === VERIFY OTP ===
 @router.post("/verify-otp")
-async def verify_otp(payload: VerifyOTPRequest):
+async def verify_otp(request: Request, payload: VerifyOTPRequest):
+    users_collection = _users(request)
     user = await users_collection.find_one({"email": payload.email})
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -212,12 +346,14 @@ async def verify_otp(payload: VerifyOTPRequest):
         {"email": payload.email},
         {"$set": {"email_verified": True, "otp_code": "", "otp_expires_at": None}}
     )
+    invalidate_user(payload.email)
     
     return {"message": "✅ Email berhasil diverifikasi! Silakan login."}
 
 # === RESEND OTP ===
 @router.post("/resend-otp")
-async def resend_otp(payload: ResendOTPRequest):
+async def resend_otp(request: Request, payload: ResendOTPRequest):
+    users_collection = _users(request)
     user = await users_collection.find_one({"email": payload.email})
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -235,17 +371,18 @@ async def resend_otp(payload: ResendOTPRequest):
     )
     
     # Send new OTP via email
-    send_otp_email(payload.email, otp_code, user.get("email", "").split('@')[0])
+    _queue_otp_email(payload.email, otp_code, user.get("email", "").split('@')[0])
     
     return {"message": "✅ Kode OTP baru telah dikirim ke email Anda."}
 
 # === LOGIN USER ===
 @router.post("/user/login", response_model=TokenResponse)
-async def user_login(form_data: OAuth2PasswordRequestForm = Depends()):
+async def user_login(request: Request, form_data: OAuth2PasswordRequestForm = Depends()):
+    users_collection = _users(request)
     user = await users_collection.find_one({"email": form_data.username})
     if not user:
         raise HTTPException(status_code=400, detail="Invalid credentials")
-    if not pwd_context.verify(form_data.password, user["password"]):
+    if not await verify_password(form_data.password, user["password"]):
         raise HTTPException(status_code=400, detail="Invalid credentials")
     
     # Check if email is verified
@@ -269,11 +406,12 @@ async def user_login(form_data: OAuth2PasswordRequestForm = Depends()):
 
 # === UNIVERSAL LOGIN (tanpa pilih role di frontend) ===
 @router.post("/login", response_model=TokenResponse)
-async def universal_login(form_data: OAuth2PasswordRequestForm = Depends()):
+async def universal_login(request: Request, form_data: OAuth2PasswordRequestForm = Depends()):
+    users_collection = _users(request)
     user = await users_collection.find_one({"email": form_data.username})
     if not user:
         raise HTTPException(status_code=400, detail="Invalid credentials")
-    if not pwd_context.verify(form_data.password, user["password"]):
+    if not await verify_password(form_data.password, user["password"]):
         raise HTTPException(status_code=400, detail="Invalid credentials")
 
     access_token = create_access_token(
@@ -293,15 +431,5 @@ async def universal_login(form_data: OAuth2PasswordRequestForm = Depends()):
 
 # === GET CURRENT USER (/auth/me) ===
 @router.get("/me")
-async def get_current_user(token: str = Depends(oauth2_scheme)):
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if not email:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        user = await users_collection.find_one({"email": email})
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-        return {"email": user["email"], "role": user["role"]}
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid or expired token")
+async def get_current_user(claims: dict = Depends(get_token_claims)):
+    return {"email": claims["sub"], "role": claims["role"]}
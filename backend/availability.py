@@ -0,0 +1,245 @@
+# backend/availability.py
+"""
+Model kapasitas reservasi.
+Setiap slot waktu (default 60 menit, jam buka diambil dari site_settings.contact)
+punya kapasitas kursi. Kursi yang terpakai disimpan sebagai counter per slot di
+collection reservation_slots dan diubah secara atomic dengan $inc, sehingga:
+- cek ketersediaan satu bulan = satu query range atas _id slot
+- dua reservasi bersamaan tidak bisa sama-sama lolos saat slot hampir penuh
+"""
+from fastapi import HTTPException
+from datetime import datetime, date, timedelta, timezone
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+import logging
+import os
+import re
+
+logger = logging.getLogger(__name__)
+
+SLOTS_COLLECTION = "reservation_slots"
+SETTINGS_COLLECTION = "site_settings"
+
+RESERVATION_SEATS_PER_SLOT = int(os.getenv("RESERVATION_SEATS_PER_SLOT", "40"))
+RESERVATION_SLOT_MINUTES = int(os.getenv("RESERVATION_SLOT_MINUTES", "60"))
+# Maksimal rentang tanggal untuk satu query availability
+MAX_AVAILABILITY_DAYS = 62
+
+# Jam operasional kafe dihitung dalam WIB (UTC+7)
+WIB = timezone(timedelta(hours=7))
+
+# Status yang masih memakai kursi
+HOLDING_STATUSES = ("pending", "confirmed")
+
+DEFAULT_HOURS = {"weekdays": "09.00 - 19.00", "weekend": "09.00 - 20.00"}
+
+_HOURS_RE = re.compile(r"(\d{1,2})[.:](\d{2})\s*-\s*(\d{1,2})[.:](\d{2})")
+
+
+def parse_hours(text: str, fallback: str) -> tuple:
+    """'09.00 - 19.00' -> (540, 1140) in minutes since midnight."""
+    match = _HOURS_RE.search(text or "") or _HOURS_RE.search(fallback)
+    open_h, open_m, close_h, close_m = (int(g) for g in match.groups())
+    return open_h * 60 + open_m, close_h * 60 + close_m
+
+
+async def opening_hours(db) -> dict:
+    doc = await db[SETTINGS_COLLECTION].find_one({}, {"_id": 0, "contact": 1}) or {}
+    contact = doc.get("contact") or {}
+    return {
+        key: parse_hours(contact.get(key, ""), DEFAULT_HOURS[key])
+        for key in ("weekdays", "weekend")
+    }
+
+
+def _hours_for(day: date, hours: dict) -> tuple:
+    return hours["weekend"] if day.weekday() >= 5 else hours["weekdays"]
+
+
+def parse_visit_time(value) -> datetime:
+    """Reservation time in WIB local time.
+
+    Accepts the ISO string sent by clients (naive = WIB) or a datetime read
+    back from MongoDB (naive = UTC).
+    """
+    if isinstance(value, datetime):
+        visit = value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+        return visit.astimezone(WIB)
+    try:
+        visit = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except (AttributeError, ValueError):
+        raise HTTPException(status_code=400, detail="Format tanggal reservasi tidak valid")
+    if visit.tzinfo is None:
+        visit = visit.replace(tzinfo=WIB)
+    return visit.astimezone(WIB)
+
+
+def to_utc(value: datetime) -> datetime:
+    """Naive UTC datetime, the form BSON dates are stored and read back in."""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def slot_start(slot: str) -> datetime:
+    """Slot key (WIB wall clock) -> naive UTC start time."""
+    return to_utc(datetime.fromisoformat(slot).replace(tzinfo=WIB))
+
+
+def slot_key(day: date, minutes: int) -> str:
+    return f"{day.isoformat()}T{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def day_slots(day: date, hours: dict) -> list:
+    """Slot start times (minutes since midnight) that begin and end within opening hours."""
+    open_min, close_min = _hours_for(day, hours)
+    return list(range(open_min, close_min - RESERVATION_SLOT_MINUTES + 1, RESERVATION_SLOT_MINUTES))
+
+
+def slot_for(visit: datetime, hours: dict) -> str:
+    """Slot key for a visit time, or 400 if it falls outside opening hours."""
+    minutes = visit.hour * 60 + visit.minute
+    for start in day_slots(visit.date(), hours):
+        if start <= minutes < start + RESERVATION_SLOT_MINUTES:
+            return slot_key(visit.date(), start)
+    raise HTTPException(status_code=400, detail="Waktu reservasi di luar jam buka")
+
+
+async def reserve_seats(db, slot: str, guests: int):
+    """Atomically take `guests` seats in `slot`, or 409 when it would overbook."""
+    if guests > RESERVATION_SEATS_PER_SLOT:
+        raise HTTPException(status_code=409, detail="Jumlah tamu melebihi kapasitas slot")
+    # Filter hanya cocok jika sisa kursi cukup. Jika dokumen slot sudah ada tapi
+    # penuh, upsert mencoba insert _id yang sama dan gagal DuplicateKeyError.
+    # Dua upsert pertama yang bersamaan juga bisa bentrok, jadi dicoba sekali lagi.
+    for _ in range(2):
+        try:
+            await db[SLOTS_COLLECTION].update_one(
+                {"_id": slot, "booked": {"$lte": RESERVATION_SEATS_PER_SLOT - guests}},
+                {"$inc": {"booked": guests}, "$setOnInsert": {"date": slot[:10]}},
+                upsert=True,
+            )
+            return
+        except DuplicateKeyError:
+            continue
+    raise HTTPException(status_code=409, detail="Slot sudah penuh, silakan pilih waktu lain")
+
+
+async def release_seats(db, slot: str | None, guests: int):
+    if not slot or not guests:
+        return
+    await db[SLOTS_COLLECTION].update_one({"_id": slot}, {"$inc": {"booked": -guests}})
+
+
+async def release_seats_bulk(db, bookings: list):
+    """Give back seats for many (slot, guests) pairs in one bulk_write."""
+    per_slot = {}
+    for slot, guests in bookings:
+        if slot and guests:
+            per_slot[slot] = per_slot.get(slot, 0) + guests
+    ops = [UpdateOne({"_id": slot}, {"$inc": {"booked": -guests}}) for slot, guests in per_slot.items()]
+    if ops:
+        await db[SLOTS_COLLECTION].bulk_write(ops, ordered=False)
+
+
+async def availability(db, start: date, end: date) -> list:
+    """Remaining seats for every slot between `start` and `end` (inclusive)."""
+    if end < start:
+        raise HTTPException(status_code=400, detail="Rentang tanggal tidak valid")
+    if (end - start).days >= MAX_AVAILABILITY_DAYS:
+        raise HTTPException(status_code=400, detail=f"Maksimal {MAX_AVAILABILITY_DAYS} hari per query")
+    hours = await opening_hours(db)
+    upper = (end + timedelta(days=1)).isoformat()
+    booked = {
+        doc["_id"]: doc.get("booked", 0)
+        async for doc in db[SLOTS_COLLECTION].find({"_id": {"$gte": start.isoformat(), "$lt": upper}})
+    }
+    days = []
+    day = start
+    while day <= end:
+        slots = []
+        for minutes in day_slots(day, hours):
+            key = slot_key(day, minutes)
+            taken = booked.get(key, 0)
+            slots.append({
+                "time": key[11:],
+                "capacity": RESERVATION_SEATS_PER_SLOT,
+                "booked": taken,
+                "available": max(RESERVATION_SEATS_PER_SLOT - taken, 0),
+            })
+        days.append({"date": day.isoformat(), "slots": slots})
+        day += timedelta(days=1)
+    return days
+
+
+async def assign_legacy_slots(db, reservations_collection: str = "reservations") -> list:
+    """Give upcoming seat-holding reservations made before capacity tracking their slot key.
+
+    Returns (slot, guests) for each reservation assigned here. Visits in the
+    past, unparseable or outside opening hours are left without a slot.
+    """
+    hours = await opening_hours(db)
+    now = datetime.now(WIB)
+    assigned = []
+    legacy = {"status": {"$in": list(HOLDING_STATUSES)}, "slot": {"$exists": False}}
+    async for doc in db[reservations_collection].find(legacy, {"_id": 1, "date": 1, "guests": 1}):
+        try:
+            visit = parse_visit_time(doc.get("date"))
+            if visit < now:
+                continue
+            slot = slot_for(visit, hours)
+        except HTTPException:
+            continue
+        result = await db[reservations_collection].update_one(
+            {"_id": doc["_id"], "slot": {"$exists": False}},
+            {"$set": {"slot": slot, "slot_at": slot_start(slot)}},
+        )
+        if result.modified_count:
+            assigned.append((slot, doc.get("guests", 0) or 0))
+    return assigned
+
+
+async def rebuild_slot_counters(db, reservations_collection: str = "reservations") -> int:
+    """Recompute every slot counter from reservations that still hold seats.
+
+    Legacy reservations get their slot first (assign_legacy_slots). Not atomic
+    with concurrent bookings; run it when traffic is quiet.
+    """
+    await assign_legacy_slots(db, reservations_collection)
+    await db[SLOTS_COLLECTION].update_many({}, {"$set": {"booked": 0}})
+    pipeline = [
+        {"$match": {"status": {"$in": list(HOLDING_STATUSES)}, "slot": {"$type": "string"}}},
+        {"$group": {"_id": "$slot", "booked": {"$sum": "$guests"}}},
+        {"$addFields": {"date": {"$substrCP": ["$_id", 0, 10]}}},
+        {"$merge": {"into": SLOTS_COLLECTION, "whenMatched": "merge", "whenNotMatched": "insert"}},
+    ]
+    await db[reservations_collection].aggregate(pipeline).to_list(None)
+    return await db[SLOTS_COLLECTION].count_documents({"booked": {"$gt": 0}})
+
+
+async def ensure_slot_counters(db, reservations_collection: str = "reservations") -> int:
+    """Build the slot counters on first start, so existing reservations hold their seats.
+
+    Returns how many legacy reservations got a slot (their rollup bucket changes).
+    """
+    if await db[SLOTS_COLLECTION].estimated_document_count() == 0:
+        assigned = await assign_legacy_slots(db, reservations_collection)
+        holding = {"status": {"$in": list(HOLDING_STATUSES)}, "slot": {"$type": "string"}}
+        if await db[reservations_collection].count_documents(holding, limit=1):
+            slots = await rebuild_slot_counters(db, reservations_collection)
+            logger.info(f"🪑 Reservation slot counters built ({slots} slots in use)")
+        return len(assigned)
+    # Counters already exist: only add seats for reservations that just got a slot
+    assigned = await assign_legacy_slots(db, reservations_collection)
+    per_slot = {}
+    for slot, guests in assigned:
+        per_slot[slot] = per_slot.get(slot, 0) + guests
+    ops = [
+        UpdateOne({"_id": slot}, {"$inc": {"booked": guests}, "$setOnInsert": {"date": slot[:10]}}, upsert=True)
+        for slot, guests in per_slot.items() if guests
+    ]
+    if ops:
+        await db[SLOTS_COLLECTION].bulk_write(ops, ordered=False)
+    if assigned:
+        logger.info(f"🪑 {len(assigned)} legacy reservations now hold seats in their slot")
+    return len(assigned)
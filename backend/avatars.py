@@ -0,0 +1,88 @@
+# backend/avatars.py
+"""
+Penyimpanan avatar user sebagai file, bukan data URL di dokumen users.
+Gambar yang diupload di-decode sekali, dipotong persegi ke ukuran tetap
+(AVATAR_SIZE) dan disimpan sebagai WebP di backend/uploads/avatars/. Dokumen
+user hanya menyimpan URL pendek (/uploads/avatars/<id>.webp), jadi find_one ke
+users (login, list admin, profil) tidak lagi membawa megabyte base64.
+Nama file selalu baru per upload, sehingga URL-nya bisa di-cache browser.
+"""
+from pathlib import Path
+import asyncio
+import base64
+import binascii
+import io
+import logging
+import os
+import uuid
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+AVATAR_DIR = Path("backend/uploads/avatars")
+AVATAR_URL_PREFIX = "/uploads/avatars/"
+AVATAR_SIZE = int(os.getenv("AVATAR_SIZE", "256"))
+AVATAR_QUALITY = int(os.getenv("AVATAR_QUALITY", "85"))
+AVATAR_MAX_BYTES = int(os.getenv("AVATAR_MAX_BYTES", str(10 * 1024 * 1024)))
+
+# Tolak gambar dengan resolusi absurd sebelum di-decode penuh (decompression bomb)
+AVATAR_MAX_PIXELS = int(os.getenv("AVATAR_MAX_PIXELS", str(40_000_000)))
+
+
+def make_thumbnail(data: bytes) -> bytes:
+    """Square AVATAR_SIZE WebP thumbnail of an image; ValueError if it isn't one."""
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            if image.width * image.height > AVATAR_MAX_PIXELS:
+                raise ValueError("Image resolution is too large")
+            # Foto HP sering menyimpan orientasi di EXIF
+            image = ImageOps.exif_transpose(image)
+            image = ImageOps.fit(image.convert("RGB"), (AVATAR_SIZE, AVATAR_SIZE), Image.LANCZOS)
+            out = io.BytesIO()
+            image.save(out, "WEBP", quality=AVATAR_QUALITY, method=4)
+            return out.getvalue()
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as e:
+        raise ValueError(f"Invalid image: {e}") from e
+
+
+def _write(name: str, data: bytes):
+    AVATAR_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = AVATAR_DIR / f".{name}.tmp"
+    tmp.write_bytes(data)
+    # Rename atomik: request lain tidak pernah melihat file setengah jadi
+    os.replace(tmp, AVATAR_DIR / name)
+
+
+async def save_avatar(data: bytes) -> str:
+    """Store a thumbnail of `data` and return its URL (ValueError if not an image)."""
+    thumbnail = await asyncio.to_thread(make_thumbnail, data)
+    name = f"{uuid.uuid4().hex}.webp"
+    await asyncio.to_thread(_write, name, thumbnail)
+    return AVATAR_URL_PREFIX + name
+
+
+def delete_avatar(url: str | None):
+    """Remove a stored avatar file; ignores data URLs, external URLs and missing files."""
+    if not url or not url.startswith(AVATAR_URL_PREFIX):
+        return
+    name = Path(url[len(AVATAR_URL_PREFIX):]).name
+    try:
+        (AVATAR_DIR / name).unlink()
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"⚠️ Could not delete avatar {name}: {e}")
+
+
+def decode_data_url(url: str) -> bytes | None:
+    """Bytes of a base64 `data:` URL (legacy avatar format), or None if it isn't one."""
+    if not url or not url.startswith("data:"):
+        return None
+    header, _, payload = url.partition(",")
+    if ";base64" not in header:
+        return None
+    try:
+        return base64.b64decode(payload, validate=False)
+    except (binascii.Error, ValueError):
+        return None
@@ -0,0 +1,88 @@
+"""
+Benchmark fan-out EventHub dalam satu worker (tanpa MongoDB / HTTP).
+Membuat ribuan subscriber idle (seperti koneksi SSE yang menunggu), lalu
+mem-publish event reservasi dan mengukur waktu fan-out, latency sampai
+diterima konsumen, dan memori per subscriber.
+
+Jalankan:
+    python bench_events.py --subscribers 5000 --admins 20 --events 500
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+from events import EventHub
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def consumer(sub, latencies, stop):
+    while not stop.is_set():
+        _, event = await sub.queue.get()
+        latencies.append(time.perf_counter() - event["published_at"])
+
+
+async def main(args):
+    hub = EventHub()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+
+    stop = asyncio.Event()
+    latencies = []
+    tasks = []
+    user_count = args.subscribers - args.admins
+    for i in range(args.subscribers):
+        is_admin = i < args.admins
+        email = "admin@loreomah.com" if is_admin else f"user{i % max(user_count, 1)}@example.com"
+        sub, _, _ = hub.subscribe(email, is_admin)
+        tasks.append(asyncio.create_task(consumer(sub, latencies, stop)))
+    await asyncio.sleep(0)
+
+    after = tracemalloc.take_snapshot()
+    grown = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    print(f"👥 {args.subscribers} subscriber idle ({args.admins} admin): "
+          f"{grown / 1024 / 1024:.1f}MB, ~{grown / args.subscribers / 1024:.1f}KB/subscriber")
+
+    publish_times = []
+    for n in range(args.events):
+        event = {
+            "collection": "reservations",
+            "op": "update",
+            "id": f"r{n}",
+            "user_email": f"user{n % max(user_count, 1)}@example.com",
+            "doc": {"status": "confirmed"},
+            "published_at": time.perf_counter(),
+        }
+        started = time.perf_counter()
+        hub.publish(event)
+        publish_times.append(time.perf_counter() - started)
+        # Beri kesempatan konsumen berjalan, seperti event loop sungguhan
+        await asyncio.sleep(0)
+
+    await asyncio.sleep(0.1)
+    stop.set()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    print(f"📤 publish: n={len(publish_times)} "
+          f"p50={percentile(publish_times, 50) * 1e6:.0f}µs "
+          f"p99={percentile(publish_times, 99) * 1e6:.0f}µs")
+    print(f"📥 delivery: n={len(latencies)} "
+          f"p50={percentile(latencies, 50) * 1000:.2f}ms "
+          f"p99={percentile(latencies, 99) * 1000:.2f}ms")
+    print(f"📊 {hub.stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="EventHub fan-out benchmark")
+    parser.add_argument("--subscribers", type=int, default=5000)
+    parser.add_argument("--admins", type=int, default=20)
+    parser.add_argument("--events", type=int, default=500)
+    asyncio.run(main(parser.parse_args()))
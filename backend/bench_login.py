@@ -0,0 +1,102 @@
+"""
+Benchmark throughput login vs latency endpoint publik
+Mengirim banyak login sekaligus sambil mengukur p50/p99 latency GET publik
+(default /api/sliders/) yang tidak ada hubungannya dengan login.
+
+Jalankan (backend harus sudah running):
+    python bench_login.py --email admin@loreomah.com --password admin123
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def login_worker(client, args, deadline, results):
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        res = await client.post(
+            "/auth/login",
+            data={"username": args.email, "password": args.password},
+        )
+        results.append((res.status_code, time.perf_counter() - started))
+
+
+async def probe_worker(client, args, deadline, latencies):
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        await client.get(args.probe_path)
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(args.probe_interval)
+
+
+async def measure_probe(client, args, duration):
+    latencies = []
+    deadline = time.perf_counter() + duration
+    await probe_worker(client, args, deadline, latencies)
+    return latencies
+
+
+def report(title, latencies):
+    if not latencies:
+        print(f"{title}: tidak ada sampel")
+        return
+    print(
+        f"{title}: n={len(latencies)} "
+        f"p50={percentile(latencies, 50) * 1000:.1f}ms "
+        f"p99={percentile(latencies, 99) * 1000:.1f}ms "
+        f"max={max(latencies) * 1000:.1f}ms"
+    )
+
+
+async def main(args):
+    limits = httpx.Limits(max_connections=args.concurrency + 4)
+    async with httpx.AsyncClient(base_url=args.url, timeout=60.0, limits=limits) as client:
+        print(f"📏 Baseline {args.probe_path} selama {args.duration}s tanpa login...")
+        baseline = await measure_probe(client, args, args.duration)
+
+        print(f"🔐 {args.concurrency} login paralel selama {args.duration}s...")
+        deadline = time.perf_counter() + args.duration
+        logins = []
+        under_load = []
+        await asyncio.gather(
+            probe_worker(client, args, deadline, under_load),
+            *[login_worker(client, args, deadline, logins) for _ in range(args.concurrency)],
+        )
+
+    print()
+    report("GET publik (baseline)", baseline)
+    report("GET publik (saat login)", under_load)
+
+    ok = [elapsed for status, elapsed in logins if status == 200]
+    busy = sum(1 for status, _ in logins if status == 503)
+    failed = len(logins) - len(ok) - busy
+    print(
+        f"Login: total={len(logins)} ok={len(ok)} 503={busy} gagal={failed} "
+        f"throughput={len(ok) / args.duration:.1f}/s"
+    )
+    if ok:
+        report("Login latency", ok)
+        print(f"Login mean={statistics.mean(ok) * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Login throughput benchmark")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--probe-path", default="/api/sliders/")
+    parser.add_argument("--probe-interval", type=float, default=0.05)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,239 @@
+# backend/blob_store.py
+"""
+Penyimpanan gambar content-addressed untuk slider, gallery, kategori menu dan
+gambar cerita (settings). File disimpan sekali per isi (SHA-256):
+
+    backend/uploads/blobs/ab/<sha256>.<ext>   ->  /uploads/blobs/ab/<sha256>.<ext>
+
+Upload ulang foto yang sama tidak menambah salinan, hanya menambah referensi.
+Collection blobs mencatat jumlah referensi (refs) per blob; dokumen pemilik
+menambah referensi lewat put()/retain() dan melepasnya lewat release() saat
+gambar diganti atau dokumennya dihapus. Blob dengan refs 0 baru dihapus oleh
+job collect_garbage setelah BLOB_GC_GRACE_SECONDS.
+
+GC menandai blob dulu (deleting), menghapus file, baru menghapus dokumennya.
+put()/retain() tidak pernah menambah referensi pada blob yang sedang dihapus:
+put() menunggu GC selesai lalu menyimpan ulang file-nya, jadi upload ulang
+yang bersamaan dengan GC tidak berakhir dengan referensi ke file yang hilang.
+
+Karena isi URL tidak pernah berubah, /uploads/blobs disajikan dengan
+Cache-Control immutable (lihat ImmutableStaticFiles).
+"""
+from datetime import datetime, timedelta
+from fastapi import HTTPException, UploadFile
+from fastapi.staticfiles import StaticFiles
+from pathlib import Path
+from pymongo import IndexModel, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+import asyncio
+import logging
+import os
+import re
+import time
+
+import images
+import upload_service
+from scheduler import SCHEDULER_JOB_BUDGET_SECONDS
+
+logger = logging.getLogger(__name__)
+
+COLLECTION_NAME = "blobs"
+BLOB_DIR = Path("backend/uploads/blobs")
+BLOB_DIR.mkdir(parents=True, exist_ok=True)
+BLOB_URL_PREFIX = "/uploads/blobs/"
+BLOB_GC_GRACE_SECONDS = float(os.getenv("BLOB_GC_GRACE_SECONDS", "3600"))
+BLOB_GC_BATCH = int(os.getenv("BLOB_GC_BATCH", "200"))
+# put() menunggu blob yang sedang dihapus GC maksimal selama ini
+BLOB_PUT_WAIT_SECONDS = 5.0
+BLOB_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+INDEXES = {
+    COLLECTION_NAME: [
+        # Hanya blob tanpa referensi yang perlu dicari oleh garbage collector
+        IndexModel([("updated_at", 1)], name="gc_candidates", partialFilterExpression={"refs": {"$lte": 0}}),
+    ],
+}
+
+# Field gambar di dokumen pemilik (sliders, gallery, menu_categories)
+NO_IMAGE = {"image_url": None, "image_sha256": None, "image_variants": None}
+IMAGE_PROJECTION = {"_id": 0, "image_url": 1, "image_variants": 1}
+
+_BLOB_URL = re.compile(r"^/uploads/blobs/[0-9a-f]{2}/([0-9a-f]{64})\.[a-z0-9]+$")
+
+_stats = {"stored": 0, "deduplicated": 0, "released": 0, "collected": 0}
+
+
+def blob_id(url: str | None) -> str | None:
+    """SHA-256 of a blob URL, or None for anything else (legacy uploads, external URLs)."""
+    match = _BLOB_URL.match(url or "")
+    return match.group(1) if match else None
+
+
+def _url(sha256: str, extension: str) -> str:
+    return f"{BLOB_URL_PREFIX}{sha256[:2]}/{sha256}.{extension}"
+
+
+async def put(db, upload: UploadFile) -> dict:
+    """Store an uploaded image (once per content) and take one reference for the caller.
+
+    Returns the fields to $set on the owning document: image_url,
+    image_sha256 and image_variants.
+    """
+    return await _put_received(db, await upload_service.receive_image(upload, BLOB_DIR))
+
+
+async def put_file(db, source: Path) -> dict:
+    """put() for an image file already on disk (legacy upload migration)."""
+    return await _put_received(db, await upload_service.receive_file(source, BLOB_DIR))
+
+
+async def _take_reference(db, received: dict, url: str) -> dict:
+    """Increment (or create) the blob document; waits while GC is deleting the same blob."""
+    deadline = time.monotonic() + BLOB_PUT_WAIT_SECONDS
+    while True:
+        now = datetime.utcnow()
+        try:
+            return await db[COLLECTION_NAME].find_one_and_update(
+                # Blob bertanda deleting tidak cocok -> upsert bentrok dengan _id yang sama
+                {"_id": received["sha256"], "deleting": {"$exists": False}},
+                {
+                    "$inc": {"refs": 1},
+                    "$set": {"updated_at": now},
+                    "$setOnInsert": {
+                        "url": url,
+                        "size": received["size"],
+                        "content_type": received["content_type"],
+                        "created_at": now,
+                    },
+                },
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            if time.monotonic() > deadline:
+                raise HTTPException(
+                    status_code=503,
+                    detail="Gambar sedang diproses, silakan coba lagi",
+                    headers={"Retry-After": "2"},
+                )
+            await asyncio.sleep(0.1)
+
+
+async def _put_received(db, received: dict) -> dict:
+    sha256 = received["sha256"]
+    url = _url(sha256, received["extension"])
+    try:
+        # Referensi dicatat sebelum file dipindah; blob yang sedang dihapus GC ditunggu dulu
+        doc = await _take_reference(db, received, url)
+    except BaseException:
+        received["tmp"].unlink(missing_ok=True)
+        raise
+    # refs == 1: dokumen baru (atau blob tanpa pemakai); file lama di disk, kalau ada, tidak dipercaya
+    created = await asyncio.to_thread(
+        upload_service.place, received["tmp"], images.path_for(url), doc["refs"] == 1
+    )
+    _stats["stored" if created else "deduplicated"] += 1
+
+    variants = doc.get("variants")
+    if created or not variants:
+        try:
+            variants = await images.build_variants(url)
+        except ValueError:
+            # Lolos magic bytes tapi tidak bisa di-decode: lepas lagi, GC yang membersihkan
+            await release(db, url)
+            raise HTTPException(status_code=400, detail="File harus berupa gambar")
+        except BaseException:
+            await release(db, url)
+            raise
+        await db[COLLECTION_NAME].update_one({"_id": sha256}, {"$set": {"variants": variants}})
+    return {"image_url": url, "image_sha256": sha256, "image_variants": variants}
+
+
+async def retain(db, url: str | None) -> bool:
+    """Take another reference on an existing blob URL (e.g. a story image set by URL)."""
+    sha256 = blob_id(url)
+    if not sha256:
+        return False
+    result = await db[COLLECTION_NAME].update_one(
+        {"_id": sha256, "deleting": {"$exists": False}},
+        {"$inc": {"refs": 1}, "$set": {"updated_at": datetime.utcnow()}},
+    )
+    return result.matched_count == 1
+
+
+async def release(db, url: str | None, variants: dict | None = None):
+    """Drop a reference taken by put()/retain().
+
+    Legacy per-upload files (/uploads/<folder>/<uuid>_name) are not shared, so
+    they and their derivatives are deleted right away.
+    """
+    if not url:
+        return
+    sha256 = blob_id(url)
+    if sha256:
+        await db[COLLECTION_NAME].update_one(
+            {"_id": sha256}, {"$inc": {"refs": -1}, "$set": {"updated_at": datetime.utcnow()}}
+        )
+        _stats["released"] += 1
+    elif url.startswith("/uploads/"):
+        await asyncio.to_thread(images.path_for(url).unlink, missing_ok=True)
+        images.delete_variants(variants)
+
+
+def _remove_files(doc: dict):
+    images.path_for(doc["url"]).unlink(missing_ok=True)
+    images.delete_variants(doc.get("variants"))
+
+
+def _sweep_partials(cutoff: float) -> int:
+    # Sisa upload yang terputus sebelum sempat dipindah (proses mati di tengah jalan)
+    removed = 0
+    for tmp in BLOB_DIR.glob(".*.part"):
+        try:
+            if tmp.stat().st_mtime < cutoff:
+                tmp.unlink()
+                removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+async def collect_garbage(db) -> int:
+    """Delete blobs that have had no references for BLOB_GC_GRACE_SECONDS (scheduler job)."""
+    cutoff = datetime.utcnow() - timedelta(seconds=BLOB_GC_GRACE_SECONDS)
+    query = {"refs": {"$lte": 0}, "updated_at": {"$lt": cutoff}}
+    removed = 0
+    deadline = time.monotonic() + SCHEDULER_JOB_BUDGET_SECONDS / 2
+    async for candidate in db[COLLECTION_NAME].find(query, {"_id": 1}).limit(BLOB_GC_BATCH):
+        if time.monotonic() > deadline:
+            # Sisanya di run berikutnya, jangan sampai dibatalkan scheduler
+            break
+        # Tandai dulu (dicek ulang atomik): sejak tanda ini put()/retain() tidak bisa menambah
+        # referensi, jadi file aman dihapus. Tanda dari run yang terputus diteruskan di sini.
+        doc = await db[COLLECTION_NAME].find_one_and_update(
+            {"_id": candidate["_id"], **query}, {"$set": {"deleting": True}}
+        )
+        if doc:
+            await asyncio.to_thread(_remove_files, doc)
+            await db[COLLECTION_NAME].delete_one({"_id": doc["_id"], "deleting": True})
+            removed += 1
+    if BLOB_DIR.exists():
+        await asyncio.to_thread(_sweep_partials, time.time() - BLOB_GC_GRACE_SECONDS)
+    _stats["collected"] += removed
+    if removed:
+        logger.info(f"🧹 Removed {removed} unreferenced blobs")
+    return removed
+
+
+def stats() -> dict:
+    return dict(_stats)
+
+
+class ImmutableStaticFiles(StaticFiles):
+    """StaticFiles for content-addressed URLs: browsers and CDNs may cache them forever."""
+
+    async def get_response(self, path: str, scope):
+        response = await super().get_response(path, scope)
+        if response.status_code in (200, 304):
+            response.headers["Cache-Control"] = BLOB_CACHE_CONTROL
+        return response
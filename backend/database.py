@@ -0,0 +1,173 @@
+# backend/database.py
+"""
+Satu-satunya tempat MongoDB client dibuat.
+Server memakai client bersama lewat get_db() / app.state.db, sedangkan script
+ad-hoc memakai create_client() supaya konfigurasi pool-nya sama.
+"""
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+from dotenv import load_dotenv
+from pathlib import Path
+import os
+import threading
+import time
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / ".env")
+
+MONGO_URL = os.getenv("MONGO_URL")
+DB_NAME = os.getenv("DB_NAME")
+
+# === Pool & connection tuning ===
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+# Kompresor yang library-nya tidak terpasang akan di-skip oleh pymongo (dengan warning)
+MONGO_COMPRESSORS = os.getenv("MONGO_COMPRESSORS", "zstd,snappy,zlib")
+MONGO_READ_PREFERENCE = os.getenv("MONGO_READ_PREFERENCE", "primary")
+MONGO_CONNECT_TIMEOUT_MS = os.getenv("MONGO_CONNECT_TIMEOUT_MS", "10000")
+MONGO_SERVER_SELECTION_TIMEOUT_MS = os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "10000")
+MONGO_SOCKET_TIMEOUT_MS = os.getenv("MONGO_SOCKET_TIMEOUT_MS", "")
+MONGO_WAIT_QUEUE_TIMEOUT_MS = os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "")
+MONGO_MAX_IDLE_TIME_MS = os.getenv("MONGO_MAX_IDLE_TIME_MS", "")
+
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """Collects connection pool counters from pymongo's CMAP events."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Checkout dimulai & selesai di thread yang sama (thread pool Motor)
+        self._local = threading.local()
+        self.pools = 0
+        self.connections_open = 0
+        self.checked_out = 0
+        self.checkouts = 0
+        self.checkout_failures = {}
+        self.wait_total_ms = 0.0
+        self.wait_max_ms = 0.0
+
+    def _checkout_finished(self):
+        started = getattr(self._local, "started", None)
+        self._local.started = None
+        if started is None:
+            return 0.0
+        return (time.perf_counter() - started) * 1000
+
+    def pool_created(self, event):
+        with self._lock:
+            self.pools += 1
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        with self._lock:
+            self.pools -= 1
+
+    def connection_created(self, event):
+        with self._lock:
+            self.connections_open += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.connections_open -= 1
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_check_out_failed(self, event):
+        self._checkout_finished()
+        with self._lock:
+            reason = str(event.reason)
+            self.checkout_failures[reason] = self.checkout_failures.get(reason, 0) + 1
+
+    def connection_checked_out(self, event):
+        waited = self._checkout_finished()
+        with self._lock:
+            self.checked_out += 1
+            self.checkouts += 1
+            self.wait_total_ms += waited
+            self.wait_max_ms = max(self.wait_max_ms, waited)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out -= 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "max_pool_size": MONGO_MAX_POOL_SIZE,
+                "min_pool_size": MONGO_MIN_POOL_SIZE,
+                "pools": self.pools,
+                "connections_open": self.connections_open,
+                "checked_out": self.checked_out,
+                "checkouts": self.checkouts,
+                "checkout_failures": dict(self.checkout_failures),
+                "wait_queue_avg_ms": round(self.wait_total_ms / self.checkouts, 3) if self.checkouts else 0.0,
+                "wait_queue_max_ms": round(self.wait_max_ms, 3),
+            }
+
+
+pool_stats = PoolStatsListener()
+
+_client = None
+
+
+def _client_options() -> dict:
+    options = {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "compressors": MONGO_COMPRESSORS,
+        "readPreference": MONGO_READ_PREFERENCE,
+        "event_listeners": [pool_stats],
+    }
+    timeouts = {
+        "connectTimeoutMS": MONGO_CONNECT_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "socketTimeoutMS": MONGO_SOCKET_TIMEOUT_MS,
+        "waitQueueTimeoutMS": MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        "maxIdleTimeMS": MONGO_MAX_IDLE_TIME_MS,
+    }
+    for key, value in timeouts.items():
+        if value:
+            options[key] = int(value)
+    return options
+
+
+def create_client(mongo_url: str | None = None) -> AsyncIOMotorClient:
+    """Build a new client with the app's pool settings (for standalone scripts)."""
+    mongo_url = mongo_url or MONGO_URL
+    if not mongo_url:
+        raise ValueError("⚠️ MONGO_URL harus diset di file .env")
+    return AsyncIOMotorClient(mongo_url, **_client_options())
+
+
+def get_client() -> AsyncIOMotorClient:
+    """Return the process-wide shared client, creating it on first use."""
+    global _client
+    if _client is None:
+        _client = create_client()
+    return _client
+
+
+def get_db():
+    if not DB_NAME:
+        raise ValueError("⚠️ DB_NAME harus diset di file .env")
+    return get_client()[DB_NAME]
+
+
+def close_client():
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
+
+
+def pool_statistics() -> dict:
+    return pool_stats.snapshot()
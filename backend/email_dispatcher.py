@@ -0,0 +1,189 @@
+# backend/email_dispatcher.py
+"""
+Pengiriman email asynchronous.
+Handler cukup memanggil dispatcher.enqueue(msg) lalu langsung return; worker
+di background mengirim lewat sesi SMTP yang tetap terbuka (satu per worker),
+dengan retry + backoff bila gagal.
+
+Diuji otomatis terhadap sink SMTP lokal (aiosmtpd): tests/test_email_dispatcher.py.
+Untuk mencoba manual tanpa Gmail, jalankan sink lalu set env berikut:
+    python -m aiosmtpd -n -l localhost:8025
+    SMTP_HOST=localhost SMTP_PORT=8025 SMTP_STARTTLS=false SMTP_USE_AUTH=false
+"""
+import asyncio
+import logging
+import os
+import smtplib
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+SMTP_USER = os.getenv("SMTP_USER", "")
+SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "")
+FROM_EMAIL = os.getenv("FROM_EMAIL", SMTP_USER)
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "true").lower() == "true"
+SMTP_USE_AUTH = os.getenv("SMTP_USE_AUTH", "true").lower() == "true"
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "30"))
+# Server SMTP biasanya memutus koneksi idle; sesi yang lebih lama dari ini dibuka ulang
+SMTP_IDLE_TIMEOUT = float(os.getenv("SMTP_IDLE_TIMEOUT", "60"))
+
+EMAIL_WORKERS = int(os.getenv("EMAIL_WORKERS", "2"))
+EMAIL_QUEUE_SIZE = int(os.getenv("EMAIL_QUEUE_SIZE", "1000"))
+EMAIL_MAX_RETRIES = int(os.getenv("EMAIL_MAX_RETRIES", "3"))
+EMAIL_RETRY_BACKOFF = float(os.getenv("EMAIL_RETRY_BACKOFF", "2"))
+
+
+def smtp_configured() -> bool:
+    return not SMTP_USE_AUTH or bool(SMTP_USER and SMTP_PASSWORD)
+
+
+class SMTPSession:
+    """One authenticated SMTP connection, reopened when idle or dropped."""
+
+    def __init__(self):
+        self._smtp = None
+        self._last_used = 0.0
+
+    def _connect(self):
+        smtp = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT)
+        if SMTP_STARTTLS:
+            smtp.starttls()
+        if SMTP_USE_AUTH:
+            smtp.login(SMTP_USER, SMTP_PASSWORD)
+        self._smtp = smtp
+
+    def send(self, msg):
+        if self._smtp is not None and time.monotonic() - self._last_used > SMTP_IDLE_TIMEOUT:
+            self.close()
+        if self._smtp is None:
+            self._connect()
+        try:
+            self._smtp.send_message(msg)
+        except (smtplib.SMTPServerDisconnected, ConnectionError):
+            # Koneksi lama sudah diputus server: buka ulang sekali lalu kirim lagi
+            self.close()
+            self._connect()
+            self._smtp.send_message(msg)
+        self._last_used = time.monotonic()
+
+    def close(self):
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except Exception:
+            pass
+        self._smtp = None
+
+
+class EmailDispatcher:
+    def __init__(self, workers: int = EMAIL_WORKERS, queue_size: int = EMAIL_QUEUE_SIZE):
+        self.workers = workers
+        self.queue_size = queue_size
+        self._queue = None
+        self._tasks = []
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+        self.dropped = 0
+        self._send_total = 0.0
+        self._send_max = 0.0
+        self._wait_total = 0.0
+        self._dequeued = 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def start(self):
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        logger.info(f"📨 Email dispatcher started with {self.workers} workers")
+
+    async def stop(self, timeout: float = 10.0):
+        """Give queued emails `timeout` seconds to drain, then stop the workers."""
+        if not self.running:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"⚠️ Email dispatcher stopped with {self._queue.qsize()} emails unsent")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def enqueue(self, msg, on_failure: str = "") -> bool:
+        """Queue `msg` for delivery without blocking; `on_failure` is logged if it never sends."""
+        if not self.running:
+            self.start()
+        try:
+            self._queue.put_nowait((msg, on_failure, time.monotonic()))
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.error(f"❌ Email queue full, dropping email to {msg['To']}")
+            if on_failure:
+                logger.error(on_failure)
+            return False
+
+    async def _worker(self):
+        session = SMTPSession()
+        try:
+            while True:
+                msg, on_failure, queued_at = await self._queue.get()
+                self._wait_total += time.monotonic() - queued_at
+                self._dequeued += 1
+                try:
+                    await self._deliver(session, msg, on_failure)
+                finally:
+                    self._queue.task_done()
+        finally:
+            await asyncio.to_thread(session.close)
+
+    async def _deliver(self, session, msg, on_failure):
+        for attempt in range(EMAIL_MAX_RETRIES + 1):
+            started = time.monotonic()
+            try:
+                await asyncio.to_thread(session.send, msg)
+            except Exception as e:
+                await asyncio.to_thread(session.close)
+                if attempt == EMAIL_MAX_RETRIES:
+                    self.failed += 1
+                    logger.error(f"❌ Failed to send email to {msg['To']}: {e}")
+                    if on_failure:
+                        logger.error(on_failure)
+                    return
+                self.retries += 1
+                await asyncio.sleep(EMAIL_RETRY_BACKOFF * (2 ** attempt))
+                continue
+            elapsed = time.monotonic() - started
+            self.sent += 1
+            self._send_total += elapsed
+            self._send_max = max(self._send_max, elapsed)
+            logger.info(f"✅ Email sent to {msg['To']} in {elapsed * 1000:.0f}ms")
+            return
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "queue_size": self.queue_size,
+            "sent": self.sent,
+            "failed": self.failed,
+            "retries": self.retries,
+            "dropped": self.dropped,
+            "send_avg_ms": round(self._send_total / self.sent * 1000, 1) if self.sent else 0.0,
+            "send_max_ms": round(self._send_max * 1000, 1),
+            "queue_wait_avg_ms": round(self._wait_total / self._dequeued * 1000, 1) if self._dequeued else 0.0,
+        }
+
+
+dispatcher = EmailDispatcher()
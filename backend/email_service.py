@@ -1,22 +1,25 @@
 # backend/email_service.py
-import smtplib
-import os
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from dotenv import load_dotenv
+from email_dispatcher import dispatcher, smtp_configured, FROM_EMAIL
+import logging
 
-load_dotenv()
+logger = logging.getLogger(__name__)
+
+
+def _build_message(to_email: str, subject: str, html_content: str):
+    msg = MIMEMultipart('alternative')
+    msg['Subject'] = subject
+    msg['From'] = FROM_EMAIL
+    msg['To'] = to_email
+    msg.attach(MIMEText(html_content, 'html'))
+    return msg
 
-SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
-SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
-SMTP_USER = os.getenv("SMTP_USER", "")
-SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "")
-FROM_EMAIL = os.getenv("FROM_EMAIL", SMTP_USER)
 
 def send_otp_email(to_email: str, otp_code: str, username: str = ""):
-    """Send OTP verification email to user"""
+    """Queue OTP verification email to user (returns immediately)"""
     
-    if not SMTP_USER or not SMTP_PASSWORD:
+    if not smtp_configured():
         print("⚠️ SMTP credentials not configured. OTP email not sent.")
         print(f"📧 OTP Code for {to_email}: {otp_code}")
         return True
@@ -65,32 +68,14 @@ def send_otp_email(to_email: str, otp_code: str, username: str = ""):
     </html>
     """
     
-    try:
-        msg = MIMEMultipart('alternative')
-        msg['Subject'] = subject
-        msg['From'] = FROM_EMAIL
-        msg['To'] = to_email
-        
-        html_part = MIMEText(html_content, 'html')
-        msg.attach(html_part)
-        
-        with smtplib.SMTP(SMTP_HOST, SMTP_PORT) as server:
-            server.starttls()
-            server.login(SMTP_USER, SMTP_PASSWORD)
-            server.send_message(msg)
-        
-        print(f"✅ OTP email sent to {to_email}")
-        return True
-    except Exception as e:
-        print(f"❌ Failed to send OTP email: {str(e)}")
-        print(f"📧 OTP Code for {to_email}: {otp_code}")
-        return False
+    msg = _build_message(to_email, subject, html_content)
+    return dispatcher.enqueue(msg, on_failure=f"📧 OTP Code for {to_email}: {otp_code}")
 
 
 def send_reservation_confirmation_email(to_email: str, reservation_data: dict):
-    """Send reservation confirmation email to user"""
+    """Queue reservation confirmation email to user (returns immediately)"""
     
-    if not SMTP_USER or not SMTP_PASSWORD:
+    if not smtp_configured():
         print("⚠️ SMTP credentials not configured. Confirmation email not sent.")
         print(f"📧 Reservation confirmed for {to_email}")
         return True
@@ -220,23 +205,74 @@ Terima kasih!"""
     </html>
     """
     
+    msg = _build_message(to_email, subject, html_content)
+    return dispatcher.enqueue(msg, on_failure=f"📧 Reservation confirmed for {to_email}")
+
+
+def _format_visit(reservation_data: dict):
+    """(tanggal, jam) kunjungan dalam WIB dari string ISO UTC reservasi"""
+    from datetime import datetime, timezone, timedelta
+
     try:
-        msg = MIMEMultipart('alternative')
-        msg['Subject'] = subject
-        msg['From'] = FROM_EMAIL
-        msg['To'] = to_email
-        
-        html_part = MIMEText(html_content, 'html')
-        msg.attach(html_part)
-        
-        with smtplib.SMTP(SMTP_HOST, SMTP_PORT) as server:
-            server.starttls()
-            server.login(SMTP_USER, SMTP_PASSWORD)
-            server.send_message(msg)
-        
-        print(f"✅ Reservation confirmation email sent to {to_email}")
+        date_obj = datetime.fromisoformat(reservation_data.get('date', '').replace('Z', '+00:00'))
+        date_wib = date_obj.astimezone(timezone(timedelta(hours=7)))
+        return date_wib.strftime("%d %B %Y"), date_wib.strftime("%H:%M")
+    except (AttributeError, ValueError):
+        return reservation_data.get('date', '-'), ""
+
+
+def send_reservation_reminder_email(to_email: str, reservation_data: dict):
+    """Queue day-before reminder email (returns False if the email queue is full)"""
+    
+    if not smtp_configured():
+        # Job reminder berjalan di scheduler, jadi lewat logging (bukan stdout)
+        logger.warning(f"⚠️ SMTP credentials not configured. Reservation reminder for {to_email} not sent.")
         return True
-    except Exception as e:
-        print(f"❌ Failed to send confirmation email: {str(e)}")
-        print(f"📧 Reservation confirmed for {to_email}")
-        return False
+    
+    subject = "⏰ Pengingat Reservasi - Cafe Loreomah"
+    formatted_date, formatted_time = _format_visit(reservation_data)
+    
+    html_content = f"""
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <style>
+            body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
+            .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
+            .header {{ background: linear-gradient(135deg, #6A4C2E 0%, #8B6F47 100%); color: white; padding: 30px; text-align: center; border-radius: 10px 10px 0 0; }}
+            .content {{ background: #f9f9f9; padding: 30px; border-radius: 0 0 10px 10px; }}
+            .info-box {{ background: white; border-left: 4px solid #6A4C2E; padding: 20px; margin: 20px 0; }}
+            .footer {{ text-align: center; color: #666; font-size: 12px; margin-top: 20px; }}
+        </style>
+    </head>
+    <body>
+        <div class="container">
+            <div class="header">
+                <h1>Cafe Loreomah</h1>
+                <p>Pengingat Reservasi</p>
+            </div>
+            <div class="content">
+                <h2>Halo, {reservation_data.get('name', 'Pelanggan')}!</h2>
+                <p>Sekadar mengingatkan, reservasi Anda di Cafe Loreomah sudah dekat:</p>
+                
+                <div class="info-box">
+                    <p><strong>Tanggal:</strong> {formatted_date}</p>
+                    <p><strong>Jam:</strong> {formatted_time}</p>
+                    <p><strong>Jumlah Tamu:</strong> {reservation_data.get('guests', 0)} orang</p>
+                </div>
+                
+                <p>Jika ada perubahan, hubungi kami via WhatsApp di 0821-4243-3998 minimal 2 jam sebelumnya.</p>
+                <p>Sampai jumpa di Cafe Loreomah!</p>
+                
+                <div class="footer">
+                    <p>Email ini dikirim otomatis dari sistem Cafe Loreomah.</p>
+                    <p>&copy; 2024 Cafe Loreomah. All rights reserved.</p>
+                </div>
+            </div>
+        </div>
+    </body>
+    </html>
+    """
+    
+    msg = _build_message(to_email, subject, html_content)
+    return dispatcher.enqueue(msg, on_failure=f"📧 Reservation reminder for {to_email}")
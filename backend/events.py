@@ -0,0 +1,273 @@
+# backend/events.py
+"""
+Server-push event hub untuk reservasi & pesan.
+Satu task per worker membaca MongoDB change stream (replica set) atau, pada
+mongod standalone, mem-poll dokumen berdasarkan updated_at. Setiap perubahan
+dijadikan delta kecil lalu dibagikan ke subscriber SSE:
+- admin menerima semua delta reservations & messages
+- user hanya menerima delta reservasi miliknya (user_email)
+Setiap event punya id "<epoch>:<seq>"; klien yang reconnect dengan
+Last-Event-ID akan dikirimi ulang event yang terlewat dari ring buffer, atau
+event "resync" jika buffer sudah tidak mencakupnya.
+Jika sumber event gagal, hub mencoba lagi dengan backoff (tidak pernah berhenti
+permanen). Jika resume token tidak bisa dipakai lagi (history hilang), stream
+dibuka ulang dari sekarang dan semua klien diminta resync.
+"""
+from collections import deque
+from datetime import datetime
+from pymongo.errors import OperationFailure, PyMongoError
+import asyncio
+import logging
+import os
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+WATCHED_COLLECTIONS = ("reservations", "messages")
+EVENTS_POLL_INTERVAL = float(os.getenv("EVENTS_POLL_INTERVAL", "2"))
+EVENTS_REPLAY_SIZE = int(os.getenv("EVENTS_REPLAY_SIZE", "1000"))
+EVENTS_SUBSCRIBER_QUEUE = int(os.getenv("EVENTS_SUBSCRIBER_QUEUE", "100"))
+EVENTS_RETRY_MAX_SECONDS = float(os.getenv("EVENTS_RETRY_MAX_SECONDS", "30"))
+
+# Field ringkas yang dikirim untuk pesan (isi pesan diambil saat dibuka)
+MESSAGE_FIELDS = ("id", "name", "email", "subject", "is_read", "created_at")
+
+# Kode error MongoDB: change stream hanya didukung di replica set / sharded cluster
+CHANGE_STREAM_UNSUPPORTED = 40573
+# Resume token tidak bisa dipakai lagi: InvalidResumeToken, ChangeStreamFatalError, ChangeStreamHistoryLost
+RESUME_TOKEN_LOST = {260, 280, 286}
+
+
+class Subscriber:
+    def __init__(self, email: str, is_admin: bool):
+        self.email = email
+        self.is_admin = is_admin
+        self.queue = asyncio.Queue(maxsize=EVENTS_SUBSCRIBER_QUEUE)
+        # Diset jika antrian klien penuh; stream ditutup dengan event resync
+        self.overflowed = False
+        # Diset oleh hub.resync_all(); klien menerima (None, None) di antriannya
+        self.resync_reason = None
+
+    def wants(self, event: dict) -> bool:
+        if self.is_admin:
+            return True
+        return event["collection"] == "reservations" and event.get("user_email") == self.email
+
+
+def _lean(collection: str, doc: dict) -> dict:
+    doc = {k: v for k, v in doc.items() if k != "_id"}
+    if collection == "messages":
+        doc = {k: doc.get(k) for k in MESSAGE_FIELDS}
+    for key, value in doc.items():
+        if isinstance(value, datetime):
+            # BSON dates come back naive UTC; mark them so browsers don't read local time
+            doc[key] = value.isoformat(timespec="milliseconds") + "Z" if value.tzinfo is None else value.isoformat()
+    return doc
+
+
+def _make_event(collection: str, op: str, doc: dict | None, object_id=None) -> dict:
+    event = {"collection": collection, "op": op}
+    if doc:
+        event["id"] = doc.get("id")
+        event["user_email"] = doc.get("user_email")
+        event["doc"] = _lean(collection, doc)
+    else:
+        event["object_id"] = str(object_id) if object_id is not None else None
+    return event
+
+
+class EventHub:
+    def __init__(self):
+        # Epoch berubah tiap proses start, jadi id lama dari worker lain tidak salah dipakai
+        self.epoch = uuid.uuid4().hex[:8]
+        self._seq = 0
+        self._buffer = deque(maxlen=EVENTS_REPLAY_SIZE)
+        self._admins = set()
+        self._users = {}
+        self._task = None
+        self._resume_token = None
+        self.mode = "stopped"
+        self.published = 0
+        self.delivered = 0
+        self.overflows = 0
+        self.resyncs = 0
+        self.restarts = 0
+
+    # === Subscribers ===
+    def subscribe(self, email: str, is_admin: bool, last_event_id: str | None = None):
+        """Register a subscriber and return (subscriber, replay_events, needs_resync).
+
+        Registration and the replay snapshot happen without awaiting, so no
+        event can fall between the replay and the live queue.
+        """
+        sub = Subscriber(email, is_admin)
+        if is_admin:
+            self._admins.add(sub)
+        else:
+            self._users.setdefault(email, set()).add(sub)
+        replay, resync = [], False
+        if last_event_id:
+            epoch, _, seq = last_event_id.partition(":")
+            oldest = self._buffer[0][0] if self._buffer else self._seq + 1
+            if epoch != self.epoch or not seq.isdigit() or int(seq) < oldest - 1:
+                resync = True
+            else:
+                replay = [(s, e) for s, e in self._buffer if s > int(seq) and sub.wants(e)]
+        return sub, replay, resync
+
+    def unsubscribe(self, sub: Subscriber):
+        if sub.is_admin:
+            self._admins.discard(sub)
+            return
+        subs = self._users.get(sub.email)
+        if subs is not None:
+            subs.discard(sub)
+            if not subs:
+                del self._users[sub.email]
+
+    def event_id(self, seq: int) -> str:
+        return f"{self.epoch}:{seq}"
+
+    def publish(self, event: dict):
+        """Fan an event out to every interested subscriber of this worker."""
+        self._seq += 1
+        seq = self._seq
+        self._buffer.append((seq, event))
+        self.published += 1
+        targets = list(self._admins)
+        if event["collection"] == "reservations" and event.get("user_email"):
+            targets.extend(self._users.get(event["user_email"], ()))
+        for sub in targets:
+            if sub.overflowed:
+                continue
+            try:
+                sub.queue.put_nowait((seq, event))
+                self.delivered += 1
+            except asyncio.QueueFull:
+                # Konsumen akan melihat flag ini setelah menguras antriannya
+                sub.overflowed = True
+                self.overflows += 1
+
+    def resync_all(self, reason: str):
+        """Tell every subscriber to refetch (events were lost) and start a new epoch for Last-Event-ID."""
+        self.epoch = uuid.uuid4().hex[:8]
+        self._buffer.clear()
+        for sub in [*self._admins, *(sub for subs in self._users.values() for sub in subs)]:
+            if sub.overflowed or sub.resync_reason:
+                continue
+            sub.resync_reason = reason
+            try:
+                sub.queue.put_nowait((None, None))
+            except asyncio.QueueFull:
+                sub.overflowed = True
+                self.overflows += 1
+        self.resyncs += 1
+
+    # === Source: change streams or polling ===
+    def start(self, db):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(db))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self.mode = "stopped"
+
+    async def _run(self, db):
+        delay = 1.0
+        while True:
+            started = time.monotonic()
+            try:
+                try:
+                    await self._watch(db)
+                except OperationFailure as e:
+                    if e.code != CHANGE_STREAM_UNSUPPORTED:
+                        raise
+                    logger.info("ℹ️ Change streams not supported (standalone mongod), polling instead")
+                await self._poll(db)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.mode = "retrying"
+                self.restarts += 1
+                if time.monotonic() - started > EVENTS_RETRY_MAX_SECONDS:
+                    delay = 1.0
+                logger.error(f"❌ Event source failed, retrying in {delay:.0f}s: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, EVENTS_RETRY_MAX_SECONDS)
+                if self._resume_token is None:
+                    # Tanpa resume token (atau mode polling) event selama jeda tidak bisa disusul
+                    self.resync_all("source_restarted")
+
+    async def _watch(self, db):
+        pipeline = [{"$match": {"ns.coll": {"$in": list(WATCHED_COLLECTIONS)}}}]
+        while True:
+            try:
+                async with db.watch(
+                    pipeline, full_document="updateLookup", resume_after=self._resume_token
+                ) as stream:
+                    self.mode = "change_stream"
+                    async for change in stream:
+                        self._resume_token = stream.resume_token
+                        op = change["operationType"]
+                        if op not in ("insert", "update", "replace", "delete"):
+                            continue
+                        self.publish(_make_event(
+                            change["ns"]["coll"], op, change.get("fullDocument"),
+                            change.get("documentKey", {}).get("_id"),
+                        ))
+            except OperationFailure as e:
+                if e.code not in RESUME_TOKEN_LOST:
+                    raise
+                # Oplog sudah melewati token: buka ulang dari sekarang, klien refetch
+                logger.warning(f"⚠️ Change stream cannot resume ({e.code}), reopening and asking clients to resync")
+                self._resume_token = None
+                self.resync_all("history_lost")
+            except PyMongoError as e:
+                # Putus sementara: lanjutkan dari resume token terakhir
+                logger.warning(f"⚠️ Change stream interrupted, resuming: {e}")
+                await asyncio.sleep(1)
+
+    async def _poll(self, db):
+        """Tail documents by updated_at; deletes are not visible in this mode."""
+        self.mode = "polling"
+        since = {name: datetime.utcnow() for name in WATCHED_COLLECTIONS}
+        seen_at_since = {name: set() for name in WATCHED_COLLECTIONS}
+        while True:
+            for name in WATCHED_COLLECTIONS:
+                try:
+                    docs = await db[name].find(
+                        {"updated_at": {"$gte": since[name]}}
+                    ).sort("updated_at", 1).limit(500).to_list(500)
+                except PyMongoError as e:
+                    logger.warning(f"⚠️ Event polling failed for {name}: {e}")
+                    continue
+                for doc in docs:
+                    if doc["updated_at"] > since[name]:
+                        since[name] = doc["updated_at"]
+                        seen_at_since[name] = set()
+                    key = (doc.get("id"), doc.get("version"), doc.get("is_read"), doc.get("is_read_by_admin"))
+                    if key in seen_at_since[name]:
+                        continue
+                    seen_at_since[name].add(key)
+                    self.publish(_make_event(name, "upsert", doc))
+            await asyncio.sleep(EVENTS_POLL_INTERVAL)
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "admin_subscribers": len(self._admins),
+            "user_subscribers": sum(len(subs) for subs in self._users.values()),
+            "published": self.published,
+            "delivered": self.delivered,
+            "overflows": self.overflows,
+            "resyncs": self.resyncs,
+            "restarts": self.restarts,
+            "buffered": len(self._buffer),
+        }
+
+
+hub = EventHub()
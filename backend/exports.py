@@ -0,0 +1,143 @@
+# backend/exports.py
+"""
+Export data admin (CSV / NDJSON) langsung dari cursor MongoDB.
+Dokumen dibaca per batch (cursor.batch_size) dan setiap batch langsung
+di-yield ke StreamingResponse, jadi memori worker tetap konstan berapa pun
+jumlah barisnya dan tidak ada batas 1000 baris seperti endpoint list.
+"""
+from fastapi import HTTPException
+from datetime import datetime, timezone
+import csv
+import io
+import json
+import os
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+EXPORT_MAX_BATCH_SIZE = 10000
+
+# dataset -> collection, columns, and which field each filter applies to
+EXPORTS = {
+    "reservations": {
+        "collection": "reservations",
+        "fields": ["id", "name", "phone", "guests", "date", "slot", "status", "user_email",
+                   "is_read_by_admin", "created_at"],
+        "status_field": "status",
+        "date_field": "date",
+        "date_type": "datetime",
+        "unread_field": "is_read_by_admin",
+    },
+    "messages": {
+        "collection": "messages",
+        "fields": ["id", "name", "email", "subject", "message", "is_read", "created_at"],
+        "status_field": None,
+        "date_field": "created_at",
+        # created_at pesan disimpan sebagai string ISO UTC (+00:00)
+        "date_type": "iso_string",
+        "unread_field": "is_read",
+    },
+    "users": {
+        "collection": "users",
+        "fields": ["email", "username", "full_name", "phone", "phone_number", "address", "role",
+                   "email_verified", "created_at"],
+        "status_field": "role",
+        "date_field": "created_at",
+        "date_type": "datetime",
+        "unread_field": None,
+    },
+}
+
+FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def _utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _bound(value: datetime, date_type: str):
+    if date_type == "iso_string":
+        return _utc(value).isoformat()
+    return _utc(value).replace(tzinfo=None)
+
+
+def build_query(
+    dataset: str,
+    status: str | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    unread: bool | None = None,
+) -> dict:
+    """Mongo filter for an export; 400 when a filter doesn't apply to the dataset."""
+    spec = EXPORTS[dataset]
+    query = {}
+    if status:
+        if not spec["status_field"]:
+            raise HTTPException(status_code=400, detail=f"Filter status tidak tersedia untuk {dataset}")
+        query[spec["status_field"]] = status
+    if start or end:
+        query[spec["date_field"]] = {}
+        if start:
+            query[spec["date_field"]]["$gte"] = _bound(start, spec["date_type"])
+        if end:
+            query[spec["date_field"]]["$lt"] = _bound(end, spec["date_type"])
+    if unread is not None:
+        if not spec["unread_field"]:
+            raise HTTPException(status_code=400, detail=f"Filter unread tidak tersedia untuk {dataset}")
+        # Unread means the flag is exactly False (same rule as the notification counters)
+        query[spec["unread_field"]] = False if unread else {"$ne": False}
+    return query
+
+
+def _cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return _utc(value).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, default=str, ensure_ascii=False)
+    text = str(value)
+    # Jangan biarkan spreadsheet mengeksekusi isi sel sebagai formula
+    if text[:1] in ("=", "+", "-", "@"):
+        return "'" + text
+    return text
+
+
+def _json_value(value):
+    if isinstance(value, datetime):
+        return _utc(value).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+    return str(value)
+
+
+async def stream_export(db, dataset: str, query: dict, fmt: str, batch_size: int = EXPORT_BATCH_SIZE):
+    """Yield the export in chunks of one Mongo batch each."""
+    spec = EXPORTS[dataset]
+    fields = spec["fields"]
+    projection = {"_id": 0, **{field: 1 for field in fields}}
+    # Urut _id memakai index bawaan, jadi tidak ada sort di memori server
+    cursor = db[spec["collection"]].find(query, projection).sort("_id", 1).batch_size(batch_size)
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if fmt == "csv":
+        # BOM supaya Excel membaca UTF-8 dengan benar
+        buffer.write("\ufeff")
+        writer.writerow(fields)
+
+    rows = 0
+    async for doc in cursor:
+        if fmt == "csv":
+            writer.writerow([_cell(doc.get(field)) for field in fields])
+        else:
+            buffer.write(json.dumps({field: doc.get(field) for field in fields}, default=_json_value, ensure_ascii=False))
+            buffer.write("\n")
+        rows += 1
+        if rows % batch_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
@@ -0,0 +1,102 @@
+"""
+Backfill: buat turunan gambar (lebar IMAGE_WIDTHS, WebP/AVIF + JPEG) untuk
+upload lama di sliders, gallery dan menu_categories, lalu catat di field
+image_variants. Upload baru sudah diproses otomatis oleh router.
+
+Dokumen diproses berurutan _id per batch; dokumen yang sudah punya
+image_variants dilewati (kecuali --force, misalnya setelah IMAGE_WIDTHS
+diubah). Update hanya berlaku jika image_url belum diganti selama proses.
+
+Jalankan dari working directory yang sama dengan server (path upload relatif):
+    python generate_image_variants.py [--collection sliders] [--batch 50] [--force]
+"""
+import argparse
+import asyncio
+from dotenv import load_dotenv
+from pathlib import Path
+import os
+
+from database import create_client
+import http_cache
+import images
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / ".env")
+
+COLLECTIONS = ("sliders", "gallery", "menu_categories")
+
+
+def _without(old: dict | None, new: dict) -> dict:
+    keep = {f["url"] for files in new["formats"].values() for f in files}
+    formats = (old or {}).get("formats") or {}
+    return {"formats": {name: [f for f in files if f["url"] not in keep] for name, files in formats.items()}}
+
+
+async def backfill(db, collection: str, batch_size: int, force: bool) -> dict:
+    # Blob (/uploads/blobs/...) sudah dibuatkan turunan saat disimpan oleh blob_store
+    query = {"image_url": {"$type": "string", "$regex": "^/uploads/(?!blobs/)"}}
+    if not force:
+        query["image_variants"] = None
+    done = missing = failed = 0
+    last_id = None
+    while True:
+        page = dict(query)
+        if last_id is not None:
+            page["_id"] = {"$gt": last_id}
+        batch = await db[collection].find(page, {"_id": 1, "image_url": 1, "image_variants": 1}).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+        for doc in batch:
+            if not images.path_for(doc["image_url"]).exists():
+                missing += 1
+                continue
+            try:
+                variants = await images.build_variants(doc["image_url"])
+            except ValueError as e:
+                failed += 1
+                print(f"⚠️ {collection} {doc['image_url']}: {e}")
+                continue
+            result = await db[collection].update_one(
+                {"_id": doc["_id"], "image_url": doc["image_url"]},
+                {"$set": {"image_variants": variants}},
+            )
+            if not result.matched_count:
+                # Gambar diganti admin di tengah jalan: turunan ini tidak terpakai
+                images.delete_variants(variants)
+                continue
+            done += 1
+            # --force: file dengan nama sama sudah tertimpa, sisanya (lebar/format lama) dibuang
+            images.delete_variants(_without(doc.get("image_variants"), variants))
+        last_id = batch[-1]["_id"]
+        print(f"… {collection}: {done} processed")
+    if done:
+        await http_cache.bump(db, collection)
+    return {"collection": collection, "processed": done, "missing_file": missing, "failed": failed}
+
+
+async def main(args):
+    mongo_url = os.getenv("MONGO_URL")
+    db_name = os.getenv("DB_NAME")
+
+    if not mongo_url or not db_name:
+        print("⚠️ MONGO_URL and DB_NAME must be set in .env")
+        return
+
+    client = create_client(mongo_url)
+    db = client[db_name]
+    try:
+        for collection in ([args.collection] if args.collection else COLLECTIONS):
+            result = await backfill(db, collection, args.batch, args.force)
+            print(f"✅ {result['collection']}: {result['processed']} processed, "
+                  f"{result['missing_file']} missing file, {result['failed']} failed")
+    finally:
+        images.shutdown_image_pool()
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill image derivatives for existing uploads")
+    parser.add_argument("--collection", choices=COLLECTIONS, help="Only this collection (default: all)")
+    parser.add_argument("--batch", type=int, default=50, help="Documents per batch")
+    parser.add_argument("--force", action="store_true", help="Regenerate even if image_variants exists")
+    asyncio.run(main(parser.parse_args()))
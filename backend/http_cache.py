@@ -0,0 +1,259 @@
+# backend/http_cache.py
+"""
+HTTP caching untuk endpoint baca publik (sliders, gallery, menu, settings).
+Setiap collection punya versi konten yang dinaikkan oleh endpoint tulis
+(bump). ETag dihitung dari versi collection yang dibaca route + URL-nya, jadi:
+- If-None-Match yang cocok dijawab 304 tanpa query MongoDB
+- body JSON disimpan per (URL, versi), request berikutnya tidak query ulang
+- Cache-Control per route bisa diatur lewat env CACHE_POLICY_<NAMA>
+
+Versi disimpan di collection cache_versions supaya semua worker/replica
+sepakat. Setiap worker menyalin versi ke memori lewat change stream (atau
+poll setiap CACHE_VERSION_POLL_SECONDS di mongod standalone); jalur baca hanya
+melihat salinan lokal itu. Worker yang melakukan tulis langsung memakai versi
+barunya, worker lain menyusul paling lambat satu interval poll.
+"""
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from pymongo import ReturnDocument
+from pymongo.errors import OperationFailure, PyMongoError
+import asyncio
+import functools
+import hashlib
+import json
+import logging
+import os
+import time
+import uuid
+
+from cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+VERSIONS_COLLECTION = "cache_versions"
+CACHE_VERSION_POLL_SECONDS = float(os.getenv("CACHE_VERSION_POLL_SECONDS", "2"))
+
+# Kode error MongoDB: change stream hanya didukung di replica set / sharded cluster
+CHANGE_STREAM_UNSUPPORTED = 40573
+
+# Default: browser/proxy boleh menyimpan, tapi wajib revalidasi (304 murah),
+# supaya perubahan admin langsung terlihat
+DEFAULT_CACHE_POLICY = "public, no-cache"
+HTTP_CACHE_BODY_ENTRIES = int(os.getenv("HTTP_CACHE_BODY_ENTRIES", "256"))
+
+
+class ContentVersions:
+    """Local copy of the shared per-collection versions in cache_versions."""
+
+    def __init__(self):
+        self.started_at = datetime.now(timezone.utc).replace(microsecond=0)
+        # Collections read by cached routes; synced from Mongo
+        self.tracked = set()
+        # name -> (generation, version); generation changes if the version doc is recreated
+        self._versions = {}
+        self._modified = {}
+        self.mode = "stopped"
+        self.last_sync = None
+        self.updates = 0
+        self._task = None
+
+    def track(self, *collections: str):
+        self.tracked.update(collections)
+
+    def apply(self, doc: dict):
+        current = self._versions.get(doc["_id"])
+        new = (doc.get("generation", ""), doc.get("version", 0))
+        # Never go back (a bump's own result can arrive after a newer change)
+        if current and current[0] == new[0] and new[1] <= current[1]:
+            return
+        if current != new:
+            self._versions[doc["_id"]] = new
+            self.updates += 1
+        modified = doc.get("updated_at")
+        if isinstance(modified, datetime):
+            self._modified[doc["_id"]] = modified.replace(tzinfo=timezone.utc, microsecond=0)
+
+    def token(self, collections: tuple) -> str:
+        parts = []
+        for name in collections:
+            parts.append("%s%s" % self._versions.get(name, ("", 0)))
+        return ".".join(parts)
+
+    def last_modified(self, collections: tuple) -> datetime:
+        return max((self._modified.get(name, self.started_at) for name in collections), default=self.started_at)
+
+    def snapshot(self) -> dict:
+        return {name: version for name, (_, version) in self._versions.items()}
+
+    # === Sync from Mongo ===
+    async def load(self, db):
+        """Create missing version docs and read all of them (called once at startup)."""
+        now = datetime.utcnow()
+        for name in self.tracked:
+            await db[VERSIONS_COLLECTION].update_one(
+                {"_id": name},
+                {"$setOnInsert": {"version": 0, "generation": uuid.uuid4().hex[:6], "updated_at": now}},
+                upsert=True,
+            )
+        await self._poll_once(db)
+
+    async def _poll_once(self, db):
+        async for doc in db[VERSIONS_COLLECTION].find({"_id": {"$in": list(self.tracked)}}):
+            self.apply(doc)
+        self.last_sync = time.monotonic()
+
+    def start(self, db):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(db))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self.mode = "stopped"
+
+    async def _run(self, db):
+        while True:
+            try:
+                try:
+                    await self._watch(db)
+                except OperationFailure as e:
+                    if e.code != CHANGE_STREAM_UNSUPPORTED:
+                        raise
+                await self._poll(db)
+            except asyncio.CancelledError:
+                raise
+            except PyMongoError as e:
+                logger.warning(f"⚠️ Cache version sync interrupted, retrying: {e}")
+                await asyncio.sleep(CACHE_VERSION_POLL_SECONDS)
+
+    async def _watch(self, db):
+        async with db[VERSIONS_COLLECTION].watch(full_document="updateLookup") as stream:
+            self.mode = "change_stream"
+            # Catch up on anything bumped before the stream opened
+            await self._poll_once(db)
+            async for change in stream:
+                if change.get("fullDocument"):
+                    self.apply(change["fullDocument"])
+                self.last_sync = time.monotonic()
+
+    async def _poll(self, db):
+        self.mode = "polling"
+        while True:
+            await self._poll_once(db)
+            await asyncio.sleep(CACHE_VERSION_POLL_SECONDS)
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "versions": self.snapshot(),
+            "updates": self.updates,
+            "seconds_since_sync": round(time.monotonic() - self.last_sync, 1) if self.last_sync else None,
+        }
+
+
+versions = ContentVersions()
+_bodies = TTLCache(maxsize=HTTP_CACHE_BODY_ENTRIES, ttl=3600)
+
+
+async def bump(db, *collections: str) -> str:
+    """Call after a write to any of `collections` (invalidates ETags and cached bodies on every worker).
+
+    Returns the version token produced by this bump; if versions.token() still
+    equals it, no other write has happened since.
+    """
+    now = datetime.utcnow()
+    parts = []
+    for name in collections:
+        doc = await db[VERSIONS_COLLECTION].find_one_and_update(
+            {"_id": name},
+            {"$inc": {"version": 1}, "$set": {"updated_at": now}, "$setOnInsert": {"generation": uuid.uuid4().hex[:6]}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        # This worker sees its own write immediately; the others via sync
+        versions.apply(doc)
+        parts.append(f"{doc['generation']}{doc['version']}")
+    return ".".join(parts)
+
+
+def cache_policy(name: str, default: str = DEFAULT_CACHE_POLICY) -> str:
+    return os.getenv(f"CACHE_POLICY_{name.upper()}", default)
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Compare ignoring weak prefixes (a proxy may have added W/ when compressing)
+    return etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+
+
+def _not_modified_since(request: Request, last_modified: datetime) -> bool:
+    value = request.headers.get("if-modified-since")
+    if not value:
+        return False
+    try:
+        since = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified <= since
+
+
+def conditional(name: str, *collections: str, policy: str = DEFAULT_CACHE_POLICY):
+    """Decorator for GET endpoints whose output depends only on `collections` and the URL.
+
+    The endpoint must take `request: Request`. Responses get ETag,
+    Last-Modified and Cache-Control; matching conditional requests get 304.
+    """
+    cache_control = cache_policy(name, policy)
+    versions.track(*collections)
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            request: Request = kwargs["request"]
+            variant = request.url.path + ("?" + request.url.query if request.url.query else "")
+            token = versions.token(collections)
+            etag = '"' + hashlib.sha1(f"{token}|{variant}".encode()).hexdigest()[:20] + '"'
+            last_modified = versions.last_modified(collections)
+            headers = {
+                "ETag": etag,
+                "Last-Modified": format_datetime(last_modified, usegmt=True),
+                "Cache-Control": cache_control,
+            }
+            # If-None-Match wins over If-Modified-Since (RFC 9110)
+            if request.headers.get("if-none-match") is not None:
+                if etag_matches(request.headers.get("if-none-match"), etag):
+                    return Response(status_code=304, headers=headers)
+            elif _not_modified_since(request, last_modified):
+                return Response(status_code=304, headers=headers)
+
+            key = (variant, token)
+            cached = _bodies.get(key)
+            if cached is None:
+                result = await func(*args, **kwargs)
+                if isinstance(result, Response):
+                    if result.status_code != 200:
+                        return result
+                    cached = (result.body, result.media_type or "application/json")
+                else:
+                    body = json.dumps(jsonable_encoder(result), ensure_ascii=False, separators=(",", ":")).encode()
+                    cached = (body, "application/json")
+                _bodies.set(key, cached)
+            body, media_type = cached
+            return Response(content=body, media_type=media_type, headers=headers)
+
+        return wrapper
+
+    return decorator
+
+
+def stats() -> dict:
+    return {**versions.stats(), "bodies": _bodies.stats()}
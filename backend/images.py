@@ -0,0 +1,169 @@
+# backend/images.py
+"""
+Pipeline turunan gambar untuk slider, gallery dan kategori menu.
+Original tetap disimpan, lalu di-decode SEKALI di process pool dan diturunkan
+ke beberapa lebar (IMAGE_WIDTHS, default 320/768/1440) dalam WebP, AVIF (jika
+Pillow di server mendukung) dan JPEG sebagai fallback. Hasilnya ditulis ke
+folder derived/ di samping original, dan URL-nya dicatat di dokumen sebagai
+image_variants, supaya frontend bisa memakai <picture>/srcset dan pengunjung
+HP tidak perlu mengunduh foto kamera berukuran beberapa MB.
+
+Resize gambar murni CPU dan sebagian besar memegang GIL, jadi dijalankan di
+ProcessPoolExecutor (bukan thread pool seperti bcrypt di auth.py).
+"""
+from concurrent.futures import ProcessPoolExecutor
+from fastapi import HTTPException
+from pathlib import Path
+import asyncio
+import logging
+import multiprocessing
+import os
+
+from PIL import Image, ImageOps, UnidentifiedImageError, features
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_ROOT = Path("backend")
+DERIVED_DIR = "derived"
+
+IMAGE_WIDTHS = tuple(sorted(int(w) for w in os.getenv("IMAGE_WIDTHS", "320,768,1440").split(",") if w.strip()))
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "80"))
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+# Batas antrian: jika lebih banyak dari ini yang menunggu, upload ditolak 503
+IMAGE_MAX_PENDING = int(os.getenv("IMAGE_MAX_PENDING", "16"))
+IMAGE_MAX_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", str(60_000_000)))
+
+# Urutan = urutan <source> di frontend (paling efisien dulu); jpeg selalu ada sebagai fallback
+_FORMATS = [
+    ("avif", "AVIF", {"quality": IMAGE_QUALITY - 20}),
+    ("webp", "WEBP", {"quality": IMAGE_QUALITY, "method": 4}),
+    ("jpeg", "JPEG", {"quality": IMAGE_QUALITY, "optimize": True, "progressive": True}),
+]
+_EXTENSIONS = {"jpeg": "jpg"}
+
+
+# Pillow lama (< 11.3) tidak punya encoder AVIF; check() hanya memberi warning
+FORMATS = [name for name, _, _ in _FORMATS if name != "avif" or features.check("avif")]
+
+
+# === Worker (runs in a child process) ===
+def _save(image, path: Path, pil_format: str, options: dict):
+    tmp = path.with_name(f".{path.name}.tmp")
+    image.save(tmp, pil_format, **options)
+    os.replace(tmp, path)
+
+
+def render_variants(source: str, out_dir: str, stem: str, widths: tuple, formats: list) -> dict:
+    """Decode `source` once and write every width x format; returns sizes and file names."""
+    Image.MAX_IMAGE_PIXELS = IMAGE_MAX_PIXELS
+    try:
+        with Image.open(source) as image:
+            image = ImageOps.exif_transpose(image)
+            has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+            image = image.convert("RGBA" if has_alpha else "RGB")
+            width, height = image.size
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as e:
+        raise ValueError(f"Invalid image: {e}") from e
+
+    # Tidak pernah memperbesar: lebar di atas original dilewati (minimal satu turunan)
+    targets = [w for w in widths if w < width] + [min(width, widths[-1])]
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    files = {name: [] for name in formats}
+    for target in sorted(set(targets)):
+        resized = image if target == width else image.resize((target, round(height * target / width)), Image.LANCZOS)
+        for name, pil_format, options in _FORMATS:
+            if name not in formats:
+                continue
+            frame = resized.convert("RGB") if name == "jpeg" and resized.mode != "RGB" else resized
+            filename = f"{stem}-{target}.{_EXTENSIONS.get(name, name)}"
+            _save(frame, out / filename, pil_format, options)
+            files[name].append({"width": target, "file": filename})
+    return {"width": width, "height": height, "files": files}
+
+
+# === Async API ===
+_executor = None
+_pending = 0
+_rejected = 0
+_rendered = 0
+
+
+def _pool() -> ProcessPoolExecutor:
+    # Dibuat saat pertama dipakai, bukan saat import (worker uvicorn / script migrasi)
+    global _executor
+    if _executor is None:
+        # Jangan fork proses uvicorn langsung: worker akan mewarisi event loop, thread
+        # dan socket Motor. forkserver (atau spawn di Windows/macOS lama) mulai bersih.
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        _executor = ProcessPoolExecutor(max_workers=IMAGE_WORKERS, mp_context=multiprocessing.get_context(method))
+    return _executor
+
+
+def path_for(url: str) -> Path:
+    """Local file for an /uploads/... URL."""
+    return UPLOAD_ROOT / url.lstrip("/")
+
+
+async def build_variants(image_url: str) -> dict:
+    """Render derivatives for an uploaded original and return the image_variants document.
+
+    Raises ValueError if the file is not a decodable image, 503 when the pool is saturated.
+    """
+    global _pending, _rejected, _rendered
+    if _pending >= IMAGE_MAX_PENDING:
+        _rejected += 1
+        raise HTTPException(
+            status_code=503,
+            detail="Server sedang sibuk memproses gambar, silakan coba lagi",
+            headers={"Retry-After": "2"},
+        )
+    source = path_for(image_url)
+    url_dir = image_url.rsplit("/", 1)[0] + f"/{DERIVED_DIR}/"
+    _pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(
+            _pool(), render_variants,
+            str(source), str(source.parent / DERIVED_DIR), source.stem, IMAGE_WIDTHS, FORMATS,
+        )
+    finally:
+        _pending -= 1
+    _rendered += 1
+    return {
+        "width": result["width"],
+        "height": result["height"],
+        "formats": {
+            name: [{"width": f["width"], "url": url_dir + f["file"]} for f in files]
+            for name, files in result["files"].items()
+        },
+    }
+
+
+def delete_variants(variants: dict | None):
+    """Remove derivative files listed in an image_variants document."""
+    for files in ((variants or {}).get("formats") or {}).values():
+        for f in files:
+            try:
+                path_for(f["url"]).unlink()
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"⚠️ Could not delete {f['url']}: {e}")
+
+
+def pool_stats() -> dict:
+    return {
+        "workers": IMAGE_WORKERS,
+        "max_pending": IMAGE_MAX_PENDING,
+        "pending": _pending,
+        "rejected": _rejected,
+        "rendered": _rendered,
+        "widths": list(IMAGE_WIDTHS),
+        "formats": FORMATS,
+    }
+
+
+def shutdown_image_pool():
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,94 @@
+# backend/indexes.py
+"""
+Index yang dibutuhkan tiap collection dideklarasikan di modul router masing-masing
+sebagai INDEXES = {collection: [IndexModel, ...]}. Saat startup server
+merekonsiliasi deklarasi itu dengan index yang ada di MongoDB (idempotent),
+dan perbedaannya bisa dilihat lewat /api/admin/indexes.
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Opsi index yang ikut dibandingkan saat mendeteksi drift
+COMPARED_OPTIONS = ("unique", "sparse", "partialFilterExpression", "expireAfterSeconds", "collation")
+
+
+def merge_declarations(*declarations: dict) -> dict:
+    merged = {}
+    for declaration in declarations:
+        for collection, models in declaration.items():
+            merged.setdefault(collection, []).extend(models)
+    return merged
+
+
+def _normalize_key(key) -> list:
+    return [(field, int(direction) if isinstance(direction, (int, float)) else direction) for field, direction in key]
+
+
+def _is_text(key) -> bool:
+    return any(direction == "text" for _, direction in key)
+
+
+def _differences(declared: dict, existing: dict) -> list:
+    """Return the option names where an existing index differs from its declaration."""
+    diffs = []
+    declared_key = _normalize_key(declared["key"].items())
+    # Text index disimpan MongoDB sebagai _fts/_ftsx, jadi key-nya tidak dibandingkan
+    if not _is_text(declared_key) and declared_key != _normalize_key(existing["key"]):
+        diffs.append("key")
+    for option in COMPARED_OPTIONS:
+        want = declared.get(option)
+        have = existing.get(option)
+        if option == "collation" and want and have:
+            have = {k: have.get(k) for k in want}
+        if bool(want) != bool(have) or (want and want != have):
+            diffs.append(option)
+    return diffs
+
+
+async def index_drift(db, declarations: dict) -> dict:
+    """Compare declared indexes with the ones MongoDB actually has."""
+    report = {}
+    for collection, models in declarations.items():
+        existing = await db[collection].index_information()
+        declared_names = set()
+        missing, mismatched = [], []
+        for model in models:
+            doc = model.document
+            declared_names.add(doc["name"])
+            current = existing.get(doc["name"])
+            if current is None:
+                missing.append(doc["name"])
+                continue
+            diffs = _differences(doc, current)
+            if diffs:
+                mismatched.append({"name": doc["name"], "differs_in": diffs})
+        extra = sorted(name for name in existing if name != "_id_" and name not in declared_names)
+        report[collection] = {"missing": missing, "mismatched": mismatched, "extra": extra}
+    return report
+
+
+async def ensure_indexes(db, declarations: dict) -> dict:
+    """Create missing declared indexes; mismatched or extra ones are only reported.
+
+    Each index is created separately so one failure (e.g. duplicate values
+    under a new unique index) does not block the others.
+    """
+    drift = await index_drift(db, declarations)
+    errors = {}
+    for collection, models in declarations.items():
+        missing = set(drift[collection]["missing"])
+        for model in models:
+            name = model.document["name"]
+            if name not in missing:
+                continue
+            try:
+                await db[collection].create_indexes([model])
+                logger.info(f"🗂️ Created index {collection}.{name}")
+            except Exception as e:
+                errors.setdefault(collection, {})[name] = str(e)
+                logger.error(f"❌ Failed to create index {collection}.{name}: {e}")
+    report = await index_drift(db, declarations)
+    for collection, collection_errors in errors.items():
+        report[collection]["errors"] = collection_errors
+    return report
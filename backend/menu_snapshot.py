@@ -0,0 +1,65 @@
+# backend/menu_snapshot.py
+"""
+Snapshot menu lengkap (kategori + item-nya) untuk GET /api/menu.
+Dibangun sekali dari dua query, diserialisasi ke bytes JSON, lalu disimpan di
+memori proses bersama ETag kuat (hash isi). Snapshot terikat pada versi konten
+menu_categories + menu_items (http_cache); endpoint tulis kategori/item
+menaikkan versi itu dan snapshot dibangun ulang pada request berikutnya,
+di worker mana pun (versi disinkronkan lewat cache_versions).
+"""
+import asyncio
+import hashlib
+import json
+
+from http_cache import versions
+from slugs import slugify
+
+CATEGORIES_COLLECTION = "menu_categories"
+ITEMS_COLLECTION = "menu_items"
+MENU_COLLECTIONS = (CATEGORIES_COLLECTION, ITEMS_COLLECTION)
+versions.track(*MENU_COLLECTIONS)
+
+# (version token, body, etag) of the last build
+_snapshot = None
+_lock = asyncio.Lock()
+rebuilds = 0
+
+
+async def _build(db) -> bytes:
+    categories = await db[CATEGORIES_COLLECTION].find({}, {"_id": 0}).to_list(None)
+    items_by_category = {}
+    async for item in db[ITEMS_COLLECTION].find({}, {"_id": 0}):
+        key = item.get("category_slug") or slugify(item.get("category"))
+        items_by_category.setdefault(key, []).append(item)
+    for category in categories:
+        key = category.get("slug") or slugify(category.get("name"))
+        category["items"] = items_by_category.get(key, [])
+    return json.dumps({"categories": categories}, ensure_ascii=False, separators=(",", ":"), default=str).encode()
+
+
+async def get_snapshot(db) -> tuple:
+    """(body, etag) for the current menu, rebuilding only if something changed."""
+    global _snapshot, rebuilds
+    snapshot = _snapshot
+    if snapshot and snapshot[0] == versions.token(MENU_COLLECTIONS):
+        return snapshot[1], snapshot[2]
+    async with _lock:
+        # Another request may have rebuilt it while we waited
+        version = versions.token(MENU_COLLECTIONS)
+        if _snapshot and _snapshot[0] == version:
+            return _snapshot[1], _snapshot[2]
+        # A write during the build bumps the version, so this snapshot is rebuilt next time
+        body = await _build(db)
+        etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        _snapshot = (version, body, etag)
+        rebuilds += 1
+        return body, etag
+
+
+def stats() -> dict:
+    return {
+        "version": versions.token(MENU_COLLECTIONS),
+        "cached_version": _snapshot[0] if _snapshot else None,
+        "bytes": len(_snapshot[1]) if _snapshot else 0,
+        "rebuilds": rebuilds,
+    }
@@ -0,0 +1,94 @@
+"""
+Migration: pindahkan avatar lama (data URL base64 di dokumen users) ke file
+thumbnail di backend/uploads/avatars/, dan ganti avatar_url dengan URL pendek.
+
+Diproses per batch berurutan _id, satu bulk_write per batch. Update hanya
+berlaku jika avatar_url masih sama dengan yang dibaca, jadi upload baru dari
+user selama migrasi tidak tertimpa. Dokumen yang sudah dipindah tidak cocok
+lagi dengan query, sehingga script aman dihentikan dan dijalankan ulang.
+Avatar yang tidak bisa di-decode dibiarkan apa adanya dan dilaporkan.
+
+Jalankan dari working directory yang sama dengan server (file ditulis ke
+backend/uploads/avatars relatif terhadapnya, seperti upload lain):
+    python migrate_avatars.py [--batch 20] [--pause 0.2] [--dry-run]
+"""
+import argparse
+import asyncio
+from dotenv import load_dotenv
+from pathlib import Path
+from pymongo import UpdateOne
+import os
+
+import avatars
+from database import create_client
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / ".env")
+
+COLLECTION_NAME = "users"
+PENDING_QUERY = {"avatar_url": {"$regex": "^data:"}}
+
+
+async def migrate(args):
+    mongo_url = os.getenv("MONGO_URL")
+    db_name = os.getenv("DB_NAME")
+
+    if not mongo_url or not db_name:
+        print("⚠️ MONGO_URL and DB_NAME must be set in .env")
+        return
+
+    client = create_client(mongo_url)
+    users = client[db_name][COLLECTION_NAME]
+
+    if args.dry_run:
+        pending = await users.count_documents(PENDING_QUERY)
+        print(f"🔎 {pending} users still have a data-URL avatar")
+        client.close()
+        return
+
+    moved = failed = 0
+    last_id = None
+    while True:
+        query = dict(PENDING_QUERY)
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        # Batch kecil: satu dokumen bisa berisi belasan MB base64
+        batch = await users.find(query, {"_id": 1, "email": 1, "avatar_url": 1}).sort("_id", 1).limit(args.batch).to_list(args.batch)
+        if not batch:
+            break
+        ops, written = [], {}
+        for doc in batch:
+            data = avatars.decode_data_url(doc["avatar_url"])
+            try:
+                if data is None:
+                    raise ValueError("not a base64 data URL")
+                url = await avatars.save_avatar(data)
+            except ValueError as e:
+                failed += 1
+                print(f"⚠️ {doc.get('email')}: {e}")
+                continue
+            written[doc["_id"]] = url
+            ops.append(UpdateOne({"_id": doc["_id"], "avatar_url": doc["avatar_url"]}, {"$set": {"avatar_url": url}}))
+        if ops:
+            result = await users.bulk_write(ops, ordered=False)
+            moved += result.modified_count
+            if result.modified_count < len(ops):
+                # Avatar diganti user di tengah jalan: buang file yang tidak terpakai
+                async for doc in users.find({"_id": {"$in": list(written)}}, {"_id": 1, "avatar_url": 1}):
+                    if doc.get("avatar_url") != written[doc["_id"]]:
+                        avatars.delete_avatar(written[doc["_id"]])
+        last_id = batch[-1]["_id"]
+        print(f"… {moved} moved, {failed} failed")
+        if args.pause:
+            await asyncio.sleep(args.pause)
+
+    print(f"✅ Avatar migration done: {moved} moved, {failed} left as data URL")
+    client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move data-URL avatars to thumbnail files")
+    parser.add_argument("--batch", type=int, default=20, help="Users per batch")
+    parser.add_argument("--pause", type=float, default=0.2, help="Seconds to sleep between batches")
+    parser.add_argument("--dry-run", action="store_true", help="Only count users that still need migrating")
+    asyncio.run(migrate(parser.parse_args()))
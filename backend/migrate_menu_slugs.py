@@ -0,0 +1,46 @@
+"""
+Migration: isi field slug pada menu_categories dan category_slug pada menu_items
+untuk dokumen lama, supaya lookup per nama kategori memakai index (tanpa regex).
+Aman dijalankan berulang; server juga menjalankan backfill yang sama saat startup.
+
+Jalankan:
+    python migrate_menu_slugs.py [--batch 500]
+"""
+import argparse
+import asyncio
+from dotenv import load_dotenv
+from pathlib import Path
+import os
+
+from database import create_client
+from slugs import backfill_category_slugs, backfill_slugs
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / ".env")
+
+
+async def migrate(batch_size: int):
+    mongo_url = os.getenv("MONGO_URL")
+    db_name = os.getenv("DB_NAME")
+
+    if not mongo_url or not db_name:
+        print("⚠️ MONGO_URL and DB_NAME must be set in .env")
+        return
+
+    client = create_client(mongo_url)
+    db = client[db_name]
+
+    for result in (
+        await backfill_slugs(db["menu_categories"], "name", "slug", unique=True, batch_size=batch_size),
+        # Setelah kategori: category_slug item diambil dari slug kategorinya (bisa bersufiks)
+        await backfill_category_slugs(db["menu_items"], db["menu_categories"], batch_size=batch_size),
+    ):
+        print(f"✅ {result['collection']}.{result['field']}: {result['updated']} documents updated")
+
+    client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill menu slug fields")
+    parser.add_argument("--batch", type=int, default=500, help="Documents per bulk_write")
+    asyncio.run(migrate(parser.parse_args().batch))
@@ -0,0 +1,143 @@
+"""
+Migration: simpan tanggal reservasi sebagai BSON datetime
+- date       : string ISO dari browser -> datetime (UTC)
+- created_at : string ISO -> datetime (UTC)
+- slot_at    : awal slot kapasitas (UTC), dihitung dari field slot
+
+Diproses per batch berurutan _id, satu bulk_write per batch. Posisi terakhir
+disimpan di collection migrations, jadi script bisa dihentikan dan dijalankan
+ulang kapan saja; dokumen yang sudah dikonversi tidak diproses lagi.
+
+Jalankan:
+    python migrate_reservation_dates.py [--batch 500] [--pause 0.2] [--dry-run] [--restart]
+"""
+import argparse
+import asyncio
+from datetime import datetime
+from dotenv import load_dotenv
+from pathlib import Path
+from fastapi import HTTPException
+from pymongo import UpdateOne
+import os
+
+from availability import parse_visit_time, slot_start, to_utc
+from database import create_client
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / ".env")
+
+COLLECTION_NAME = "reservations"
+MIGRATIONS_COLLECTION = "migrations"
+MIGRATION_ID = "reservation_dates"
+
+PENDING_QUERY = {
+    "$or": [
+        {"date": {"$type": "string"}},
+        {"created_at": {"$type": "string"}},
+        {"slot": {"$type": "string"}, "slot_at": {"$exists": False}},
+    ]
+}
+
+
+def _parse_created_at(value: str) -> datetime:
+    # created_at was written with datetime.utcnow().isoformat(): naive = UTC
+    return to_utc(datetime.fromisoformat(value.replace("Z", "+00:00")))
+
+
+def convert(doc: dict) -> dict:
+    """$set fields for one document (raises ValueError if a value can't be parsed)."""
+    fields = {}
+    if isinstance(doc.get("date"), str):
+        try:
+            fields["date"] = to_utc(parse_visit_time(doc["date"]))
+        except HTTPException:
+            raise ValueError(f"date={doc['date']!r}")
+    if isinstance(doc.get("created_at"), str):
+        fields["created_at"] = _parse_created_at(doc["created_at"])
+    if isinstance(doc.get("slot"), str) and "slot_at" not in doc:
+        fields["slot_at"] = slot_start(doc["slot"])
+    return fields
+
+
+async def migrate(args):
+    mongo_url = os.getenv("MONGO_URL")
+    db_name = os.getenv("DB_NAME")
+
+    if not mongo_url or not db_name:
+        print("⚠️ MONGO_URL and DB_NAME must be set in .env")
+        return
+
+    client = create_client(mongo_url)
+    db = client[db_name]
+    reservations = db[COLLECTION_NAME]
+    progress = db[MIGRATIONS_COLLECTION]
+
+    state = await progress.find_one({"_id": MIGRATION_ID}) or {}
+    if args.restart:
+        state = {}
+    last_id = state.get("last_id")
+    converted = state.get("converted", 0)
+    failed = state.get("failed", 0)
+    if last_id is not None:
+        print(f"↪️ Resuming after _id {last_id} ({converted} converted so far)")
+
+    while True:
+        query = dict(PENDING_QUERY)
+        if last_id is not None:
+            query = {"$and": [PENDING_QUERY, {"_id": {"$gt": last_id}}]}
+        batch = await reservations.find(
+            query, {"_id": 1, "id": 1, "date": 1, "created_at": 1, "slot": 1, "slot_at": 1}
+        ).sort("_id", 1).limit(args.batch).to_list(args.batch)
+        if not batch:
+            break
+
+        ops = []
+        for doc in batch:
+            try:
+                fields = convert(doc)
+            except ValueError as e:
+                failed += 1
+                print(f"❌ Skipping reservation {doc.get('id')}: {e}")
+                continue
+            if fields:
+                # Guard on the original values so a concurrent edit is never overwritten
+                guard = {"_id": doc["_id"]}
+                for key in ("date", "created_at"):
+                    if key in fields:
+                        guard[key] = doc[key]
+                ops.append(UpdateOne(guard, {"$set": fields}))
+
+        if ops and not args.dry_run:
+            result = await reservations.bulk_write(ops, ordered=False)
+            converted += result.modified_count
+        elif args.dry_run:
+            converted += len(ops)
+
+        last_id = batch[-1]["_id"]
+        if not args.dry_run:
+            await progress.update_one(
+                {"_id": MIGRATION_ID},
+                {"$set": {"last_id": last_id, "converted": converted, "failed": failed, "updated_at": datetime.utcnow()}},
+                upsert=True,
+            )
+        print(f"✅ Batch done: {len(ops)} updated, up to _id {last_id}")
+        await asyncio.sleep(args.pause)
+
+    if not args.dry_run:
+        await progress.update_one(
+            {"_id": MIGRATION_ID},
+            {"$set": {"finished_at": datetime.utcnow(), "converted": converted, "failed": failed}},
+            upsert=True,
+        )
+    remaining = await reservations.count_documents(PENDING_QUERY)
+    print(f"🎉 Done: {converted} converted, {failed} failed, {remaining} still in string format")
+    client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert reservation dates to BSON datetimes")
+    parser.add_argument("--batch", type=int, default=500, help="Documents per bulk_write")
+    parser.add_argument("--pause", type=float, default=0.2, help="Seconds to sleep between batches")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would change")
+    parser.add_argument("--restart", action="store_true", help="Ignore saved progress and scan from the start")
+    asyncio.run(migrate(args=parser.parse_args()))
@@ -3,7 +3,7 @@ Migration script to initialize settings data in MongoDB
 Run this once to populate initial settings from mockData
 """
 import asyncio
-from motor.motor_asyncio import AsyncIOMotorClient
+from database import create_client
 from dotenv import load_dotenv
 import os
 from pathlib import Path
@@ -19,7 +19,7 @@ async def migrate_settings():
         print("⚠️ MONGO_URL and DB_NAME must be set in .env")
         return
     
-    client = AsyncIOMotorClient(mongo_url)
+    client = create_client(mongo_url)
     db = client[db_name]
     
     # Check if settings already exist
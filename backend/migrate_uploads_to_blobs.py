@@ -0,0 +1,133 @@
+"""
+Migration: pindahkan upload lama (/uploads/sliders|gallery|menu_categories/
+<uuid>_nama) ke blob_store content-addressed. Foto yang sama di beberapa
+dokumen cukup disimpan sekali dan mendapat URL immutable /uploads/blobs/...
+
+Urutan: gambar cerita (settings) dulu, karena URL-nya sering menunjuk file
+slider yang ikut dipindah. Dokumen diproses berurutan _id per batch; update
+hanya berlaku jika image_url belum diganti selama proses, lalu file lama dan
+turunannya dihapus. Dokumen yang sudah pindah tidak cocok lagi dengan query,
+jadi script aman dihentikan dan dijalankan ulang.
+
+Jalankan dari working directory yang sama dengan server (path upload relatif):
+    python migrate_uploads_to_blobs.py [--batch 50] [--dry-run]
+"""
+import argparse
+import asyncio
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from pathlib import Path
+from urllib.parse import urlparse
+import os
+
+import blob_store
+from database import create_client
+import http_cache
+import images
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / ".env")
+
+COLLECTIONS = ("sliders", "gallery", "menu_categories")
+SETTINGS_COLLECTION = "site_settings"
+# /uploads/... yang belum berada di blobs/
+LEGACY_QUERY = {"image_url": {"$regex": "^/uploads/(?!blobs/)"}}
+
+
+async def _ingest(db, url: str) -> dict | None:
+    path = images.path_for(url)
+    if not path.exists():
+        print(f"⚠️ Missing file for {url}")
+        return None
+    try:
+        return await blob_store.put_file(db, path)
+    except (ValueError, HTTPException) as e:
+        print(f"⚠️ Skipping {url}: {getattr(e, 'detail', e)}")
+        return None
+
+
+async def migrate_story_image(db, dry_run: bool) -> int:
+    doc = await db[SETTINGS_COLLECTION].find_one({}, {"_id": 1, "story.image": 1})
+    image = ((doc or {}).get("story") or {}).get("image") or ""
+    # Story image disimpan sebagai URL penuh (http://host/uploads/...) atau relatif
+    path = urlparse(image).path
+    if not path.startswith("/uploads/") or blob_store.blob_id(path):
+        return 0
+    if dry_run:
+        print(f"🔎 Story image {image} would move to the blob store")
+        return 1
+    stored = await _ingest(db, path)
+    if not stored:
+        return 0
+    result = await db[SETTINGS_COLLECTION].update_one(
+        {"_id": doc["_id"], "story.image": image}, {"$set": {"story.image": stored["image_url"]}}
+    )
+    if not result.matched_count:
+        await blob_store.release(db, stored["image_url"])
+        return 0
+    # File lama tidak dihapus di sini: bisa saja masih dipakai dokumen slider/gallery
+    await http_cache.bump(db, SETTINGS_COLLECTION)
+    return 1
+
+
+async def migrate_collection(db, collection: str, batch_size: int, dry_run: bool) -> int:
+    if dry_run:
+        pending = await db[collection].count_documents(LEGACY_QUERY)
+        print(f"🔎 {collection}: {pending} documents still use legacy uploads")
+        return 0
+    moved = 0
+    last_id = None
+    while True:
+        query = dict(LEGACY_QUERY)
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        batch = await db[collection].find(query, {"_id": 1, "image_url": 1, "image_variants": 1}).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+        for doc in batch:
+            stored = await _ingest(db, doc["image_url"])
+            if not stored:
+                continue
+            result = await db[collection].update_one(
+                {"_id": doc["_id"], "image_url": doc["image_url"]}, {"$set": stored}
+            )
+            if result.matched_count:
+                moved += 1
+                # Release legacy = hapus file lama + turunannya
+                await blob_store.release(db, doc["image_url"], doc.get("image_variants"))
+            else:
+                await blob_store.release(db, stored["image_url"])
+        last_id = batch[-1]["_id"]
+        print(f"… {collection}: {moved} moved")
+    if moved:
+        await http_cache.bump(db, collection)
+    return moved
+
+
+async def main(args):
+    mongo_url = os.getenv("MONGO_URL")
+    db_name = os.getenv("DB_NAME")
+
+    if not mongo_url or not db_name:
+        print("⚠️ MONGO_URL and DB_NAME must be set in .env")
+        return
+
+    client = create_client(mongo_url)
+    db = client[db_name]
+    try:
+        if await migrate_story_image(db, args.dry_run) and not args.dry_run:
+            print("✅ Story image moved to the blob store")
+        for collection in COLLECTIONS:
+            moved = await migrate_collection(db, collection, args.batch, args.dry_run)
+            if not args.dry_run:
+                print(f"✅ {collection}: {moved} documents moved")
+    finally:
+        images.shutdown_image_pool()
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move legacy uploads into the content-addressed blob store")
+    parser.add_argument("--batch", type=int, default=50, help="Documents per batch")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be moved")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,119 @@
+# backend/notifications.py
+"""
+Counter unread yang dimaterialisasi di collection notification_counters:
+- admin:reservations       -> reservasi dengan is_read_by_admin == False
+- admin:messages           -> pesan dengan is_read == False
+- user:<email>:reservations -> reservasi milik user dengan is_read == False
+Counter di-$inc di operasi yang sama yang membalik flag is_read/is_read_by_admin
+atau meng-insert dokumen baru, sehingga badge cukup dibaca dari satu find.
+rebuild_counters() menghitung ulang semuanya lewat aggregation jika drift.
+"""
+from pymongo import UpdateOne
+import logging
+
+logger = logging.getLogger(__name__)
+
+COUNTERS_COLLECTION = "notification_counters"
+RESERVATIONS_COLLECTION = "reservations"
+MESSAGES_COLLECTION = "messages"
+
+ADMIN_RESERVATIONS = "admin:reservations"
+ADMIN_MESSAGES = "admin:messages"
+
+
+def user_reservations_key(email: str) -> str:
+    return f"user:{email}:reservations"
+
+
+async def bump(db, key: str, delta: int):
+    if not delta:
+        return
+    await db[COUNTERS_COLLECTION].update_one({"_id": key}, {"$inc": {"count": delta}}, upsert=True)
+
+
+def _flipped(before: dict | None, after: dict | None, field: str) -> int:
+    """+1 if `field` became unread (False), -1 if it stopped being unread, else 0."""
+    was_unread = bool(before) and before.get(field) is False
+    is_unread = bool(after) and after.get(field) is False
+    return int(is_unread) - int(was_unread)
+
+
+async def track_reservation(db, before: dict | None, after: dict | None):
+    """Apply counter deltas for a reservation change (insert: before=None, delete: after=None)."""
+    await bump(db, ADMIN_RESERVATIONS, _flipped(before, after, "is_read_by_admin"))
+    email = (after or before or {}).get("user_email")
+    if email:
+        await bump(db, user_reservations_key(email), _flipped(before, after, "is_read"))
+
+
+async def track_reservations_bulk(db, changes: list):
+    """Counter deltas for many (before, after) reservation pairs in one bulk_write."""
+    deltas = {}
+    for before, after in changes:
+        deltas[ADMIN_RESERVATIONS] = deltas.get(ADMIN_RESERVATIONS, 0) + _flipped(before, after, "is_read_by_admin")
+        email = (after or before or {}).get("user_email")
+        if email:
+            key = user_reservations_key(email)
+            deltas[key] = deltas.get(key, 0) + _flipped(before, after, "is_read")
+    ops = [UpdateOne({"_id": key}, {"$inc": {"count": delta}}, upsert=True) for key, delta in deltas.items() if delta]
+    if ops:
+        await db[COUNTERS_COLLECTION].bulk_write(ops, ordered=False)
+
+
+async def track_message(db, before: dict | None, after: dict | None):
+    await bump(db, ADMIN_MESSAGES, _flipped(before, after, "is_read"))
+
+
+async def get_count(db, key: str) -> int:
+    doc = await db[COUNTERS_COLLECTION].find_one({"_id": key})
+    return max((doc or {}).get("count", 0), 0)
+
+
+async def get_counts(db, email: str, is_admin: bool) -> dict:
+    keys = [user_reservations_key(email)]
+    if is_admin:
+        keys += [ADMIN_RESERVATIONS, ADMIN_MESSAGES]
+    found = {
+        doc["_id"]: max(doc.get("count", 0), 0)
+        async for doc in db[COUNTERS_COLLECTION].find({"_id": {"$in": keys}})
+    }
+    counts = {"reservations": found.get(keys[0], 0)}
+    if is_admin:
+        counts["admin"] = {
+            "reservations": found.get(ADMIN_RESERVATIONS, 0),
+            "messages": found.get(ADMIN_MESSAGES, 0),
+        }
+    return counts
+
+
+async def rebuild_counters(db) -> dict:
+    """Normalize legacy read flags and recompute every counter from scratch.
+
+    Reservations created before the flags existed count as read (that is how
+    the old mark-all-read treated them), so the missing flags are filled in
+    first. Not atomic with concurrent writes; run it when traffic is quiet.
+    """
+    await db[RESERVATIONS_COLLECTION].update_many({"is_read": {"$exists": False}}, {"$set": {"is_read": True}})
+    await db[RESERVATIONS_COLLECTION].update_many({"is_read_by_admin": {"$exists": False}}, {"$set": {"is_read_by_admin": True}})
+
+    await db[COUNTERS_COLLECTION].update_many({}, {"$set": {"count": 0}})
+    await db[RESERVATIONS_COLLECTION].aggregate([
+        {"$match": {"is_read": False, "user_email": {"$type": "string"}}},
+        {"$group": {"_id": {"$concat": ["user:", "$user_email", ":reservations"]}, "count": {"$sum": 1}}},
+        {"$merge": {"into": COUNTERS_COLLECTION, "whenMatched": "replace", "whenNotMatched": "insert"}},
+    ]).to_list(None)
+
+    admin_reservations = await db[RESERVATIONS_COLLECTION].count_documents({"is_read_by_admin": False})
+    admin_messages = await db[MESSAGES_COLLECTION].count_documents({"is_read": False})
+    for key, count in ((ADMIN_RESERVATIONS, admin_reservations), (ADMIN_MESSAGES, admin_messages)):
+        await db[COUNTERS_COLLECTION].update_one({"_id": key}, {"$set": {"count": count}}, upsert=True)
+
+    users = await db[COUNTERS_COLLECTION].count_documents({"_id": {"$regex": "^user:"}, "count": {"$gt": 0}})
+    logger.info(f"🔔 Notification counters rebuilt ({users} users with unread reservations)")
+    return {"admin_reservations": admin_reservations, "admin_messages": admin_messages, "users_with_unread": users}
+
+
+async def ensure_counters(db):
+    """Build the counters on first start (empty collection)."""
+    if await db[COUNTERS_COLLECTION].estimated_document_count() == 0:
+        await rebuild_counters(db)
@@ -0,0 +1,78 @@
+# backend/pagination.py
+"""
+Keyset (cursor) pagination helpers.
+Halaman berikutnya dicari dengan filter "lebih kecil dari baris terakhir" pada
+field sort (mis. created_at, id) sehingga biayanya sama di halaman mana pun,
+tidak seperti skip() yang harus melewati semua baris sebelumnya.
+"""
+import base64
+from bson import ObjectId, json_util
+from datetime import datetime
+from fastapi import HTTPException
+from cache import TTLCache
+
+# Nilai sort yang boleh ada di cursor; dict/list ({"$ne": ...}) akan menjadi operator di keyset_filter
+CURSOR_VALUE_TYPES = (str, int, float, datetime, ObjectId)
+
+
+def encode_cursor(doc: dict, fields: list) -> str:
+    """Opaque continuation token holding the sort values of the last row."""
+    raw = json_util.dumps([doc.get(field) for field in fields])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str, fields: list) -> list:
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json_util.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != len(fields):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not all(isinstance(value, CURSOR_VALUE_TYPES) for value in values):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def keyset_filter(fields: list, values: list, direction: int = -1) -> dict:
+    """Filter matching rows strictly after `values` in (fields...) order.
+
+    For (created_at, id) descending this is:
+    created_at < v0 OR (created_at == v0 AND id < v1)
+    """
+    op = "$lt" if direction < 0 else "$gt"
+    clauses = []
+    for i, field in enumerate(fields):
+        clause = {fields[j]: values[j] for j in range(i)}
+        clause[field] = {op: values[i]}
+        clauses.append(clause)
+    return {"$or": clauses}
+
+
+async def fetch_page(collection, query: dict, fields: list, limit: int, cursor: str | None = None,
+                     direction: int = -1, projection: dict | None = None):
+    """Return (items, next_cursor) for one keyset page of `collection`."""
+    if cursor:
+        query = {"$and": [query, keyset_filter(fields, decode_cursor(cursor, fields), direction)]}
+    sort = [(field, direction) for field in fields]
+    # Ambil satu baris ekstra untuk tahu apakah masih ada halaman berikutnya
+    docs = await collection.find(query, projection or {"_id": 0}).sort(sort).limit(limit + 1).to_list(limit + 1)
+    next_cursor = encode_cursor(docs[limit - 1], fields) if len(docs) > limit else None
+    return docs[:limit], next_cursor
+
+
+# count_documents atas filter yang sama di-cache sebentar, bukan dihitung tiap halaman
+COUNT_CACHE_TTL = 30
+_count_cache = TTLCache(maxsize=512, ttl=COUNT_CACHE_TTL)
+
+
+async def cached_count(collection, query: dict) -> int:
+    """Total for `query`: estimated for the whole collection, otherwise cached for a short time."""
+    if not query:
+        return await collection.estimated_document_count()
+    key = (collection.name, json_util.dumps(query, sort_keys=True))
+    total = _count_cache.get(key)
+    if total is None:
+        total = await collection.count_documents(query)
+        _count_cache.set(key, total)
+    return total
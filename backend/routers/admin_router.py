@@ -0,0 +1,134 @@
+# routers/admin_router.py
+from fastapi import APIRouter, Request, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from datetime import datetime, date, timedelta
+from auth import require_admin, auth_cache_stats, password_pool_stats
+from database import pool_statistics
+from indexes import index_drift, ensure_indexes
+import analytics
+import availability
+import exports
+from events import hub as event_hub
+import notifications
+from email_dispatcher import dispatcher as email_dispatcher
+from scheduler import scheduler
+import menu_snapshot
+import http_cache
+import images
+import blob_store
+
+router = APIRouter(prefix="/api/admin", tags=["Admin"])
+
+
+@router.get("/metrics")
+async def get_metrics(request: Request, admin: dict = Depends(require_admin)):
+    """Runtime counters for the shared pools and caches of this worker"""
+    return {
+        "mongo_pool": pool_statistics(),
+        "auth_cache": auth_cache_stats(),
+        "password_pool": password_pool_stats(),
+        "email": email_dispatcher.stats(),
+        "events": event_hub.stats(),
+        "scheduler": scheduler.stats(),
+        "menu_snapshot": menu_snapshot.stats(),
+        "http_cache": http_cache.stats(),
+        "image_pool": images.pool_stats(),
+        "blobs": blob_store.stats(),
+    }
+
+
+@router.get("/indexes")
+async def get_index_drift(request: Request, admin: dict = Depends(require_admin)):
+    """Declared vs actual indexes per collection (missing / mismatched / extra)"""
+    db = request.app.state.db
+    return await index_drift(db, request.app.state.index_declarations)
+
+
+@router.post("/indexes/sync")
+async def sync_indexes(request: Request, admin: dict = Depends(require_admin)):
+    """Create any declared index that is missing, then report the remaining drift"""
+    db = request.app.state.db
+    report = await ensure_indexes(db, request.app.state.index_declarations)
+    request.app.state.index_report = report
+    return report
+
+
+@router.post("/availability/rebuild")
+async def rebuild_availability(request: Request, admin: dict = Depends(require_admin)):
+    """Recompute reservation slot counters from the reservations collection"""
+    db = request.app.state.db
+    slots = await availability.rebuild_slot_counters(db)
+    return {"slots_in_use": slots}
+
+
+@router.post("/notifications/rebuild")
+async def rebuild_notification_counters(request: Request, admin: dict = Depends(require_admin)):
+    """Recompute unread counters from reservations and messages (repair job)"""
+    db = request.app.state.db
+    return await notifications.rebuild_counters(db)
+
+
+@router.post("/jobs/{name}/run")
+async def run_job_now(request: Request, name: str, admin: dict = Depends(require_admin)):
+    """Run a scheduled job immediately on this worker (ignores the lease)"""
+    job = scheduler.jobs.get(name)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Unknown job '{name}'")
+    if job.running:
+        raise HTTPException(status_code=409, detail=f"Job '{name}' is already running")
+    processed = await scheduler.run_job(request.app.state.db, job)
+    return {"job": name, "processed": processed, **job.stats()}
+
+
+@router.get("/stats")
+async def get_reservation_stats(
+    request: Request,
+    date_from: date | None = Query(None, alias="from", description="First visit day (YYYY-MM-DD), default 30 days ago"),
+    date_to: date | None = Query(None, alias="to", description="Last visit day (YYYY-MM-DD), inclusive, default today"),
+    admin: dict = Depends(require_admin),
+):
+    """Covers per day, guests per slot, confirmation/decline rates and busiest weekdays (from rollups)"""
+    db = request.app.state.db
+    date_to = date_to or datetime.now(availability.WIB).date()
+    date_from = date_from or date_to - timedelta(days=29)
+    return await analytics.stats(db, date_from, date_to)
+
+
+@router.post("/stats/rebuild")
+async def rebuild_reservation_stats(request: Request, admin: dict = Depends(require_admin)):
+    """Recompute the reservation rollups from scratch (repair job)"""
+    db = request.app.state.db
+    return {"buckets": await analytics.rebuild_rollups(db)}
+
+
+@router.get("/export/{dataset}")
+async def export_dataset(
+    request: Request,
+    dataset: str,
+    format: str = Query("csv", description="csv | ndjson"),
+    status: str | None = Query(None, description="Reservation status / user role"),
+    date_from: str | None = Query(None, alias="from", description="Lower bound, inclusive (ISO, naive = WIB)"),
+    date_to: str | None = Query(None, alias="to", description="Upper bound, exclusive (ISO, naive = WIB)"),
+    unread: bool | None = Query(None, description="Only unread (true) or only read (false)"),
+    batch_size: int = Query(exports.EXPORT_BATCH_SIZE, ge=1, le=exports.EXPORT_MAX_BATCH_SIZE),
+    admin: dict = Depends(require_admin),
+):
+    """Stream a whole collection as CSV or NDJSON (reservations | messages | users)"""
+    if dataset not in exports.EXPORTS:
+        raise HTTPException(status_code=404, detail=f"Unknown export '{dataset}'")
+    if format not in exports.FORMATS:
+        raise HTTPException(status_code=400, detail="Format harus csv atau ndjson")
+    query = exports.build_query(
+        dataset,
+        status=status,
+        start=availability.parse_visit_time(date_from) if date_from else None,
+        end=availability.parse_visit_time(date_to) if date_to else None,
+        unread=unread,
+    )
+    db = request.app.state.db
+    filename = f"{dataset}-{datetime.utcnow():%Y%m%d-%H%M%S}.{format}"
+    return StreamingResponse(
+        exports.stream_export(db, dataset, query, format, batch_size),
+        media_type=exports.FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"', "Cache-Control": "no-store"},
+    )
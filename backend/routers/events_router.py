@@ -0,0 +1,72 @@
+# routers/events_router.py
+from fastapi import APIRouter, Request, Query, Header, HTTPException
+from fastapi.responses import StreamingResponse
+import asyncio
+import json
+from auth import get_token_claims
+from events import hub
+
+router = APIRouter(prefix="/api/events", tags=["Events"])
+
+HEARTBEAT_SECONDS = 15
+
+
+def _sse(event_id: str | None, event: str, data: dict) -> str:
+    lines = []
+    if event_id:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+@router.get("/stream")
+async def stream_events(
+    request: Request,
+    token: str | None = Query(None, description="JWT (EventSource cannot send headers)"),
+    last_event_id: str | None = Query(None, description="Resume after this event id"),
+    authorization: str | None = Header(None),
+    last_event_id_header: str | None = Header(None, alias="Last-Event-ID"),
+):
+    """Server-Sent Events: reservation/message deltas scoped to the caller (admin sees all)"""
+    if not token and authorization and authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+    if not token:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    claims = await get_token_claims(request, token)
+    is_admin = claims.get("role") == "admin"
+
+    hub.start(request.app.state.db)
+    sub, replay, resync = hub.subscribe(claims["sub"], is_admin, last_event_id_header or last_event_id)
+
+    async def generate():
+        try:
+            if resync:
+                yield _sse(None, "resync", {"reason": "history_unavailable"})
+            for seq, event in replay:
+                yield _sse(hub.event_id(seq), "delta", event)
+            while True:
+                if await request.is_disconnected():
+                    break
+                try:
+                    seq, event = await asyncio.wait_for(sub.queue.get(), HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                if event is None:
+                    # Hub kehilangan event (mis. history change stream habis): klien refetch penuh
+                    yield _sse(None, "resync", {"reason": sub.resync_reason})
+                    break
+                yield _sse(hub.event_id(seq), "delta", event)
+                if sub.overflowed and sub.queue.empty():
+                    # Klien tertinggal terlalu jauh: minta refetch penuh lalu tutup
+                    yield _sse(None, "resync", {"reason": "too_slow"})
+                    break
+        finally:
+            hub.unsubscribe(sub)
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
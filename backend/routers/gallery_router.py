@@ -1,17 +1,21 @@
 from fastapi import APIRouter, Request, UploadFile, Form, HTTPException
 from fastapi.responses import JSONResponse
-from pathlib import Path
-import shutil, uuid
+import uuid
+from pymongo import IndexModel
+import http_cache
+import blob_store
 
 router = APIRouter(prefix="/api/gallery", tags=["Gallery"])
 
-UPLOAD_DIR = Path("backend/uploads/gallery")
-UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
-
 COLLECTION_NAME = "gallery"
 
+INDEXES = {
+    COLLECTION_NAME: [IndexModel("id", unique=True)],
+}
+
 
 @router.get("/")
+@http_cache.conditional("gallery", COLLECTION_NAME)
 async def get_gallery(request: Request):
     db = request.app.state.db
     docs = await db[COLLECTION_NAME].find({}, {"_id": 0}).to_list(1000)
@@ -19,6 +23,7 @@ async def get_gallery(request: Request):
 
 
 @router.get("/{item_id}")
+@http_cache.conditional("gallery", COLLECTION_NAME)
 async def get_gallery_item(request: Request, item_id: str):
     db = request.app.state.db
     item = await db[COLLECTION_NAME].find_one({"id": item_id}, {"_id": 0})
@@ -29,21 +34,17 @@ async def get_gallery_item(request: Request, item_id: str):
 
 @router.post("/")
 async def create_gallery_item(request: Request, title: str = Form(None), description: str = Form(None), image: UploadFile = None):
-    filename = None
-    if image:
-        filename = f"{uuid.uuid4()}_{image.filename}"
-        file_path = UPLOAD_DIR / filename
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(image.file, buffer)
+    db = request.app.state.db
+    image_fields = await blob_store.put(db, image) if image else dict(blob_store.NO_IMAGE)
 
     item = {
         "id": str(uuid.uuid4()),
         "title": title,
         "description": description,
-        "image_url": f"/uploads/gallery/{filename}" if filename else None,
+        **image_fields,
     }
-    db = request.app.state.db
     await db[COLLECTION_NAME].insert_one(item)
+    await http_cache.bump(db, COLLECTION_NAME)
     created = await db[COLLECTION_NAME].find_one({"id": item["id"]}, {"_id": 0})
     return JSONResponse({"message": "Gallery item added", "data": created})
 
@@ -55,19 +56,22 @@ async def update_gallery_item(request: Request, item_id: str, title: str = Form(
     if not item:
         raise HTTPException(status_code=404, detail="Gallery item not found")
 
-    if image:
-        filename = f"{uuid.uuid4()}_{image.filename}"
-        file_path = UPLOAD_DIR / filename
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(image.file, buffer)
-        item["image_url"] = f"/uploads/gallery/{filename}"
-
+    update = {}
     if title is not None:
-        item["title"] = title
+        update["title"] = title
     if description is not None:
-        item["description"] = description
+        update["description"] = description
+    if image:
+        update.update(await blob_store.put(db, image))
+    if not update:
+        return JSONResponse({"message": "Gallery item updated", "data": item})
 
-    await db[COLLECTION_NAME].update_one({"id": item_id}, {"$set": item})
+    old = await db[COLLECTION_NAME].find_one_and_update({"id": item_id}, {"$set": update}, projection=blob_store.IMAGE_PROJECTION)
+    if image:
+        # The replaced image is released (the new one if the item vanished meanwhile)
+        replaced = old or update
+        await blob_store.release(db, replaced.get("image_url"), replaced.get("image_variants"))
+    await http_cache.bump(db, COLLECTION_NAME)
     updated = await db[COLLECTION_NAME].find_one({"id": item_id}, {"_id": 0})
     return JSONResponse({"message": "Gallery item updated", "data": updated})
 
@@ -75,15 +79,9 @@ async def update_gallery_item(request: Request, item_id: str, title: str = Form(
 @router.delete("/{item_id}")
 async def delete_gallery_item(request: Request, item_id: str):
     db = request.app.state.db
-    item = await db[COLLECTION_NAME].find_one({"id": item_id}, {"_id": 0})
+    item = await db[COLLECTION_NAME].find_one_and_delete({"id": item_id}, projection=blob_store.IMAGE_PROJECTION)
     if not item:
         raise HTTPException(status_code=404, detail="Gallery item not found")
-
-    # delete file if exists
-    if item.get("image_url"):
-        path = Path("backend") / item["image_url"].lstrip("/")
-        if path.exists():
-            path.unlink()
-
-    await db[COLLECTION_NAME].delete_one({"id": item_id})
+    await blob_store.release(db, item.get("image_url"), item.get("image_variants"))
+    await http_cache.bump(db, COLLECTION_NAME)
     return JSONResponse({"message": "Gallery item deleted"})
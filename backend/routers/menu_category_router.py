@@ -1,18 +1,36 @@
 # routers/menu_category_router.py
 from fastapi import APIRouter, Request, UploadFile, Form, HTTPException
 from fastapi.responses import JSONResponse
-from pathlib import Path
-import shutil, uuid, os
+import uuid
+from pymongo import IndexModel
+from pymongo.errors import DuplicateKeyError
+from slugs import slugify, backfill_slugs
+import http_cache
+import blob_store
 
 router = APIRouter(prefix="/api/menu-categories", tags=["Menu Categories"])
 
-UPLOAD_DIR = Path("backend/uploads/menu_categories")
-UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
-
 COLLECTION_NAME = "menu_categories"
 
+INDEXES = {
+    COLLECTION_NAME: [
+        IndexModel("id", unique=True),
+        IndexModel("name"),
+        # Lookup by name = equality on the slug; partial so unmigrated docs don't clash
+        IndexModel("slug", unique=True, partialFilterExpression={"slug": {"$type": "string"}}),
+    ],
+}
+
+
+async def ensure_slugs(db) -> dict:
+    result = await backfill_slugs(db[COLLECTION_NAME], "name", "slug", unique=True)
+    if result["updated"]:
+        await http_cache.bump(db, COLLECTION_NAME)
+    return result
+
 
 @router.get("/")
+@http_cache.conditional("menu", COLLECTION_NAME)
 async def get_categories(request: Request):
     db = request.app.state.db
     docs = await db[COLLECTION_NAME].find({}, {"_id": 0}).to_list(1000)
@@ -20,9 +38,10 @@ async def get_categories(request: Request):
 
 
 @router.get("/{name}/")
+@http_cache.conditional("menu", COLLECTION_NAME)
 async def get_category_by_name(request: Request, name: str):
     db = request.app.state.db
-    doc = await db[COLLECTION_NAME].find_one({"name": {"$regex": f"^{name}$", "$options": "i"}}, {"_id": 0})
+    doc = await db[COLLECTION_NAME].find_one({"slug": slugify(name)}, {"_id": 0})
     if not doc:
         raise HTTPException(status_code=404, detail="Kategori tidak ditemukan")
     return doc
@@ -36,23 +55,24 @@ async def create_category(request: Request,
     image: UploadFile = None,
     menu_link: str = None
 ):
-    filename = None
-    if image:
-        filename = f"{uuid.uuid4()}_{image.filename}"
-        file_path = UPLOAD_DIR / filename
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(image.file, buffer)
-    
+    db = request.app.state.db
+    image_fields = await blob_store.put(db, image) if image else dict(blob_store.NO_IMAGE)
+
     category = {
         "id": str(uuid.uuid4()),
         "title": title,
         "name": name,
+        "slug": slugify(name),
         "description": description,
-        "image_url": f"/uploads/menu_categories/{filename}" if filename else None,
+        **image_fields,
         "menu_link": menu_link,
     }
-    db = request.app.state.db
-    await db[COLLECTION_NAME].insert_one(category)
+    try:
+        await db[COLLECTION_NAME].insert_one(category)
+    except DuplicateKeyError:
+        await blob_store.release(db, image_fields["image_url"])
+        raise HTTPException(status_code=409, detail="Kategori dengan nama ini sudah ada")
+    await http_cache.bump(db, COLLECTION_NAME)
     created = await db[COLLECTION_NAME].find_one({"id": category["id"]}, {"_id": 0})
     return JSONResponse({"message": "Kategori berhasil ditambahkan", "data": created})
 
@@ -67,24 +87,30 @@ async def update_category(request: Request,
     menu_link: str = Form(None)
 ):
     db = request.app.state.db
-    category = await db[COLLECTION_NAME].find_one({"id": category_id}, {"_id": 0})
-    if not category:
+    if not await db[COLLECTION_NAME].count_documents({"id": category_id}, limit=1):
         raise HTTPException(status_code=404, detail="Kategori tidak ditemukan")
 
-    if image:
-        filename = f"{uuid.uuid4()}_{image.filename}"
-        file_path = UPLOAD_DIR / filename
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(image.file, buffer)
-        category["image_url"] = f"/uploads/menu_categories/{filename}"
-
-    category["title"] = title
-    category["name"] = name
-    category["description"] = description
+    update = {
+        "title": title,
+        "name": name,
+        "slug": slugify(name),
+        "description": description,
+    }
     if menu_link is not None:
-        category["menu_link"] = menu_link
+        update["menu_link"] = menu_link
+    if image:
+        update.update(await blob_store.put(db, image))
 
-    await db[COLLECTION_NAME].update_one({"id": category_id}, {"$set": category})
+    try:
+        old = await db[COLLECTION_NAME].find_one_and_update({"id": category_id}, {"$set": update}, projection=blob_store.IMAGE_PROJECTION)
+    except DuplicateKeyError:
+        await blob_store.release(db, update.get("image_url"))
+        raise HTTPException(status_code=409, detail="Kategori dengan nama ini sudah ada")
+    if image:
+        # The replaced image is released (the new one if the category vanished meanwhile)
+        replaced = old or update
+        await blob_store.release(db, replaced.get("image_url"), replaced.get("image_variants"))
+    await http_cache.bump(db, COLLECTION_NAME)
     updated = await db[COLLECTION_NAME].find_one({"id": category_id}, {"_id": 0})
     return JSONResponse({"message": "Kategori berhasil diperbarui", "data": updated})
 
@@ -92,7 +118,9 @@ async def update_category(request: Request,
 @router.delete("/{category_id}")
 async def delete_category(request: Request, category_id: str):
     db = request.app.state.db
-    res = await db[COLLECTION_NAME].delete_one({"id": category_id})
-    if res.deleted_count == 0:
+    doc = await db[COLLECTION_NAME].find_one_and_delete({"id": category_id}, projection=blob_store.IMAGE_PROJECTION)
+    if not doc:
         raise HTTPException(status_code=404, detail="Kategori tidak ditemukan")
+    await blob_store.release(db, doc.get("image_url"), doc.get("image_variants"))
+    await http_cache.bump(db, COLLECTION_NAME)
     return JSONResponse({"message": "Kategori berhasil dihapus"})
@@ -2,18 +2,48 @@ from fastapi import APIRouter, Request, HTTPException, Depends
 from fastapi.responses import JSONResponse
 from typing import List
 import uuid
+from pymongo import IndexModel
 from auth import require_admin
+from slugs import slugify, backfill_category_slugs
+import http_cache
 
 router = APIRouter(prefix="/api/menu-items", tags=["Menu Items"])
 
 COLLECTION = "menu_items"
+CATEGORIES_COLLECTION = "menu_categories"
+
+INDEXES = {
+    COLLECTION: [
+        IndexModel("id", unique=True),
+        IndexModel("category"),
+        IndexModel("category_slug"),
+    ],
+}
+
+
+async def ensure_slugs(db) -> dict:
+    result = await backfill_category_slugs(db[COLLECTION], db[CATEGORIES_COLLECTION])
+    if result["updated"]:
+        await http_cache.bump(db, COLLECTION)
+    return result
+
+
+async def _category_slug(db, category: str) -> str:
+    """Stored slug of the category given by name or slug (a backfill clash may have suffixed it, e.g. coffee-2)."""
+    # Nama persis dulu: "coffee" bisa nama kategori bersufiks sekaligus slug kategori "Coffee"
+    for query in ({"name": category}, {"slug": category}):
+        doc = await db[CATEGORIES_COLLECTION].find_one(query, {"_id": 0, "slug": 1})
+        if doc and doc.get("slug"):
+            return doc["slug"]
+    return slugify(category)
 
 
 @router.get("/{category}/")
+@http_cache.conditional("menu", COLLECTION, CATEGORIES_COLLECTION)
 async def get_items_by_category(request: Request, category: str):
     db = request.app.state.db
-    # match category case-insensitively
-    docs = await db[COLLECTION].find({"category": {"$regex": f"^{category}$", "$options": "i"}}, {"_id": 0}).to_list(1000)
+    # match category case-insensitively (equality on the indexed slug)
+    docs = await db[COLLECTION].find({"category_slug": await _category_slug(db, category)}, {"_id": 0}).to_list(1000)
     return docs
 
 
@@ -34,9 +64,11 @@ async def create_item(request: Request, payload: dict, admin=Depends(require_adm
         "description": description,
         "price": float(price) if price is not None else None,
         "category": category,
+        "category_slug": await _category_slug(db, category),
     }
 
     await db[COLLECTION].insert_one(item)
+    await http_cache.bump(db, COLLECTION)
     created = await db[COLLECTION].find_one({"id": item["id"]}, {"_id": 0})
     return JSONResponse({"message": "Menu item created", "data": created})
 
@@ -54,8 +86,11 @@ async def update_item(request: Request, item_id: str, payload: dict, admin=Depen
             update[k] = payload[k]
     if "price" in update and update["price"] is not None:
         update["price"] = float(update["price"])
+    if "category" in update:
+        update["category_slug"] = await _category_slug(db, update["category"])
 
     await db[COLLECTION].update_one({"id": item_id}, {"$set": update})
+    await http_cache.bump(db, COLLECTION)
     updated = await db[COLLECTION].find_one({"id": item_id}, {"_id": 0})
     return JSONResponse({"message": "Menu item updated", "data": updated})
 
@@ -66,4 +101,5 @@ async def delete_item(request: Request, item_id: str, admin=Depends(require_admi
     res = await db[COLLECTION].delete_one({"id": item_id})
     if res.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Item not found")
+    await http_cache.bump(db, COLLECTION)
     return JSONResponse({"message": "Menu item deleted"})
@@ -0,0 +1,26 @@
+# routers/menu_router.py
+from fastapi import APIRouter, Request, Response, Header
+from email.utils import format_datetime
+import http_cache
+import menu_snapshot
+
+router = APIRouter(prefix="/api/menu", tags=["Menu"])
+
+CACHE_CONTROL = http_cache.cache_policy("menu")
+
+
+@router.get("")
+@router.get("/")
+async def get_menu(request: Request, if_none_match: str | None = Header(None)):
+    """Semua kategori beserta item-nya dalam satu dokumen (snapshot + ETag)"""
+    db = request.app.state.db
+    body, etag = await menu_snapshot.get_snapshot(db)
+    last_modified = http_cache.versions.last_modified(menu_snapshot.MENU_COLLECTIONS)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": format_datetime(last_modified, usegmt=True),
+        "Cache-Control": CACHE_CONTROL,
+    }
+    if http_cache.etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
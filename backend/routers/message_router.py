@@ -1,14 +1,45 @@
 # routers/message_router.py
-from fastapi import APIRouter, Request, HTTPException
+from fastapi import APIRouter, Request, HTTPException, Query
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel, EmailStr
 from datetime import datetime, timezone
 import uuid
+from pymongo import IndexModel, ASCENDING, DESCENDING, TEXT, ReturnDocument
+from pagination import fetch_page, cached_count
+import notifications
 
 router = APIRouter(prefix="/api/messages", tags=["Messages"])
 
 COLLECTION_NAME = "messages"
 
+INDEXES = {
+    COLLECTION_NAME: [
+        IndexModel("id", unique=True),
+        # Inbox keyset (created_at, id), all and unread-only
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING)]),
+        IndexModel([("is_read", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], name="unread_inbox", partialFilterExpression={"is_read": False}),
+        # Pencarian; tanpa stemming bahasa Inggris karena pesan kebanyakan berbahasa Indonesia
+        IndexModel([("subject", TEXT), ("message", TEXT)], name="message_search", weights={"subject": 3, "message": 1}, default_language="none"),
+        IndexModel("updated_at"),
+    ],
+}
+
+# Keyset pagination order for the inbox (newest first)
+PAGE_FIELDS = ["created_at", "id"]
+SNIPPET_LENGTH = 140
+
+# Inbox rows carry a snippet instead of the body (body: GET /api/messages/{id})
+LIST_PROJECTION = {
+    "_id": 0,
+    "id": 1,
+    "name": 1,
+    "email": 1,
+    "subject": 1,
+    "is_read": 1,
+    "created_at": 1,
+    "snippet": {"$substrCP": [{"$ifNull": ["$message", ""]}, 0, SNIPPET_LENGTH]},
+}
+
 
 class MessageCreate(BaseModel):
     name: str
@@ -34,10 +65,12 @@ async def create_message(request: Request, message_data: MessageCreate):
         "message": message_data.message,
         "is_read": False,
         "created_at": datetime.now(timezone.utc).isoformat(),
+        "updated_at": datetime.utcnow(),
     }
     
     await db[COLLECTION_NAME].insert_one(message)
-    created = await db[COLLECTION_NAME].find_one({"id": message["id"]}, {"_id": 0})
+    await notifications.track_message(db, None, message)
+    created = await db[COLLECTION_NAME].find_one({"id": message["id"]}, {"_id": 0, "updated_at": 0})
     
     return JSONResponse({
         "message": "Pesan berhasil dikirim",
@@ -46,37 +79,69 @@ async def create_message(request: Request, message_data: MessageCreate):
 
 
 @router.get("/")
-async def get_all_messages(request: Request, unread_only: bool = False):
-    """Admin melihat semua pesan"""
+async def get_all_messages(
+    request: Request,
+    unread_only: bool = False,
+    q: str | None = Query(None, description="Cari di subjek/isi pesan"),
+    cursor: str | None = Query(None, description="Continuation token from next_cursor"),
+    limit: int = Query(50, ge=1, le=200),
+):
+    """Admin melihat pesan (terbaru dulu, per halaman, tanpa isi pesan)"""
     db = request.app.state.db
     
     query = {}
     if unread_only:
         query["is_read"] = False
+    if q:
+        query["$text"] = {"$search": q}
+    
+    messages, next_cursor = await fetch_page(
+        db[COLLECTION_NAME], query, PAGE_FIELDS, limit, cursor, projection=LIST_PROJECTION
+    )
     
-    messages = await db[COLLECTION_NAME].find(query, {"_id": 0}).sort("created_at", -1).to_list(1000)
+    # Jumlah unread dibaca dari counter yang dimaterialisasi, sisanya dari index
+    unread = await notifications.get_count(db, notifications.ADMIN_MESSAGES)
+    if unread_only and not q:
+        total = unread
+    else:
+        total = await cached_count(db[COLLECTION_NAME], query)
     
     return {
-        "total": len(messages),
-        "messages": messages
+        "total": total,
+        "unread": unread,
+        "messages": messages,
+        "next_cursor": next_cursor,
     }
 
 
-@router.patch("/{message_id}/read")
-async def mark_message_as_read(request: Request, message_id: str):
-    """Admin menandai pesan sebagai sudah dibaca"""
+@router.get("/{message_id}")
+async def get_message(request: Request, message_id: str):
+    """Admin membuka satu pesan lengkap"""
     db = request.app.state.db
     
-    message = await db[COLLECTION_NAME].find_one({"id": message_id})
+    message = await db[COLLECTION_NAME].find_one({"id": message_id}, {"_id": 0, "updated_at": 0})
     if not message:
         raise HTTPException(status_code=404, detail="Pesan tidak ditemukan")
     
-    await db[COLLECTION_NAME].update_one(
+    return message
+
+
+@router.patch("/{message_id}/read")
+async def mark_message_as_read(request: Request, message_id: str):
+    """Admin menandai pesan sebagai sudah dibaca"""
+    db = request.app.state.db
+    
+    before = await db[COLLECTION_NAME].find_one_and_update(
         {"id": message_id},
-        {"$set": {"is_read": True}}
+        {"$set": {"is_read": True, "updated_at": datetime.utcnow()}},
+        projection={"_id": 0, "updated_at": 0},
+        return_document=ReturnDocument.BEFORE,
     )
+    if not before:
+        raise HTTPException(status_code=404, detail="Pesan tidak ditemukan")
     
-    updated = await db[COLLECTION_NAME].find_one({"id": message_id}, {"_id": 0})
+    updated = {**before, "is_read": True}
+    await notifications.track_message(db, before, updated)
     
     return JSONResponse({
         "message": "Pesan ditandai sebagai dibaca",
@@ -89,9 +154,10 @@ async def delete_message(request: Request, message_id: str):
     """Admin menghapus pesan"""
     db = request.app.state.db
     
-    result = await db[COLLECTION_NAME].delete_one({"id": message_id})
+    deleted = await db[COLLECTION_NAME].find_one_and_delete({"id": message_id}, projection={"is_read": 1})
     
-    if result.deleted_count == 0:
+    if not deleted:
         raise HTTPException(status_code=404, detail="Pesan tidak ditemukan")
+    await notifications.track_message(db, deleted, None)
     
     return JSONResponse({"message": "Pesan berhasil dihapus"})
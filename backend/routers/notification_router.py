@@ -0,0 +1,13 @@
+# routers/notification_router.py
+from fastapi import APIRouter, Request, Depends
+from auth import get_token_claims
+import notifications
+
+router = APIRouter(prefix="/api/notifications", tags=["Notifications"])
+
+
+@router.get("/counts")
+async def get_notification_counts(request: Request, claims: dict = Depends(get_token_claims)):
+    """Unread badge counts from the materialized counters (one indexed lookup)"""
+    db = request.app.state.db
+    return await notifications.get_counts(db, claims["sub"], claims.get("role") == "admin")
@@ -1,16 +1,91 @@
-from fastapi import APIRouter, Request, HTTPException, Depends, Query
+from fastapi import APIRouter, Request, Response, HTTPException, Depends, Query
 from pydantic import BaseModel, Field
 from typing import List
-from datetime import datetime
+from datetime import datetime, date, timedelta
+from pymongo import ReturnDocument, IndexModel, ASCENDING, DESCENDING, UpdateOne, DeleteOne
+import asyncio
+import logging
+import os
+import time
 import uuid
 from auth import get_user_from_token, require_admin
-from email_service import send_reservation_confirmation_email
+from email_service import send_reservation_confirmation_email, send_reservation_reminder_email
+from whatsapp_service import (
+    WHATSAPP_NOTIFY_ENABLED,
+    send_whatsapp_batch,
+    format_reservation_approved_message,
+    format_reservation_declined_message,
+    format_reservation_reminder_message,
+)
+from pagination import fetch_page, cached_count
+import analytics
+import availability
+import notifications
+from scheduler import SCHEDULER_JOB_BUDGET_SECONDS
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/reservations", tags=["reservations"])
 
 # Mongo-backed reservations collection (uses app.state.db)
 COLLECTION_NAME = "reservations"
 
+INDEXES = {
+    COLLECTION_NAME: [
+        IndexModel("id", unique=True),
+        # list_my_reservations: filter user_email (+status), sort created_at desc
+        IndexModel([("user_email", ASCENDING), ("status", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)]),
+        IndexModel([("user_email", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)]),
+        # Admin list: keyset on (created_at, id), optionally filtered by status
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING)]),
+        IndexModel([("status", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)]),
+        # Visit date ranges (?from=&to=), ascending by visit time
+        IndexModel([("date", ASCENDING), ("id", ASCENDING)]),
+        IndexModel([("status", ASCENDING), ("date", ASCENDING), ("id", ASCENDING)]),
+        # Unread badges only ever look at the (small) unread subset
+        IndexModel([("user_email", ASCENDING), ("is_read", ASCENDING)], name="unread_by_user", partialFilterExpression={"is_read": False}),
+        IndexModel([("is_read_by_admin", ASCENDING), ("created_at", DESCENDING)], name="unread_by_admin", partialFilterExpression={"is_read_by_admin": False}),
+        # Event polling fallback (standalone mongod) tails on updated_at
+        IndexModel("updated_at"),
+    ],
+}
+
+# Keyset pagination order for listings (newest first)
+PAGE_FIELDS = ["created_at", "id"]
+# Order for visit date range queries (earliest visit first)
+VISIT_PAGE_FIELDS = ["date", "id"]
+
+# Stored as BSON dates (naive UTC when read back), sent to clients as ISO UTC
+DATETIME_FIELDS = ("date", "slot_at", "created_at", "updated_at")
+
+# Allowed status transitions: current status -> statuses it may move to
+ALLOWED_TRANSITIONS = {
+    "pending": {"confirmed", "declined", "cancelled"},
+    "confirmed": {"cancelled"},
+}
+
+# Bulk admin actions
+BULK_MAX_IDS = 500
+RESERVATION_NOTIFY_CONCURRENCY = int(os.getenv("RESERVATION_NOTIFY_CONCURRENCY", "4"))
+
+# Lifecycle jobs (run by the scheduler leader)
+RESERVATION_PENDING_TTL_HOURS = int(os.getenv("RESERVATION_PENDING_TTL_HOURS", "24"))
+RESERVATION_EXPIRY_BATCH = int(os.getenv("RESERVATION_EXPIRY_BATCH", "500"))
+RESERVATION_EXPIRY_MAX_SWEEPS = 20
+RESERVATION_REMINDER_LEAD_HOURS = int(os.getenv("RESERVATION_REMINDER_LEAD_HOURS", "24"))
+RESERVATION_REMINDER_BATCH = int(os.getenv("RESERVATION_REMINDER_BATCH", "100"))
+RESERVATION_REMINDER_WA_PER_SECOND = float(os.getenv("RESERVATION_REMINDER_WA_PER_SECOND", "1"))
+# WhatsApp reminders are rate limited: one run must finish well inside the scheduler job budget
+# (the rest is picked up by the next run)
+if WHATSAPP_NOTIFY_ENABLED:
+    RESERVATION_REMINDER_BATCH = min(
+        RESERVATION_REMINDER_BATCH,
+        max(1, int(SCHEDULER_JOB_BUDGET_SECONDS * RESERVATION_REMINDER_WA_PER_SECOND / 2)),
+    )
+
+# Notification jobs still running (keeps a reference so they are not garbage collected)
+_notify_tasks = set()
+
 
 class ReservationCreate(BaseModel):
     name: str
@@ -26,150 +101,604 @@ class Reservation(ReservationCreate):
     user_email: str | None = None
     is_read: bool = False  # Track if user has read the status update
     is_read_by_admin: bool = False  # Track if admin has read the reservation
+    slot: str | None = None  # Capacity slot key (WIB), e.g. "2025-01-05T10:00"
+    slot_at: datetime | None = None  # Slot start (UTC)
+    version: int = 0  # Bumped on every status change (optimistic concurrency)
+
+
+class BulkIds(BaseModel):
+    ids: List[str] = Field(..., min_length=1, max_length=BULK_MAX_IDS)
+
+
+def public(doc: dict) -> dict:
+    """Reservation as returned to clients: datetimes as ISO strings with a Z suffix."""
+    out = dict(doc)
+    for field in DATETIME_FIELDS:
+        value = out.get(field)
+        if isinstance(value, datetime):
+            out[field] = availability.to_utc(value).isoformat(timespec="milliseconds") + "Z"
+    return out
+
+
+def _after(before: dict, set_fields: dict, version_inc: int = 0) -> dict:
+    """The document as it is after `$set` (used with ReturnDocument.BEFORE)."""
+    after = {**before, **set_fields}
+    if version_inc:
+        after["version"] = before.get("version", 0) + version_inc
+    return after
+
+
+def _version_filter(expected_version: int) -> dict:
+    # Documents created before the version field existed count as version 0
+    if expected_version == 0:
+        return {"$or": [{"version": 0}, {"version": {"$exists": False}}]}
+    return {"version": expected_version}
+
+
+async def transition_reservation(
+    db,
+    reservation_id: str,
+    target: str,
+    user_email: str | None = None,
+    expected_version: int | None = None,
+    extra_set: dict | None = None,
+):
+    """Move a reservation to `target` in one conditional find_one_and_update.
+
+    Returns (document, changed). A reservation already in `target` is
+    returned unchanged; any other disallowed transition raises 409.
+    """
+    sources = [status for status, targets in ALLOWED_TRANSITIONS.items() if target in targets]
+    query = {"id": reservation_id, "status": {"$in": sources}}
+    if user_email is not None:
+        query["user_email"] = user_email
+    if expected_version is not None:
+        query.update(_version_filter(expected_version))
+
+    set_fields = {**(extra_set or {}), "status": target, "updated_at": datetime.utcnow()}
+    # BEFORE image tells us which read flags actually flipped (for the counters)
+    before = await db[COLLECTION_NAME].find_one_and_update(
+        query,
+        {"$set": set_fields, "$inc": {"version": 1}},
+        projection={"_id": 0},
+        return_document=ReturnDocument.BEFORE,
+    )
+    if before:
+        updated = _after(before, set_fields, version_inc=1)
+        await notifications.track_reservation(db, before, updated)
+        await analytics.track_reservation(db, before, updated)
+        if target not in availability.HOLDING_STATUSES:
+            await availability.release_seats(db, updated.get("slot"), updated.get("guests", 0))
+        return updated, True
+
+    # Slow path only when nothing matched: work out why for the error response
+    existing = await db[COLLECTION_NAME].find_one({"id": reservation_id}, {"_id": 0})
+    if not existing:
+        raise HTTPException(status_code=404, detail="Reservation not found")
+    if user_email is not None and existing.get("user_email") != user_email:
+        raise HTTPException(status_code=403, detail="Not your reservation")
+    if expected_version is not None and existing.get("version", 0) != expected_version:
+        raise HTTPException(status_code=409, detail="Reservation was modified by someone else, reload and try again")
+    if existing.get("status") == target:
+        return existing, False
+    raise HTTPException(
+        status_code=409,
+        detail=f"Cannot change reservation from '{existing.get('status')}' to '{target}'",
+    )
+
+
+# === Bulk admin actions ===
+def _now_ms() -> datetime:
+    # Mongo stores datetimes with millisecond precision; truncate so the value
+    # written can be matched exactly when re-reading a partially applied batch
+    now = datetime.utcnow()
+    return now.replace(microsecond=now.microsecond // 1000 * 1000)
+
+
+async def _bulk_transition(db, ids: List[str], target: str, extra_set: dict | None = None):
+    """Apply one status transition to many reservations with a single bulk_write.
+
+    Returns (results, changed_docs). Every id gets one result with status
+    updated | unchanged | not_found | conflict.
+    """
+    ids = list(dict.fromkeys(ids))
+    sources = {status for status, targets in ALLOWED_TRANSITIONS.items() if target in targets}
+    existing = {
+        doc["id"]: doc
+        async for doc in db[COLLECTION_NAME].find({"id": {"$in": ids}}, {"_id": 0})
+    }
+
+    set_fields = {**(extra_set or {}), "status": target, "updated_at": _now_ms()}
+    results = {}
+    ops, candidates = [], []
+    for reservation_id in ids:
+        doc = existing.get(reservation_id)
+        if not doc:
+            results[reservation_id] = {"id": reservation_id, "status": "not_found"}
+        elif doc.get("status") == target:
+            results[reservation_id] = {"id": reservation_id, "status": "unchanged"}
+        elif doc.get("status") not in sources:
+            results[reservation_id] = {
+                "id": reservation_id,
+                "status": "conflict",
+                "detail": f"Cannot change reservation from '{doc.get('status')}' to '{target}'",
+            }
+        else:
+            # Same guard as transition_reservation: only if nobody changed it since we read it
+            query = {"id": reservation_id, "status": doc["status"], **_version_filter(doc.get("version", 0))}
+            ops.append(UpdateOne(query, {"$set": set_fields, "$inc": {"version": 1}}))
+            candidates.append(doc)
+
+    applied = candidates
+    if ops:
+        result = await db[COLLECTION_NAME].bulk_write(ops, ordered=False)
+        if result.modified_count < len(ops):
+            # Some were changed concurrently: the ones carrying our updated_at are ours
+            ours = {
+                doc["id"]
+                async for doc in db[COLLECTION_NAME].find(
+                    {"id": {"$in": [d["id"] for d in candidates]}, "status": target, "updated_at": set_fields["updated_at"]},
+                    {"_id": 0, "id": 1},
+                )
+            }
+            applied = [d for d in candidates if d["id"] in ours]
+
+    changes = []
+    applied_ids = {d["id"] for d in applied}
+    for before in candidates:
+        if before["id"] not in applied_ids:
+            results[before["id"]] = {
+                "id": before["id"],
+                "status": "conflict",
+                "detail": "Reservation was modified by someone else, reload and try again",
+            }
+            continue
+        updated = _after(before, set_fields, version_inc=1)
+        changes.append((before, updated))
+        results[before["id"]] = {"id": before["id"], "status": "updated", "reservation": public(updated)}
+
+    if changes:
+        await notifications.track_reservations_bulk(db, changes)
+        await analytics.track_reservations_bulk(db, changes)
+        if target not in availability.HOLDING_STATUSES:
+            await availability.release_seats_bulk(db, [(u.get("slot"), u.get("guests", 0)) for _, u in changes])
+    return [results[reservation_id] for reservation_id in ids], [public(updated) for _, updated in changes]
+
+
+def _bulk_response(results: list) -> dict:
+    summary = {}
+    for item in results:
+        summary[item["status"]] = summary.get(item["status"], 0) + 1
+    return {"results": results, "summary": summary}
+
+
+def _whatsapp_text(target: str, doc: dict) -> str | None:
+    try:
+        visit = availability.parse_visit_time(doc.get("date"))
+    except HTTPException:
+        return None
+    day, time = visit.strftime("%d/%m/%Y"), visit.strftime("%H:%M")
+    if target == "confirmed":
+        return format_reservation_approved_message(doc.get("name", ""), day, time, doc.get("guests", 0))
+    if target == "reminder":
+        return format_reservation_reminder_message(doc.get("name", ""), day, time, doc.get("guests", 0))
+    return format_reservation_declined_message(doc.get("name", ""), day, time)
+
+
+async def _notify_batch(target: str, docs: list):
+    """One background job per bulk action: queue emails, then send WhatsApp with bounded concurrency."""
+    try:
+        if target == "confirmed":
+            queued = sum(
+                1 for doc in docs
+                if doc.get("user_email") and send_reservation_confirmation_email(doc["user_email"], doc)
+            )
+            logger.info(f"📧 Bulk confirm: {queued} confirmation emails queued")
+        if WHATSAPP_NOTIFY_ENABLED:
+            messages = [
+                (doc["phone"], text) for doc in docs
+                if doc.get("phone") and (text := _whatsapp_text(target, doc))
+            ]
+            sent = await send_whatsapp_batch(messages, RESERVATION_NOTIFY_CONCURRENCY)
+            logger.info(f"📱 Bulk {target}: {sent}/{len(messages)} WhatsApp messages sent")
+    except Exception as e:
+        logger.error(f"❌ Bulk {target} notifications failed: {e}")
+
+
+def _schedule_notifications(target: str, docs: list):
+    if not docs:
+        return
+    task = asyncio.create_task(_notify_batch(target, docs))
+    _notify_tasks.add(task)
+    task.add_done_callback(_notify_tasks.discard)
+
+
+# === Lifecycle jobs ===
+async def expire_stale_reservations(db) -> int:
+    """Cancel pending reservations older than the TTL (or whose visit already passed).
+
+    Works in sweeps of RESERVATION_EXPIRY_BATCH: one find for the batch, one
+    update_many for the transition, then batched counter/seat/rollup updates.
+    """
+    expired = 0
+    deadline = time.monotonic() + SCHEDULER_JOB_BUDGET_SECONDS / 2
+    for _ in range(RESERVATION_EXPIRY_MAX_SWEEPS):
+        if time.monotonic() > deadline:
+            # Leave the rest for the next run so the scheduler never cancels a sweep halfway
+            break
+        now = _now_ms()
+        stale = {
+            "status": "pending",
+            "$or": [
+                {"created_at": {"$lt": now - timedelta(hours=RESERVATION_PENDING_TTL_HOURS)}},
+                {"date": {"$lt": now}},
+            ],
+        }
+        batch = await db[COLLECTION_NAME].find(stale, {"_id": 0}).limit(RESERVATION_EXPIRY_BATCH).to_list(RESERVATION_EXPIRY_BATCH)
+        if not batch:
+            break
+        ids = [doc["id"] for doc in batch]
+        set_fields = {"status": "cancelled", "cancel_reason": "expired", "is_read": False, "updated_at": now}
+        result = await db[COLLECTION_NAME].update_many(
+            {"id": {"$in": ids}, "status": "pending"},
+            {"$set": set_fields, "$inc": {"version": 1}},
+        )
+        applied = batch
+        if result.modified_count < len(batch):
+            # Admin/user touched some of them in between: keep only the ones we changed
+            ours = {
+                doc["id"]
+                async for doc in db[COLLECTION_NAME].find(
+                    {"id": {"$in": ids}, "cancel_reason": "expired", "updated_at": now}, {"_id": 0, "id": 1}
+                )
+            }
+            applied = [doc for doc in batch if doc["id"] in ours]
+        changes = [(before, _after(before, set_fields, version_inc=1)) for before in applied]
+        if changes:
+            await notifications.track_reservations_bulk(db, changes)
+            await analytics.track_reservations_bulk(db, changes)
+            await availability.release_seats_bulk(db, [(b.get("slot"), b.get("guests", 0)) for b, _ in changes])
+        expired += len(changes)
+        if len(batch) < RESERVATION_EXPIRY_BATCH:
+            break
+    if expired:
+        logger.info(f"⌛ {expired} pending reservations expired")
+    return expired
+
+
+async def send_reservation_reminders(db) -> int:
+    """Remind confirmed guests whose visit is within the lead time (one batch per run)."""
+    now = datetime.utcnow()
+    due = {
+        "status": "confirmed",
+        "date": {"$gte": now, "$lt": now + timedelta(hours=RESERVATION_REMINDER_LEAD_HOURS)},
+        "reminder_sent_at": {"$exists": False},
+    }
+    batch = await db[COLLECTION_NAME].find(due, {"_id": 0, "id": 1}).sort("date", 1).limit(RESERVATION_REMINDER_BATCH).to_list(RESERVATION_REMINDER_BATCH)
+    if not batch:
+        return 0
+
+    # Claim the batch first so a lease handover can never send the same reminder twice
+    marker = _now_ms()
+    ids = [doc["id"] for doc in batch]
+    await db[COLLECTION_NAME].update_many(
+        {"id": {"$in": ids}, "reminder_sent_at": {"$exists": False}},
+        {"$set": {"reminder_sent_at": marker}},
+    )
+    claimed = [
+        public(doc)
+        async for doc in db[COLLECTION_NAME].find({"id": {"$in": ids}, "reminder_sent_at": marker}, {"_id": 0})
+    ]
+
+    # Email queue is bounded; whatever did not fit is unclaimed and retried next run
+    unsent = [
+        doc["id"] for doc in claimed
+        if doc.get("user_email") and not send_reservation_reminder_email(doc["user_email"], doc)
+    ]
+    if unsent:
+        await db[COLLECTION_NAME].update_many(
+            {"id": {"$in": unsent}, "reminder_sent_at": marker}, {"$unset": {"reminder_sent_at": ""}}
+        )
+    if WHATSAPP_NOTIFY_ENABLED:
+        messages = [
+            (doc["phone"], text) for doc in claimed
+            if doc["id"] not in unsent and doc.get("phone") and (text := _whatsapp_text("reminder", doc))
+        ]
+        sent = await send_whatsapp_batch(messages, RESERVATION_NOTIFY_CONCURRENCY, per_second=RESERVATION_REMINDER_WA_PER_SECOND)
+        logger.info(f"📱 Reminders: {sent}/{len(messages)} WhatsApp messages sent")
+    return len(claimed) - len(unsent)
 
 
 @router.get("/")
-async def list_reservations(request: Request):
+async def list_reservations(
+    request: Request,
+    response: Response,
+    status: str | None = Query(None, description="Filter status: pending|confirmed|declined|cancelled"),
+    visit_from: str | None = Query(None, alias="from", description="Visit time lower bound, inclusive (ISO date/datetime, naive = WIB)"),
+    visit_to: str | None = Query(None, alias="to", description="Visit time upper bound, exclusive (ISO date/datetime, naive = WIB)"),
+    cursor: str | None = Query(None, description="Continuation token from X-Next-Cursor"),
+    limit: int = Query(1000, ge=1, le=1000),
+    include_total: bool = False,
+):
+    """Newest-first reservations, or earliest visit first when from/to is given.
+
+    The next page token is sent in the X-Next-Cursor header.
+    """
     db = request.app.state.db
-    docs = await db[COLLECTION_NAME].find({}, {"_id": 0}).to_list(1000)
-    return docs
+    query = {}
+    if status:
+        query["status"] = status
+    fields, direction = PAGE_FIELDS, -1
+    if visit_from or visit_to:
+        query["date"] = {}
+        if visit_from:
+            query["date"]["$gte"] = availability.to_utc(availability.parse_visit_time(visit_from))
+        if visit_to:
+            query["date"]["$lt"] = availability.to_utc(availability.parse_visit_time(visit_to))
+        fields, direction = VISIT_PAGE_FIELDS, 1
+    docs, next_cursor = await fetch_page(db[COLLECTION_NAME], query, fields, limit, cursor, direction=direction)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    if include_total:
+        response.headers["X-Total-Count"] = str(await cached_count(db[COLLECTION_NAME], query))
+    return [public(doc) for doc in docs]
 
 
 @router.post("/")
 async def create_reservation(request: Request, payload: ReservationCreate, user: dict = Depends(get_user_from_token)):
     db = request.app.state.db
+    if payload.guests < 1:
+        raise HTTPException(status_code=400, detail="Jumlah tamu minimal 1")
+    visit = availability.parse_visit_time(payload.date)
+    slot = availability.slot_for(visit, await availability.opening_hours(db))
+    # Take the seats first (atomic), give them back if the insert fails
+    await availability.reserve_seats(db, slot, payload.guests)
     # When user creates their own reservation, mark as read (they know about it)
-    item = Reservation(**payload.model_dump(), user_email=user.get("email"), is_read=True)
+    item = Reservation(
+        **payload.model_dump(), user_email=user.get("email"), is_read=True,
+        slot=slot, slot_at=availability.slot_start(slot),
+    )
     doc = item.model_dump()
-    doc["created_at"] = doc["created_at"].isoformat()
-    await db[COLLECTION_NAME].insert_one(doc)
-    created = await db[COLLECTION_NAME].find_one({"id": doc["id"]}, {"_id": 0})
-    return created
+    doc["date"] = availability.to_utc(visit)
+    doc["updated_at"] = doc["created_at"]
+    try:
+        await db[COLLECTION_NAME].insert_one(doc)
+    except Exception:
+        await availability.release_seats(db, slot, payload.guests)
+        raise
+    await notifications.track_reservation(db, None, doc)
+    await analytics.track_reservation(db, None, doc)
+    doc.pop("_id", None)
+    doc.pop("updated_at")
+    return public(doc)
+
+
+@router.get("/availability")
+async def get_availability(
+    request: Request,
+    date_from: date = Query(..., alias="from", description="First day (YYYY-MM-DD)"),
+    date_to: date = Query(..., alias="to", description="Last day (YYYY-MM-DD), inclusive"),
+):
+    """Remaining seats per time slot for each day in the range"""
+    db = request.app.state.db
+    return {
+        "slot_minutes": availability.RESERVATION_SLOT_MINUTES,
+        "days": await availability.availability(db, date_from, date_to),
+    }
 
 @router.get("/mine")
 async def list_my_reservations(
     request: Request,
     user: dict = Depends(get_user_from_token),
-    page: int = Query(1, ge=1),
+    page: int = Query(1, ge=1, description="Deprecated: use cursor"),
     size: int = Query(10, ge=1, le=100),
-    status: str | None = Query(None, description="Filter status: pending|confirmed|cancelled")
+    status: str | None = Query(None, description="Filter status: pending|confirmed|cancelled"),
+    cursor: str | None = Query(None, description="Continuation token from next_cursor"),
+    include_total: bool = True,
 ):
     db = request.app.state.db
     filter_query = {"user_email": user.get("email")}
     if status:
         filter_query["status"] = status
-    skip = (page - 1) * size
-    cursor = db[COLLECTION_NAME].find(filter_query, {"_id": 0}).sort("created_at", -1).skip(skip).limit(size)
-    items = await cursor.to_list(size)
-    total = await db[COLLECTION_NAME].count_documents(filter_query)
-    return {"items": items, "page": page, "size": size, "total": total}
+    if cursor or page == 1:
+        items, next_cursor = await fetch_page(db[COLLECTION_NAME], filter_query, PAGE_FIELDS, size, cursor)
+    else:
+        # Old clients that still send page numbers
+        skip = (page - 1) * size
+        items = await db[COLLECTION_NAME].find(filter_query, {"_id": 0}).sort(
+            [(field, -1) for field in PAGE_FIELDS]
+        ).skip(skip).limit(size).to_list(size)
+        next_cursor = None
+    total = await cached_count(db[COLLECTION_NAME], filter_query) if include_total else None
+    return {"items": [public(item) for item in items], "page": page, "size": size, "total": total, "next_cursor": next_cursor}
 
 @router.put("/{reservation_id}/cancel")
-async def cancel_my_reservation(request: Request, reservation_id: str, user: dict = Depends(get_user_from_token)):
+async def cancel_my_reservation(
+    request: Request,
+    reservation_id: str,
+    user: dict = Depends(get_user_from_token),
+    expected_version: int | None = Query(None, description="Only apply if the reservation is still at this version"),
+):
     db = request.app.state.db
-    existing = await db[COLLECTION_NAME].find_one({"id": reservation_id}, {"_id": 0})
-    if not existing:
-        raise HTTPException(status_code=404, detail="Reservation not found")
-    if existing.get("user_email") != user.get("email"):
-        raise HTTPException(status_code=403, detail="Not your reservation")
-    if existing.get("status") == "cancelled":
-        return existing
-    await db[COLLECTION_NAME].update_one({"id": reservation_id}, {"$set": {"status": "cancelled"}})
-    updated = await db[COLLECTION_NAME].find_one({"id": reservation_id}, {"_id": 0})
-    return updated
+    updated, _ = await transition_reservation(
+        db, reservation_id, "cancelled", user_email=user.get("email"), expected_version=expected_version
+    )
+    return public(updated)
 
 @router.put("/{reservation_id}/confirm")
-async def confirm_reservation_admin(request: Request, reservation_id: str, admin: dict = Depends(require_admin)):
+async def confirm_reservation_admin(
+    request: Request,
+    reservation_id: str,
+    admin: dict = Depends(require_admin),
+    expected_version: int | None = Query(None, description="Only apply if the reservation is still at this version"),
+):
     db = request.app.state.db
-    existing = await db[COLLECTION_NAME].find_one({"id": reservation_id}, {"_id": 0})
-    if not existing:
-        raise HTTPException(status_code=404, detail="Reservation not found")
-    
-    await db[COLLECTION_NAME].update_one({"id": reservation_id}, {"$set": {"status": "confirmed", "is_read": False}})
-    updated = await db[COLLECTION_NAME].find_one({"id": reservation_id}, {"_id": 0})
-    
-    # Send confirmation email to user
-    user_email = existing.get("user_email")
-    if user_email:
-        try:
-            send_reservation_confirmation_email(user_email, updated)
-        except Exception as e:
-            print(f"Warning: Failed to send confirmation email: {str(e)}")
-            # Don't fail the request if email fails
+    updated, changed = await transition_reservation(
+        db, reservation_id, "confirmed", expected_version=expected_version, extra_set={"is_read": False}
+    )
+    updated = public(updated)
     
+    # Send confirmation email to user (only on the actual transition)
+    user_email = updated.get("user_email")
+    # Only queued here; SMTP errors are retried and logged by the email dispatcher
+    if changed and user_email and not send_reservation_confirmation_email(user_email, updated):
+        logger.warning(f"⚠️ Email queue full, confirmation for reservation {reservation_id} not sent")
+
     return updated
 
 @router.put("/{reservation_id}/decline")
-async def decline_reservation_admin(request: Request, reservation_id: str, admin: dict = Depends(require_admin)):
+async def decline_reservation_admin(
+    request: Request,
+    reservation_id: str,
+    admin: dict = Depends(require_admin),
+    expected_version: int | None = Query(None, description="Only apply if the reservation is still at this version"),
+):
     db = request.app.state.db
-    existing = await db[COLLECTION_NAME].find_one({"id": reservation_id}, {"_id": 0})
-    if not existing:
-        raise HTTPException(status_code=404, detail="Reservation not found")
-    await db[COLLECTION_NAME].update_one({"id": reservation_id}, {"$set": {"status": "declined", "is_read": False}})
-    updated = await db[COLLECTION_NAME].find_one({"id": reservation_id}, {"_id": 0})
-    return updated
+    updated, _ = await transition_reservation(
+        db, reservation_id, "declined", expected_version=expected_version, extra_set={"is_read": False}
+    )
+    return public(updated)
+
+
+@router.post("/bulk/confirm")
+async def bulk_confirm_reservations(request: Request, payload: BulkIds, admin: dict = Depends(require_admin)):
+    """Confirm many pending reservations at once; emails/WhatsApp are sent in the background"""
+    db = request.app.state.db
+    results, changed = await _bulk_transition(db, payload.ids, "confirmed", extra_set={"is_read": False})
+    _schedule_notifications("confirmed", changed)
+    return _bulk_response(results)
+
+@router.post("/bulk/decline")
+async def bulk_decline_reservations(request: Request, payload: BulkIds, admin: dict = Depends(require_admin)):
+    db = request.app.state.db
+    results, changed = await _bulk_transition(db, payload.ids, "declined", extra_set={"is_read": False})
+    _schedule_notifications("declined", changed)
+    return _bulk_response(results)
+
+@router.post("/bulk/delete")
+async def bulk_delete_reservations(request: Request, payload: BulkIds, admin: dict = Depends(require_admin)):
+    db = request.app.state.db
+    ids = list(dict.fromkeys(payload.ids))
+    existing = {
+        doc["id"]: doc
+        async for doc in db[COLLECTION_NAME].find({"id": {"$in": ids}}, {"_id": 0})
+    }
+    # Delete only if the status is still what we read, so the seats released below are right
+    ops = [DeleteOne({"id": rid, "status": doc.get("status")}) for rid, doc in existing.items()]
+    deleted = list(existing.values())
+    if ops:
+        result = await db[COLLECTION_NAME].bulk_write(ops, ordered=False)
+        if result.deleted_count < len(ops):
+            remaining = {
+                doc["id"]
+                async for doc in db[COLLECTION_NAME].find({"id": {"$in": list(existing)}}, {"_id": 0, "id": 1})
+            }
+            # A document deleted concurrently by someone else also ends up here;
+            # rare enough that the slot rebuild in /api/admin covers the drift
+            deleted = [doc for doc in deleted if doc["id"] not in remaining]
+
+    deleted_ids = {doc["id"] for doc in deleted}
+    results = []
+    for rid in ids:
+        if rid not in existing:
+            results.append({"id": rid, "status": "not_found"})
+        elif rid in deleted_ids:
+            results.append({"id": rid, "status": "deleted"})
+        else:
+            results.append({"id": rid, "status": "conflict", "detail": "Reservation was modified by someone else, reload and try again"})
+
+    if deleted:
+        await notifications.track_reservations_bulk(db, [(doc, None) for doc in deleted])
+        await analytics.track_reservations_bulk(db, [(doc, None) for doc in deleted])
+        await availability.release_seats_bulk(db, [
+            (doc.get("slot"), doc.get("guests", 0))
+            for doc in deleted if doc.get("status") in availability.HOLDING_STATUSES
+        ])
+    return _bulk_response(results)
 
 
 @router.put("/mark-all-read")
 async def mark_all_reservations_as_read(request: Request, user: dict = Depends(get_user_from_token)):
     db = request.app.state.db
-    # First, set is_read: true for all existing reservations that don't have this field
-    await db[COLLECTION_NAME].update_many(
-        {"user_email": user.get("email"), "is_read": {"$exists": False}},
-        {"$set": {"is_read": True}}
-    )
-    # Then update all unread reservations to read
+    # Legacy docs without is_read are normalized by notifications.rebuild_counters,
+    # so a single pass over the (partially indexed) unread subset is enough
     result = await db[COLLECTION_NAME].update_many(
         {"user_email": user.get("email"), "is_read": False},
-        {"$set": {"is_read": True}}
+        {"$set": {"is_read": True, "updated_at": datetime.utcnow()}}
     )
+    await notifications.bump(db, notifications.user_reservations_key(user.get("email")), -result.modified_count)
     return {"updated_count": result.modified_count}
 
 @router.put("/admin/mark-all-read")
 async def mark_all_reservations_as_read_by_admin(request: Request, admin: dict = Depends(require_admin)):
     db = request.app.state.db
-    # Set is_read_by_admin: true for all existing reservations that don't have this field
-    await db[COLLECTION_NAME].update_many(
-        {"is_read_by_admin": {"$exists": False}},
-        {"$set": {"is_read_by_admin": True}}
-    )
-    # Then update all unread by admin to read
     result = await db[COLLECTION_NAME].update_many(
         {"is_read_by_admin": False},
-        {"$set": {"is_read_by_admin": True}}
+        {"$set": {"is_read_by_admin": True, "updated_at": datetime.utcnow()}}
     )
+    await notifications.bump(db, notifications.ADMIN_RESERVATIONS, -result.modified_count)
     return {"updated_count": result.modified_count}
 
 @router.put("/{reservation_id}/mark-read")
 async def mark_reservation_as_read(request: Request, reservation_id: str, user: dict = Depends(get_user_from_token)):
     db = request.app.state.db
-    existing = await db[COLLECTION_NAME].find_one({"id": reservation_id}, {"_id": 0})
+    set_fields = {"is_read": True, "updated_at": datetime.utcnow()}
+    before = await db[COLLECTION_NAME].find_one_and_update(
+        {"id": reservation_id, "user_email": user.get("email")},
+        {"$set": set_fields},
+        projection={"_id": 0},
+        return_document=ReturnDocument.BEFORE,
+    )
+    if before:
+        updated = _after(before, set_fields)
+        await notifications.track_reservation(db, before, updated)
+        return public(updated)
+    existing = await db[COLLECTION_NAME].find_one({"id": reservation_id}, {"_id": 1})
     if not existing:
         raise HTTPException(status_code=404, detail="Reservation not found")
-    if existing.get("user_email") != user.get("email"):
-        raise HTTPException(status_code=403, detail="Not your reservation")
-    await db[COLLECTION_NAME].update_one({"id": reservation_id}, {"$set": {"is_read": True}})
-    updated = await db[COLLECTION_NAME].find_one({"id": reservation_id}, {"_id": 0})
-    return updated
+    raise HTTPException(status_code=403, detail="Not your reservation")
 
 @router.put("/{reservation_id}")
 async def update_reservation(request: Request, reservation_id: str, payload: dict):
     db = request.app.state.db
-    existing = await db[COLLECTION_NAME].find_one({"id": reservation_id}, {"_id": 0})
-    if not existing:
+    update = {
+        k: v for k, v in payload.items()
+        if k not in ("_id", "id", "version", "slot", "slot_at", "created_at", "updated_at")
+    }
+    # Date/guests are tied to the seat counters; rebooking goes through create
+    if "date" in update or "guests" in update:
+        raise HTTPException(status_code=400, detail="Tanggal/jumlah tamu tidak bisa diubah, batalkan dan buat reservasi baru")
+    # Status changes still have to follow the state machine
+    if "status" in update:
+        target = update.pop("status")
+        updated, _ = await transition_reservation(db, reservation_id, target, extra_set=update)
+        return public(updated)
+    if not update:
+        existing = await db[COLLECTION_NAME].find_one({"id": reservation_id}, {"_id": 0})
+        if not existing:
+            raise HTTPException(status_code=404, detail="Reservation not found")
+        return public(existing)
+    set_fields = {**update, "updated_at": datetime.utcnow()}
+    before = await db[COLLECTION_NAME].find_one_and_update(
+        {"id": reservation_id},
+        {"$set": set_fields},
+        projection={"_id": 0},
+        return_document=ReturnDocument.BEFORE,
+    )
+    if not before:
         raise HTTPException(status_code=404, detail="Reservation not found")
-    updated = {**existing, **payload}
-    # ensure created_at stays a string
-    if isinstance(updated.get("created_at"), datetime):
-        updated["created_at"] = updated["created_at"].isoformat()
-    await db[COLLECTION_NAME].update_one({"id": reservation_id}, {"$set": updated})
-    updated_doc = await db[COLLECTION_NAME].find_one({"id": reservation_id}, {"_id": 0})
-    return updated_doc
+    updated_doc = _after(before, set_fields)
+    await notifications.track_reservation(db, before, updated_doc)
+    return public(updated_doc)
 
 @router.delete("/{reservation_id}")
 async def delete_reservation(request: Request, reservation_id: str):
     db = request.app.state.db
-    res = await db[COLLECTION_NAME].delete_one({"id": reservation_id})
-    if res.deleted_count:
-        return {"detail": "Deleted"}
-    raise HTTPException(status_code=404, detail="Reservation not found")
+    deleted = await db[COLLECTION_NAME].find_one_and_delete({"id": reservation_id}, projection={"_id": 0})
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Reservation not found")
+    await notifications.track_reservation(db, deleted, None)
+    await analytics.track_reservation(db, deleted, None)
+    if deleted.get("status") in availability.HOLDING_STATUSES:
+        await availability.release_seats(db, deleted.get("slot"), deleted.get("guests", 0))
+    return {"detail": "Deleted"}
@@ -1,7 +1,12 @@
-from fastapi import APIRouter, Request, HTTPException, Depends
+from fastapi import APIRouter, Request, HTTPException, Depends, Response, UploadFile, File
 from pydantic import BaseModel
+from pymongo import ReturnDocument
 from typing import List
 from auth import require_admin
+import asyncio
+import blob_store
+import http_cache
+import json
 
 router = APIRouter(prefix="/api/settings", tags=["settings"])
 
@@ -40,96 +45,178 @@ class SiteSettings(BaseModel):
     about: AboutData
     story: StoryData
 
+# Dipakai selama dokumen site_settings belum ada (atau section-nya belum diisi)
+DEFAULT_SETTINGS = {
+    "contact": {
+        "instagram": "@cafeloreomah",
+        "facebook": "Cafe Loreomah Official",
+        "email": "hello@cafeloreomah.com",
+        "tiktok": "cafeloreomah",
+        "youtube": "Cafe Loreomah",
+        "phone": "0821-4243-3998",
+        "address": "Jl. Airlangga, Sumbersari, Kesiman, Kec. Trawas, Kabupaten Mojokerto, Jawa Timur 61375",
+        "maps": "https://maps.google.com",
+        "weekdays": "09.00 - 19.00",
+        "weekend": "09.00 - 20.00"
+    },
+    "about": {
+        "title": "Tentang Kami",
+        "subtitle": "Cafe Loreomah — Kopi, Alam, dan Kebersamaan di Trawas",
+        "mission": "Menghadirkan pengalaman ngopi yang jujur dan berkualitas dengan bahan baku lokal, racikan yang konsisten, serta pelayanan hangat — sehingga setiap tamu merasa seperti di rumah sendiri.",
+        "vision": "Menjadi destinasi kopi dan kuliner keluarga di Trawas yang mengutamakan kualitas rasa, kenyamanan suasana, dan kedekatan dengan komunitas.",
+        "values": [
+            {"title": "Kualitas", "description": "Biji kopi Nusantara terpilih, resep teruji, rasa konsisten di setiap sajian."},
+            {"title": "Kehangatan", "description": "Pelayanan ramah, ruang nyaman, dan atmosfer yang cocok untuk keluarga."},
+            {"title": "Komunitas", "description": "Tumbuh bersama warga Trawas — dari petani, UMKM, hingga para penikmat kopi."},
+            {"title": "Inovasi", "description": "Eksplorasi menu musiman, kopi manual brew, dan kreasi non-kopi yang seimbang."}
+        ]
+    },
+    "story": {
+        "title": "CERITA KAMI",
+        "paragraphs": [
+            "Cafe Loreomah lahir dari kecintaan pada kopi Nusantara dan suasana alam Trawas yang sejuk. Kami percaya, secangkir kopi yang baik bukan hanya soal rasa — tetapi juga tentang momen, suasana, dan kebersamaan.",
+            "Kami menggunakan bahan baku lokal, mendukung petani dan pelaku UMKM, serta meracik menu yang seimbang: dari manual brew, kopi susu gula aren, hingga pilihan non-kopi dan makanan keluarga. Setiap sajian diracik dengan standar konsistensi, agar pengalaman Anda selalu menyenangkan kapan pun berkunjung.",
+            "Berlokasi di Jl. Airlangga, Trawas, Mojokerto, Loreomah menjadi tempat singgah yang hangat untuk berkumpul, bekerja, atau sekadar menikmati udara pegunungan. Terima kasih telah menjadi bagian dari perjalanan kami — sampai jumpa di Loreomah."
+        ],
+        "image": "http://localhost:8000/uploads/sliders/default-story.jpg"
+    }
+}
+
+SECTIONS = ("contact", "about", "story")
+
+
+def _dump(value) -> bytes:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+# === Read-through cache ===
+# (version token, {"": full body, section: section body}) — bytes siap kirim,
+# dibangun ulang hanya saat versi site_settings berubah (lihat http_cache)
+_cache = None
+_lock = asyncio.Lock()
+
+
+def _store(token: str, doc: dict | None) -> dict:
+    global _cache
+    settings = {**DEFAULT_SETTINGS, **(doc or {})}
+    bodies = {"": _dump(settings)}
+    for section in SECTIONS:
+        bodies[section] = _dump(settings[section])
+    _cache = (token, bodies)
+    return bodies
+
+
+async def _bodies(db) -> dict:
+    token = http_cache.versions.token((COLLECTION_NAME,))
+    cached = _cache
+    if cached and cached[0] == token:
+        return cached[1]
+    async with _lock:
+        token = http_cache.versions.token((COLLECTION_NAME,))
+        if _cache and _cache[0] == token:
+            return _cache[1]
+        doc = await db[COLLECTION_NAME].find_one({}, {"_id": 0})
+        return _store(token, doc)
+
+
+async def _retain_story_image(db, image: str | None, retained: str | None) -> str | None:
+    """Take the reference for a new story image before it is written; 409 if its blob is gone.
+
+    Returns the URL now held for this write (None when nothing was taken).
+    """
+    # Hanya URL blob yang dihitung referensinya; URL lain (mis. file slider) bukan milik settings
+    if image == retained or not blob_store.blob_id(image):
+        return retained
+    if not await blob_store.retain(db, image):
+        # Blob sudah dihapus GC (atau sedang dihapus): URL ini akan menjadi gambar rusak
+        raise HTTPException(status_code=409, detail="Gambar cerita sudah tidak tersedia, silakan upload ulang")
+    return image
+
+
+async def _swap_story_image(db, old: str | None, new: str | None, held: str | None):
+    if new != old:
+        if blob_store.blob_id(old):
+            await blob_store.release(db, old)
+    elif held:
+        # Gambar yang sama disimpan/diupload ulang: referensi tambahan tidak diperlukan
+        await blob_store.release(db, held)
+
+
+async def _write(db, update: dict, retained: str | None = None) -> dict:
+    """Apply `update` in one round trip and refresh the cache from the result.
+
+    `retained` is a story image URL the caller already holds a blob reference for.
+    """
+    held = await _retain_story_image(db, update["story"].get("image"), retained) if "story" in update else None
+    # Sections are $set whole, so the new document is the old one plus `update`
+    try:
+        before = await db[COLLECTION_NAME].find_one_and_update(
+            {},
+            {"$set": update},
+            projection={"_id": 0},
+            upsert=True,
+            return_document=ReturnDocument.BEFORE,
+        ) or {}
+    except BaseException:
+        if held and held != retained:
+            await blob_store.release(db, held)
+        raise
+    doc = {**before, **update}
+    if "story" in update:
+        await _swap_story_image(db, (before.get("story") or {}).get("image"), update["story"].get("image"), held)
+    token = await http_cache.bump(db, COLLECTION_NAME)
+    # Skip if another write landed in between; the next read reloads instead
+    if http_cache.versions.token((COLLECTION_NAME,)) == token:
+        _store(token, doc)
+    return doc
+
+
+def _json(body: bytes) -> Response:
+    return Response(content=body, media_type="application/json")
+
+
 @router.get("/")
+@http_cache.conditional("settings", COLLECTION_NAME)
 async def get_settings(request: Request):
     """Get all site settings"""
-    db = request.app.state.db
-    doc = await db[COLLECTION_NAME].find_one({}, {"_id": 0})
-    if not doc:
-        # Return default structure if not found
-        return {
-            "contact": {
-                "instagram": "@cafeloreomah",
-                "facebook": "Cafe Loreomah Official",
-                "email": "hello@cafeloreomah.com",
-                "tiktok": "cafeloreomah",
-                "youtube": "Cafe Loreomah",
-                "phone": "0821-4243-3998",
-                "address": "Jl. Airlangga, Sumbersari, Kesiman, Kec. Trawas, Kabupaten Mojokerto, Jawa Timur 61375",
-                "maps": "https://maps.google.com",
-                "weekdays": "09.00 - 19.00",
-                "weekend": "09.00 - 20.00"
-            },
-            "about": {
-                "title": "Tentang Kami",
-                "subtitle": "Cafe Loreomah — Kopi, Alam, dan Kebersamaan di Trawas",
-                "mission": "Menghadirkan pengalaman ngopi yang jujur dan berkualitas dengan bahan baku lokal, racikan yang konsisten, serta pelayanan hangat — sehingga setiap tamu merasa seperti di rumah sendiri.",
-                "vision": "Menjadi destinasi kopi dan kuliner keluarga di Trawas yang mengutamakan kualitas rasa, kenyamanan suasana, dan kedekatan dengan komunitas.",
-                "values": [
-                    {"title": "Kualitas", "description": "Biji kopi Nusantara terpilih, resep teruji, rasa konsisten di setiap sajian."},
-                    {"title": "Kehangatan", "description": "Pelayanan ramah, ruang nyaman, dan atmosfer yang cocok untuk keluarga."},
-                    {"title": "Komunitas", "description": "Tumbuh bersama warga Trawas — dari petani, UMKM, hingga para penikmat kopi."},
-                    {"title": "Inovasi", "description": "Eksplorasi menu musiman, kopi manual brew, dan kreasi non-kopi yang seimbang."}
-                ]
-            },
-            "story": {
-                "title": "CERITA KAMI",
-                "paragraphs": [
-                    "Cafe Loreomah lahir dari kecintaan pada kopi Nusantara dan suasana alam Trawas yang sejuk. Kami percaya, secangkir kopi yang baik bukan hanya soal rasa — tetapi juga tentang momen, suasana, dan kebersamaan.",
-                    "Kami menggunakan bahan baku lokal, mendukung petani dan pelaku UMKM, serta meracik menu yang seimbang: dari manual brew, kopi susu gula aren, hingga pilihan non-kopi dan makanan keluarga. Setiap sajian diracik dengan standar konsistensi, agar pengalaman Anda selalu menyenangkan kapan pun berkunjung.",
-                    "Berlokasi di Jl. Airlangga, Trawas, Mojokerto, Loreomah menjadi tempat singgah yang hangat untuk berkumpul, bekerja, atau sekadar menikmati udara pegunungan. Terima kasih telah menjadi bagian dari perjalanan kami — sampai jumpa di Loreomah."
-                ],
-                "image": "http://localhost:8000/uploads/sliders/default-story.jpg"
-            }
-        }
-    return doc
+    bodies = await _bodies(request.app.state.db)
+    return _json(bodies[""])
+
+@router.get("/{section}")
+@http_cache.conditional("settings", COLLECTION_NAME)
+async def get_settings_section(section: str, request: Request):
+    """Get one section (contact / about / story), so pages fetch only what they render"""
+    if section not in SECTIONS:
+        raise HTTPException(status_code=404, detail="Section tidak ditemukan")
+    bodies = await _bodies(request.app.state.db)
+    return _json(bodies[section])
 
 @router.put("/")
 async def update_settings(request: Request, payload: SiteSettings, admin: dict = Depends(require_admin)):
     """Update all site settings (admin only)"""
-    db = request.app.state.db
-    doc = payload.model_dump()
     # Upsert: update if exists, insert if not
-    await db[COLLECTION_NAME].update_one(
-        {},
-        {"$set": doc},
-        upsert=True
-    )
-    updated = await db[COLLECTION_NAME].find_one({}, {"_id": 0})
-    return updated
+    return await _write(request.app.state.db, payload.model_dump())
 
 @router.put("/contact")
 async def update_contact(request: Request, payload: ContactData, admin: dict = Depends(require_admin)):
     """Update only contact section"""
-    db = request.app.state.db
-    await db[COLLECTION_NAME].update_one(
-        {},
-        {"$set": {"contact": payload.model_dump()}},
-        upsert=True
-    )
-    updated = await db[COLLECTION_NAME].find_one({}, {"_id": 0})
-    return updated
+    return await _write(request.app.state.db, {"contact": payload.model_dump()})
 
 @router.put("/about")
 async def update_about(request: Request, payload: AboutData, admin: dict = Depends(require_admin)):
     """Update only about section"""
-    db = request.app.state.db
-    await db[COLLECTION_NAME].update_one(
-        {},
-        {"$set": {"about": payload.model_dump()}},
-        upsert=True
-    )
-    updated = await db[COLLECTION_NAME].find_one({}, {"_id": 0})
-    return updated
+    return await _write(request.app.state.db, {"about": payload.model_dump()})
 
 @router.put("/story")
 async def update_story(request: Request, payload: StoryData, admin: dict = Depends(require_admin)):
     """Update only story section"""
+    return await _write(request.app.state.db, {"story": payload.model_dump()})
+
+@router.post("/story/image")
+async def upload_story_image(request: Request, image: UploadFile = File(...), admin: dict = Depends(require_admin)):
+    """Upload the story image (stored once per content, immutable URL)"""
     db = request.app.state.db
-    await db[COLLECTION_NAME].update_one(
-        {},
-        {"$set": {"story": payload.model_dump()}},
-        upsert=True
-    )
-    updated = await db[COLLECTION_NAME].find_one({}, {"_id": 0})
-    return updated
+    stored = await blob_store.put(db, image)
+    current = await db[COLLECTION_NAME].find_one({}, {"_id": 0, "story": 1}) or {}
+    story = {**DEFAULT_SETTINGS["story"], **(current.get("story") or {}), "image": stored["image_url"]}
+    return await _write(db, {"story": story}, retained=stored["image_url"])
@@ -1,18 +1,22 @@
 # routers/slider_router.py
 from fastapi import APIRouter, Request, UploadFile, Form, HTTPException
 from fastapi.responses import JSONResponse
-from pathlib import Path
-import os, shutil, uuid
+import uuid
+from pymongo import IndexModel
+import http_cache
+import blob_store
 
 router = APIRouter(prefix="/api/sliders", tags=["Sliders"])
 
-UPLOAD_DIR = Path("backend/uploads/sliders")
-UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
-
 COLLECTION_NAME = "sliders"
 
+INDEXES = {
+    COLLECTION_NAME: [IndexModel("id", unique=True)],
+}
+
 
 @router.get("/")
+@http_cache.conditional("sliders", COLLECTION_NAME)
 async def get_sliders(request: Request):
     db = request.app.state.db
     docs = await db[COLLECTION_NAME].find({}, {"_id": 0}).to_list(1000)
@@ -24,6 +28,7 @@ async def get_sliders(request: Request):
 
 
 @router.get("/{slider_id}")
+@http_cache.conditional("sliders", COLLECTION_NAME)
 async def get_slider(request: Request, slider_id: str):
     db = request.app.state.db
     doc = await db[COLLECTION_NAME].find_one({"id": slider_id}, {"_id": 0})
@@ -41,23 +46,17 @@ async def create_slider(request: Request,
     description: str = Form(...),
     image: UploadFile = None,
 ):
-    if image:
-        filename = f"{uuid.uuid4()}_{image.filename}"
-        file_path = UPLOAD_DIR / filename
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(image.file, buffer)
-        image_url = f"/uploads/sliders/{filename}"
-    else:
-        image_url = None
+    db = request.app.state.db
+    image_fields = await blob_store.put(db, image) if image else dict(blob_store.NO_IMAGE)
 
     new_slider = {
         "id": str(uuid.uuid4()),
         "title": title,
         "description": description,
-        "image_url": image_url,
+        **image_fields,
     }
-    db = request.app.state.db
     await db[COLLECTION_NAME].insert_one(new_slider)
+    await http_cache.bump(db, COLLECTION_NAME)
     created = await db[COLLECTION_NAME].find_one({"id": new_slider["id"]}, {"_id": 0})
     # ensure frontend compatibility: include 'image' key
     if created and "image_url" in created and "image" not in created:
@@ -68,14 +67,11 @@ async def create_slider(request: Request,
 @router.delete("/{slider_id}")
 async def delete_slider(request: Request, slider_id: str):
     db = request.app.state.db
-    doc = await db[COLLECTION_NAME].find_one({"id": slider_id}, {"_id": 0})
+    doc = await db[COLLECTION_NAME].find_one_and_delete({"id": slider_id}, projection=blob_store.IMAGE_PROJECTION)
     if not doc:
         raise HTTPException(status_code=404, detail="Slider not found")
-    if doc.get("image_url"):
-        image_path = Path("backend") / doc["image_url"].lstrip("/")
-        if image_path.exists():
-            image_path.unlink()
-    await db[COLLECTION_NAME].delete_one({"id": slider_id})
+    await blob_store.release(db, doc.get("image_url"), doc.get("image_variants"))
+    await http_cache.bump(db, COLLECTION_NAME)
     return {"message": "Slider deleted"}
 
 
@@ -87,8 +83,7 @@ async def update_slider(request: Request,
     image: UploadFile = None,
 ):
     db = request.app.state.db
-    doc = await db[COLLECTION_NAME].find_one({"id": slider_id}, {"_id": 0})
-    if not doc:
+    if not await db[COLLECTION_NAME].count_documents({"id": slider_id}, limit=1):
         raise HTTPException(status_code=404, detail="Slider not found")
     
     update_data = {
@@ -96,22 +91,16 @@ async def update_slider(request: Request,
         "description": description,
     }
     
-    # If new image uploaded, delete old and save new
+    # If new image uploaded, store it first (a rejected upload keeps the old one)
     if image:
-        # Delete old image
-        if doc.get("image_url"):
-            old_image_path = Path("backend") / doc["image_url"].lstrip("/")
-            if old_image_path.exists():
-                old_image_path.unlink()
-        
-        # Save new image
-        filename = f"{uuid.uuid4()}_{image.filename}"
-        file_path = UPLOAD_DIR / filename
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(image.file, buffer)
-        update_data["image_url"] = f"/uploads/sliders/{filename}"
+        update_data.update(await blob_store.put(db, image))
     
-    await db[COLLECTION_NAME].update_one({"id": slider_id}, {"$set": update_data})
+    old = await db[COLLECTION_NAME].find_one_and_update({"id": slider_id}, {"$set": update_data}, projection=blob_store.IMAGE_PROJECTION)
+    if image:
+        # Release the image that was actually replaced (or the new one if the slider vanished meanwhile)
+        replaced = old or update_data
+        await blob_store.release(db, replaced.get("image_url"), replaced.get("image_variants"))
+    await http_cache.bump(db, COLLECTION_NAME)
     updated = await db[COLLECTION_NAME].find_one({"id": slider_id}, {"_id": 0})
     
     # Keep compatibility with frontend expecting 'image' key
@@ -1,8 +1,7 @@
 from fastapi import APIRouter, Request, Depends, HTTPException, UploadFile, File
 from typing import Optional
-from auth import require_admin, get_user_from_token
-import os
-import base64
+from auth import require_admin, get_user_from_token, invalidate_user
+import avatars
 from datetime import datetime
 from pydantic import BaseModel
 
@@ -26,8 +25,10 @@ async def list_users(request: Request, q: Optional[str] = None, page: int = 1, p
 @router.delete("/{email}")
 async def delete_user(request: Request, email: str, admin=Depends(require_admin)):
     db = request.app.state.db
-    res = await db["users"].delete_one({"email": email})
-    if res.deleted_count:
+    deleted = await db["users"].find_one_and_delete({"email": email}, projection={"_id": 0, "avatar_url": 1})
+    invalidate_user(email)
+    if deleted is not None:
+        avatars.delete_avatar(deleted.get("avatar_url"))
         return {"detail": "User deleted"}
     raise HTTPException(status_code=404, detail="User not found")
 
@@ -59,6 +60,7 @@ async def update_profile(request: Request, payload: ProfileUpdatePayload, curren
         raise HTTPException(status_code=400, detail="No valid fields to update")
     update_doc["updated_at"] = datetime.utcnow()
     res = await db["users"].update_one({"email": current["email"]}, {"$set": update_doc}, upsert=False)
+    invalidate_user(current["email"])
     if res.matched_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
     user = await db["users"].find_one({"email": current["email"]}, {"password": 0, "_id": 0})
@@ -69,59 +71,44 @@ async def update_profile(request: Request, payload: ProfileUpdatePayload, curren
 
 @router.post("/me/avatar")
 async def upload_avatar(request: Request, file: UploadFile = File(...), current=Depends(get_user_from_token)):
+    content_type = file.content_type or "image/jpeg"
+    if not content_type.startswith("image/"):
+        raise HTTPException(status_code=400, detail="File must be an image")
+
+    # Baca maksimal batas + 1 byte, cukup untuk tahu file kebesaran
+    file_content = await file.read(avatars.AVATAR_MAX_BYTES + 1)
+    if not file_content:
+        raise HTTPException(status_code=400, detail="File is empty")
+    if len(file_content) > avatars.AVATAR_MAX_BYTES:
+        raise HTTPException(status_code=400, detail=f"File size must be less than {avatars.AVATAR_MAX_BYTES // (1024 * 1024)}MB")
+
     try:
-        # Validate content type
-        content_type = file.content_type or "image/jpeg"
-        print(f"Content type: {content_type}")
-        print(f"Filename: {file.filename}")
-        
-        if not content_type.startswith("image/"):
-            raise HTTPException(status_code=400, detail="File must be an image")
-        
-        # Read file content
-        file_content = await file.read()
-        file_size = len(file_content)
-        print(f"File size: {file_size} bytes ({file_size / 1024 / 1024:.2f}MB)")
-        
-        # Validate file is not empty
-        if not file_content:
-            raise HTTPException(status_code=400, detail="File is empty")
-        
-        # Check file size (max 10MB to allow larger images)
-        if file_size > 10 * 1024 * 1024:
-            raise HTTPException(status_code=400, detail=f"File size must be less than 10MB (current: {file_size / 1024 / 1024:.2f}MB)")
-        
-        # Convert to base64
-        base64_image = base64.b64encode(file_content).decode('utf-8')
-        print(f"Base64 length: {len(base64_image)}")
-        
-        # Create data URL with mime type
-        avatar_url = f"data:{content_type};base64,{base64_image}"
-        
-        # Update database
-        db = request.app.state.db
-        result = await db["users"].update_one(
-            {"email": current["email"]}, 
-            {"$set": {"avatar_url": avatar_url, "updated_at": datetime.utcnow()}}, 
-            upsert=False
-        )
-        print(f"Database update result: matched={result.matched_count}, modified={result.modified_count}")
-        
-        return {"avatar_url": avatar_url}
-    except HTTPException:
-        raise
-    except Exception as e:
-        print(f"Error uploading avatar: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(status_code=400, detail=f"Error uploading avatar: {str(e)}")
+        avatar_url = await avatars.save_avatar(file_content)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Error uploading avatar: {e}")
+
+    db = request.app.state.db
+    old = await db["users"].find_one_and_update(
+        {"email": current["email"]},
+        {"$set": {"avatar_url": avatar_url, "updated_at": datetime.utcnow()}},
+        projection={"_id": 0, "avatar_url": 1},
+    )
+    invalidate_user(current["email"])
+    if old is None:
+        avatars.delete_avatar(avatar_url)
+        raise HTTPException(status_code=404, detail="User not found")
+    avatars.delete_avatar(old.get("avatar_url"))
+    return {"avatar_url": avatar_url}
 
 @router.post("/me/avatar/remove")
 async def remove_avatar(request: Request, current=Depends(get_user_from_token)):
     db = request.app.state.db
-    await db["users"].update_one(
+    old = await db["users"].find_one_and_update(
         {"email": current["email"]}, 
         {"$set": {"avatar_url": "", "updated_at": datetime.utcnow()}}, 
-        upsert=False
+        projection={"_id": 0, "avatar_url": 1},
     )
+    invalidate_user(current["email"])
+    if old:
+        avatars.delete_avatar(old.get("avatar_url"))
     return {"message": "Avatar removed successfully"}
@@ -0,0 +1,216 @@
+# backend/scheduler.py
+"""
+Scheduler async di dalam proses untuk job berkala (expiry, reminder, ...).
+Saat API dijalankan dengan banyak worker, hanya satu yang menjalankan job:
+worker yang memegang lease di collection scheduler_leases. Lease diperpanjang
+setiap tick dan, selama job berjalan, oleh heartbeat setiap sepertiga lease;
+jika perpanjangan gagal job dibatalkan, jadi dua worker tidak pernah
+menjalankan job bersamaan. Jika leader mati, lease kedaluwarsa dan worker lain
+mengambil alih. Setiap job punya budget waktu (harus di bawah lease); job yang
+melewatinya dibatalkan, jadi job sebaiknya membatasi batch-nya sendiri.
+Setiap job mencatat metrik: durasi, jumlah item yang diproses, dan lag
+(seberapa terlambat job berjalan dibanding jadwalnya).
+"""
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, PyMongoError
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+LEASES_COLLECTION = "scheduler_leases"
+LEASE_NAME = "scheduler"
+
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "true").lower() == "true"
+SCHEDULER_LEASE_SECONDS = int(os.getenv("SCHEDULER_LEASE_SECONDS", "30"))
+SCHEDULER_TICK_SECONDS = float(os.getenv("SCHEDULER_TICK_SECONDS", "5"))
+# Waktu maksimal satu run job (default setengah lease)
+SCHEDULER_JOB_BUDGET_SECONDS = float(os.getenv("SCHEDULER_JOB_BUDGET_SECONDS", str(SCHEDULER_LEASE_SECONDS / 2)))
+
+
+class Job:
+    def __init__(self, name: str, interval: float, func, budget: float):
+        self.name = name
+        self.interval = interval
+        self.budget = budget
+        # func(db) -> jumlah item yang diproses
+        self.func = func
+        self.next_run = time.monotonic()
+        self.runs = 0
+        self.failures = 0
+        self.processed = 0
+        self.last_processed = 0
+        self.last_duration_ms = None
+        self.last_lag_s = None
+        self.max_lag_s = 0.0
+        self.last_run_at = None
+        self.last_error = None
+        self.running = False
+
+    def stats(self) -> dict:
+        return {
+            "interval_s": self.interval,
+            "budget_s": self.budget,
+            "runs": self.runs,
+            "failures": self.failures,
+            "processed_total": self.processed,
+            "last_processed": self.last_processed,
+            "last_duration_ms": self.last_duration_ms,
+            "last_lag_s": self.last_lag_s,
+            "max_lag_s": round(self.max_lag_s, 3),
+            "last_run_at": self.last_run_at.isoformat() + "Z" if self.last_run_at else None,
+            "last_error": self.last_error,
+            "running": self.running,
+        }
+
+
+class Scheduler:
+    def __init__(self):
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.jobs = {}
+        self.is_leader = False
+        self._task = None
+
+    def register(self, name: str, interval: float, func, budget: float = SCHEDULER_JOB_BUDGET_SECONDS):
+        if not 0 < budget < SCHEDULER_LEASE_SECONDS:
+            raise ValueError(
+                f"Job '{name}' budget ({budget}s) must be positive and shorter than SCHEDULER_LEASE_SECONDS ({SCHEDULER_LEASE_SECONDS}s)"
+            )
+        self.jobs[name] = Job(name, interval, func, budget)
+
+    # === Leader election ===
+    async def _acquire_lease(self, db) -> bool:
+        """Take or renew the lease; False while another live worker holds it."""
+        now = datetime.utcnow()
+        try:
+            lease = await db[LEASES_COLLECTION].find_one_and_update(
+                {"_id": LEASE_NAME, "$or": [{"owner": self.owner}, {"expires_at": {"$lt": now}}]},
+                {"$set": {"owner": self.owner, "expires_at": now + timedelta(seconds=SCHEDULER_LEASE_SECONDS), "renewed_at": now}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            # Lease ada dan masih dipegang worker lain (filter tidak cocok -> insert bentrok)
+            return False
+        return bool(lease) and lease.get("owner") == self.owner
+
+    async def _release_lease(self, db):
+        try:
+            await db[LEASES_COLLECTION].delete_one({"_id": LEASE_NAME, "owner": self.owner})
+        except PyMongoError:
+            pass
+
+    # === Loop ===
+    def start(self, db):
+        if not SCHEDULER_ENABLED:
+            logger.info("ℹ️ Scheduler disabled (SCHEDULER_ENABLED=false)")
+            return
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(db))
+
+    async def stop(self, db=None):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self.is_leader and db is not None:
+            await self._release_lease(db)
+        self.is_leader = False
+
+    async def _run(self, db):
+        while True:
+            try:
+                was_leader = self.is_leader
+                self.is_leader = await self._acquire_lease(db)
+                if self.is_leader != was_leader:
+                    logger.info(f"⏰ Scheduler {'acquired' if self.is_leader else 'lost'} leadership ({self.owner})")
+                    # Leader baru: jalankan semua job secepatnya
+                    for job in self.jobs.values():
+                        job.next_run = min(job.next_run, time.monotonic())
+                if self.is_leader:
+                    await self._run_due_jobs(db)
+            except asyncio.CancelledError:
+                raise
+            except PyMongoError as e:
+                self.is_leader = False
+                logger.warning(f"⚠️ Scheduler lease check failed: {e}")
+            await asyncio.sleep(SCHEDULER_TICK_SECONDS)
+
+    async def _run_due_jobs(self, db):
+        for job in self.jobs.values():
+            if not self.is_leader:
+                break
+            now = time.monotonic()
+            if now < job.next_run:
+                continue
+            await self.run_job(db, job, lag=now - job.next_run, hold_lease=True)
+
+    async def _heartbeat(self, db) -> bool:
+        try:
+            renewed = await self._acquire_lease(db)
+        except PyMongoError as e:
+            logger.warning(f"⚠️ Scheduler lease renewal failed: {e}")
+            renewed = False
+        if not renewed and self.is_leader:
+            self.is_leader = False
+            logger.warning(f"⏰ Scheduler lost leadership while running a job ({self.owner})")
+        return renewed
+
+    async def _supervise(self, db, job: Job, task: asyncio.Task, hold_lease: bool):
+        """Wait for a job, renewing the lease meanwhile; cancel it past its budget or when the lease is lost."""
+        deadline = time.monotonic() + job.budget
+        beat = SCHEDULER_LEASE_SECONDS / 3
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                done, _ = await asyncio.wait({task}, timeout=min(beat, remaining) if remaining > 0 else 0)
+                if done:
+                    return task.result()
+                if remaining <= 0:
+                    raise TimeoutError(f"exceeded its {job.budget}s budget")
+                if hold_lease and not await self._heartbeat(db):
+                    raise RuntimeError("scheduler lease lost")
+        finally:
+            if not task.done():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+
+    async def run_job(self, db, job: Job, lag: float = 0.0, hold_lease: bool = False) -> int:
+        """Run a job once; with hold_lease the leader lease is renewed while it runs."""
+        job.running = True
+        job.last_lag_s = round(lag, 3)
+        job.max_lag_s = max(job.max_lag_s, lag)
+        job.last_run_at = datetime.utcnow()
+        started = time.perf_counter()
+        processed = 0
+        try:
+            processed = await self._supervise(db, job, asyncio.create_task(job.func(db)), hold_lease) or 0
+            job.last_error = None
+        except Exception as e:
+            job.failures += 1
+            job.last_error = str(e)
+            logger.error(f"❌ Job {job.name} failed: {e}")
+        finally:
+            job.running = False
+            job.runs += 1
+            job.last_processed = processed
+            job.processed += processed
+            job.last_duration_ms = round((time.perf_counter() - started) * 1000, 1)
+            job.next_run = time.monotonic() + job.interval
+        return processed
+
+    def stats(self) -> dict:
+        return {
+            "enabled": SCHEDULER_ENABLED,
+            "owner": self.owner,
+            "is_leader": self.is_leader,
+            "jobs": {name: job.stats() for name, job in self.jobs.items()},
+        }
+
+
+scheduler = Scheduler()
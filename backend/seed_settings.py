@@ -3,7 +3,7 @@ Migration script to seed initial site settings into MongoDB
 Run once to initialize contact, about, and story data
 """
 import asyncio
-from motor.motor_asyncio import AsyncIOMotorClient
+from database import create_client
 import os
 from dotenv import load_dotenv
 from pathlib import Path
@@ -70,7 +70,7 @@ async def seed_settings():
         print("❌ MONGO_URL dan DB_NAME harus diset di .env")
         return
     
-    client = AsyncIOMotorClient(mongo_url)
+    client = create_client(mongo_url)
     db = client[db_name]
     
     try:
@@ -1,8 +1,8 @@
 # === server.py ===
-from fastapi import FastAPI, APIRouter
+from fastapi import FastAPI, APIRouter, Request
+from fastapi.responses import JSONResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
 from pydantic import BaseModel, Field, ConfigDict
 from typing import List
 from datetime import datetime, timezone
@@ -25,15 +25,22 @@ app = FastAPI(title="LoreOmah Backend", version="1.0")
 # === Router prefix /api ===
 api_router = APIRouter(prefix="/api")
 
-# === MongoDB Connection ===
-mongo_url = os.getenv("MONGO_URL")
-db_name = os.getenv("DB_NAME")
-
-if not mongo_url or not db_name:
+# === MongoDB Connection (shared pool, see database.py) ===
+import database
+from indexes import ensure_indexes, merge_declarations
+from email_dispatcher import dispatcher as email_dispatcher
+from events import hub as event_hub
+import notifications
+import analytics
+import availability
+import http_cache
+import images
+from scheduler import scheduler
+
+if not database.MONGO_URL or not database.DB_NAME:
     raise ValueError("⚠️ MONGO_URL dan DB_NAME harus diset di file .env")
 
-client = AsyncIOMotorClient(mongo_url)
-db = client[db_name]
+db = database.get_db()
 app.state.db = db
 
 # === Model ===
@@ -74,19 +81,63 @@ async def get_status_checks():
     return docs
 
 # === Startup & Shutdown Events ===
+async def _reconcile_indexes():
+    app.state.index_report = await ensure_indexes(db, app.state.index_declarations)
+
+
+async def _ensure_slot_counters():
+    # Sebelum rollups: reservasi lama yang mendapat slot berpindah bucket
+    if await availability.ensure_slot_counters(db):
+        await analytics.rebuild_rollups(db)
+
+
+# Dijalankan berurutan; kegagalan satu langkah dicatat tanpa melewati langkah lain
+STARTUP_STEPS = [
+    ("index reconciliation", _reconcile_indexes),
+    ("notification counters", lambda: notifications.ensure_counters(db)),
+    ("reservation slot counters", _ensure_slot_counters),
+    ("reservation rollups", lambda: analytics.ensure_rollups(db)),
+    ("menu category slugs", lambda: menu_category_router.ensure_slugs(db)),
+    ("menu item slugs", lambda: menu_item_router.ensure_slugs(db)),
+    # Versi konten bersama antar worker (ETag/body cache publik)
+    ("cache versions", lambda: http_cache.versions.load(db)),
+]
+
+
 @app.on_event("startup")
 async def startup_db():
     try:
-        # Cek koneksi & buat index unik di users.email
         await db.command("ping")
-        await db.users.create_index("email", unique=True)
-        logging.info("✅ MongoDB connected & 'users.email' index created.")
+        logging.info("✅ MongoDB connected.")
     except Exception as e:
         logging.error(f"❌ MongoDB connection failed: {e}")
+    else:
+        failed = []
+        for name, step in STARTUP_STEPS:
+            try:
+                await step()
+            except Exception as e:
+                failed.append(name)
+                logging.error(f"❌ Startup step '{name}' failed: {e}")
+        if failed:
+            logging.warning(f"⚠️ Startup finished with failed steps: {', '.join(failed)}")
+        else:
+            logging.info("✅ Indexes reconciled, counters and caches ready.")
+    email_dispatcher.start()
+    event_hub.start(db)
+    http_cache.versions.start(db)
+    scheduler.start(db)
 
 @app.on_event("shutdown")
 async def shutdown_db():
-    client.close()
+    from auth import shutdown_password_pool
+    await scheduler.stop(db)
+    await http_cache.versions.stop()
+    await event_hub.stop()
+    await email_dispatcher.stop()
+    shutdown_password_pool()
+    images.shutdown_image_pool()
+    database.close_client()
     logging.info("🛑 MongoDB connection closed.")
 
 # === Include Routers ===
@@ -100,7 +151,21 @@ try:
 except ImportError:
     logging.warning("⚠️ Auth module not found, skipping authentication routes.")
 
-# === Middleware CORS ===
+# === Upload size limit ===
+# Body multipart yang Content-Length-nya sudah melewati batas ditolak sebelum
+# dibaca; upload tanpa Content-Length tetap dibatasi per file oleh upload_service.
+import upload_service
+
+@app.middleware("http")
+async def limit_upload_size(request: Request, call_next):
+    if upload_service.request_too_large(request.headers):
+        return JSONResponse(
+            status_code=413,
+            content={"detail": f"Ukuran file maksimal {upload_service.UPLOAD_MAX_BYTES // (1024 * 1024)}MB"},
+        )
+    return await call_next(request)
+
+# === Middleware CORS (ditambahkan terakhir = paling luar, jadi respons 413 juga dapat header CORS) ===
 app.add_middleware(
     CORSMiddleware,
     allow_origins=os.getenv("CORS_ORIGINS", "*").split(","),
@@ -130,6 +195,9 @@ from routers import slider_router
 app.include_router(slider_router.router)
 
 # === Static Files ===
+# Blob content-addressed dulu (mount dicocokkan berurutan): URL-nya immutable
+import blob_store
+app.mount("/uploads/blobs", blob_store.ImmutableStaticFiles(directory=str(blob_store.BLOB_DIR)), name="blobs")
 app.mount("/uploads", StaticFiles(directory="backend/uploads"), name="uploads")
 
 
@@ -139,6 +207,10 @@ app.include_router(menu_category_router.router)
 # === Gallery ===
 app.include_router(gallery_router.router)
 
+# === Full menu snapshot ===
+from routers import menu_router
+app.include_router(menu_router.router)
+
 # === Reservations ===
 from routers import reservation_router
 app.include_router(reservation_router.router)
@@ -159,6 +231,48 @@ app.include_router(message_router.router)
 from routers import settings_router
 app.include_router(settings_router.router)
 
+# === Notification counters ===
+from routers import notification_router
+app.include_router(notification_router.router)
+
+# === Server-push events (SSE) ===
+from routers import events_router
+app.include_router(events_router.router)
+
+# === Admin (metrics, maintenance) ===
+from routers import admin_router
+app.include_router(admin_router.router)
+
+# === Declared indexes (reconciled on startup) ===
+import auth
+app.state.index_declarations = merge_declarations(
+    auth.INDEXES,
+    slider_router.INDEXES,
+    menu_category_router.INDEXES,
+    gallery_router.INDEXES,
+    reservation_router.INDEXES,
+    menu_item_router.INDEXES,
+    message_router.INDEXES,
+    blob_store.INDEXES,
+)
+
+# === Background jobs (only the scheduler lease holder runs them) ===
+scheduler.register(
+    "expire_pending_reservations",
+    float(os.getenv("RESERVATION_EXPIRY_INTERVAL", "300")),
+    reservation_router.expire_stale_reservations,
+)
+scheduler.register(
+    "reservation_reminders",
+    float(os.getenv("RESERVATION_REMINDER_INTERVAL", "600")),
+    reservation_router.send_reservation_reminders,
+)
+scheduler.register(
+    "blob_gc",
+    float(os.getenv("BLOB_GC_INTERVAL", "3600")),
+    blob_store.collect_garbage,
+)
+
 # === Optional application factory for uvicorn 'server:start' ===
 def start():
     """Return FastAPI app instance (allows 'uvicorn server:start')."""
@@ -0,0 +1,91 @@
+# backend/slugs.py
+"""
+Kunci slug untuk lookup menu tanpa regex.
+slugify("Non Coffee") == slugify("non-coffee") == "non-coffee", jadi lookup
+kategori / item per kategori cukup equality match pada field slug yang ber-index,
+bukan regex case-insensitive (tidak bisa pakai index, dan input user yang tidak
+di-escape rawan regex injection / ReDoS).
+"""
+from pymongo import UpdateOne
+import logging
+import re
+import unicodedata
+
+logger = logging.getLogger(__name__)
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def slugify(text: str | None) -> str:
+    text = unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode()
+    return _NON_ALNUM.sub("-", text.lower()).strip("-")
+
+
+async def backfill_slugs(collection, source_field: str, slug_field: str,
+                         unique: bool = False, batch_size: int = 500, known: dict | None = None) -> dict:
+    """Set `slug_field` = slugify(`source_field`) on documents that don't have it yet.
+
+    Runs in batches (one bulk_write each) and is safe to re-run. With
+    unique=True, clashing slugs get a numeric suffix (menu-2, menu-3, ...).
+    `known` maps source values to an existing slug to use instead of slugify().
+    """
+    known = known or {}
+    taken = set()
+    if unique:
+        taken = {
+            doc[slug_field]
+            async for doc in collection.find({slug_field: {"$type": "string"}}, {"_id": 0, slug_field: 1})
+        }
+    updated = 0
+    last_id = None
+    while True:
+        query = {slug_field: {"$exists": False}}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        batch = await collection.find(query, {"_id": 1, source_field: 1}).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+        ops = []
+        for doc in batch:
+            slug = known.get(doc.get(source_field)) or slugify(doc.get(source_field))
+            if unique:
+                base, n = slug, 2
+                while slug in taken:
+                    slug = f"{base}-{n}"
+                    n += 1
+                taken.add(slug)
+            ops.append(UpdateOne({"_id": doc["_id"], slug_field: {"$exists": False}}, {"$set": {slug_field: slug}}))
+        result = await collection.bulk_write(ops, ordered=False)
+        updated += result.modified_count
+        last_id = batch[-1]["_id"]
+    if updated:
+        logger.info(f"🔤 Backfilled {slug_field} on {updated} {collection.name} documents")
+    return {"collection": collection.name, "field": slug_field, "updated": updated}
+
+
+async def category_slugs(categories) -> dict:
+    """Category name -> the slug stored on it (a backfill clash may have added a suffix)."""
+    return {
+        doc["name"]: doc["slug"]
+        async for doc in categories.find({"slug": {"$type": "string"}}, {"_id": 0, "name": 1, "slug": 1})
+    }
+
+
+async def backfill_category_slugs(items, categories, batch_size: int = 500) -> dict:
+    """Set menu items' category_slug from the slug actually stored on their category.
+
+    Items are joined to categories by name; names without a category fall back
+    to slugify(). Run after the categories' own backfill_slugs(unique=True).
+    """
+    known = await category_slugs(categories)
+    result = await backfill_slugs(items, "category", "category_slug", batch_size=batch_size, known=known)
+    # Items backfilled by re-slugifying before a suffixed category slug existed
+    realigned = 0
+    for name, slug in known.items():
+        if slug != slugify(name):
+            fixed = await items.update_many({"category": name, "category_slug": {"$ne": slug}}, {"$set": {"category_slug": slug}})
+            realigned += fixed.modified_count
+    if realigned:
+        logger.info(f"🔤 Realigned category_slug on {realigned} {items.name} documents")
+    result["updated"] += realigned
+    return result
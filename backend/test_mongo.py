@@ -1,6 +1,6 @@
 import os
 import asyncio
-from motor.motor_asyncio import AsyncIOMotorClient
+from database import create_client
 from dotenv import load_dotenv
 
 
@@ -17,7 +17,7 @@ async def main():
     db_name = os.getenv("DB_NAME", "loreomah")
 
     print(f"Connecting to MongoDB at: {mongo_url} (db: {db_name})")
-    client = AsyncIOMotorClient(mongo_url)
+    client = create_client(mongo_url)
     try:
         res = await client.admin.command("ping")
         print("Ping succeeded:", res)
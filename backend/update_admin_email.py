@@ -3,7 +3,7 @@ Script untuk update email admin di database
 Jalankan: python update_admin_email.py
 """
 import asyncio
-from motor.motor_asyncio import AsyncIOMotorClient
+from database import create_client
 import os
 from dotenv import load_dotenv
 from pathlib import Path
@@ -23,7 +23,7 @@ async def update_admin_email():
         print("❌ MONGO_URL dan DB_NAME harus diset di .env")
         return
     
-    client = AsyncIOMotorClient(mongo_url)
+    client = create_client(mongo_url)
     db = client[db_name]
     
     try:
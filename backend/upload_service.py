@@ -0,0 +1,159 @@
+# backend/upload_service.py
+"""
+Penerimaan upload gambar (dipakai blob_store untuk slider, gallery, kategori
+menu dan gambar cerita).
+- Dibaca per chunk dan ditulis ke file sementara di thread, jadi event loop
+  tidak pernah terblokir oleh disk I/O
+- Batas ukuran (UPLOAD_MAX_BYTES) dicek selama streaming: file kebesaran
+  berhenti dibaca di chunk pertama yang melewati batas, dijawab 413
+- SHA-256 dihitung sambil jalan (tanpa membaca ulang file)
+- Jenis gambar ditentukan dari magic bytes, bukan dari Content-Type / nama
+  file kiriman browser; ekstensi file mengikuti jenis aslinya
+- File sementara di-fsync lalu di-rename atomik ke tujuan (place), jadi
+  /uploads tidak pernah menyajikan file setengah jadi
+"""
+from fastapi import HTTPException, UploadFile
+from pathlib import Path
+import asyncio
+import hashlib
+import os
+import uuid
+
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(10 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+# Ruang untuk field form lain + boundary multipart di atas ukuran file
+UPLOAD_FORM_OVERHEAD = 64 * 1024
+
+# (offset, signature, content type, extension); WebP (RIFF....WEBP) dicek terpisah
+_SIGNATURES = [
+    (0, b"\xff\xd8\xff", "image/jpeg", "jpg"),
+    (0, b"\x89PNG\r\n\x1a\n", "image/png", "png"),
+    (0, b"GIF87a", "image/gif", "gif"),
+    (0, b"GIF89a", "image/gif", "gif"),
+    (4, b"ftypavif", "image/avif", "avif"),
+    (4, b"ftypavis", "image/avif", "avif"),
+]
+
+
+def sniff_image_type(head: bytes) -> tuple | None:
+    """(content_type, extension) from the first bytes of a file, or None if not a supported image."""
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp", "webp"
+    for offset, signature, content_type, extension in _SIGNATURES:
+        if head[offset:offset + len(signature)] == signature:
+            return content_type, extension
+    return None
+
+
+def request_too_large(headers) -> bool:
+    """True if a multipart request declares a body that can't fit within the upload limit."""
+    if not headers.get("content-type", "").startswith("multipart/form-data"):
+        return False
+    try:
+        return int(headers.get("content-length", "0")) > UPLOAD_MAX_BYTES + UPLOAD_FORM_OVERHEAD
+    except ValueError:
+        return False
+
+
+def _open(directory: Path, tmp: Path):
+    directory.mkdir(parents=True, exist_ok=True)
+    return open(tmp, "wb")
+
+
+def _write(f, hasher, chunk: bytes):
+    # hashlib melepas GIL untuk buffer besar, jadi hash + tulis sama-sama di thread
+    hasher.update(chunk)
+    f.write(chunk)
+
+
+def _finish(f):
+    f.flush()
+    os.fsync(f.fileno())
+    f.close()
+
+
+def _discard(f, tmp: Path):
+    f.close()
+    tmp.unlink(missing_ok=True)
+
+
+def place(tmp: Path, target: Path, overwrite: bool = False) -> bool:
+    """Move a received temp file to `target`; False (and tmp removed) if an identical target already exists.
+
+    With overwrite the file is always moved, replacing whatever is at `target`.
+    """
+    if target.exists() and not overwrite:
+        tmp.unlink(missing_ok=True)
+        return False
+    target.parent.mkdir(parents=True, exist_ok=True)
+    os.replace(tmp, target)
+    return True
+
+
+async def receive_image(upload: UploadFile, directory: Path, max_bytes: int = UPLOAD_MAX_BYTES) -> dict:
+    """Stream an uploaded image into a temp file inside `directory`.
+
+    Returns {"tmp", "size", "sha256", "content_type", "extension"}; the caller
+    must place() or unlink tmp. Raises 400 for an empty or non-image file and
+    413 when it exceeds `max_bytes`.
+    """
+    tmp = directory / f".{uuid.uuid4().hex}.part"
+    f = await asyncio.to_thread(_open, directory, tmp)
+    hasher = hashlib.sha256()
+    size = 0
+    kind = None
+    try:
+        while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+            if kind is None:
+                kind = sniff_image_type(chunk[:32])
+                if kind is None:
+                    raise HTTPException(status_code=400, detail="File harus berupa gambar (JPEG, PNG, WebP, GIF atau AVIF)")
+            size += len(chunk)
+            if size > max_bytes:
+                raise HTTPException(status_code=413, detail=f"Ukuran file maksimal {max_bytes // (1024 * 1024)}MB")
+            await asyncio.to_thread(_write, f, hasher, chunk)
+        if size == 0:
+            raise HTTPException(status_code=400, detail="File kosong")
+        await asyncio.to_thread(_finish, f)
+    except BaseException:
+        # Juga saat request dibatalkan; close + unlink cukup murah untuk dijalankan langsung
+        _discard(f, tmp)
+        raise
+    content_type, extension = kind
+    return {
+        "tmp": tmp,
+        "size": size,
+        "sha256": hasher.hexdigest(),
+        "content_type": content_type,
+        "extension": extension,
+    }
+
+
+def _copy(source: Path, directory: Path) -> dict:
+    tmp = directory / f".{uuid.uuid4().hex}.part"
+    hasher = hashlib.sha256()
+    size = 0
+    kind = None
+    with open(source, "rb") as src:
+        f = _open(directory, tmp)
+        try:
+            while chunk := src.read(UPLOAD_CHUNK_SIZE):
+                if kind is None:
+                    kind = sniff_image_type(chunk[:32])
+                    if kind is None:
+                        raise ValueError(f"{source.name} is not a supported image")
+                size += len(chunk)
+                _write(f, hasher, chunk)
+            if size == 0:
+                raise ValueError(f"{source.name} is empty")
+            _finish(f)
+        except BaseException:
+            _discard(f, tmp)
+            raise
+    content_type, extension = kind
+    return {"tmp": tmp, "size": size, "sha256": hasher.hexdigest(), "content_type": content_type, "extension": extension}
+
+
+async def receive_file(source: Path, directory: Path) -> dict:
+    """receive_image for a file already on disk (migrations); ValueError if it isn't an image."""
+    return await asyncio.to_thread(_copy, source, directory)
@@ -1,45 +1,74 @@
+import asyncio
 import httpx
 import logging
+import os
 from typing import Optional
 
 logger = logging.getLogger(__name__)
 
 WHATSAPP_BOT_URL = "http://localhost:3001"
+# Notifikasi otomatis (konfirmasi massal, reminder) hanya jika bot WA aktif
+WHATSAPP_NOTIFY_ENABLED = os.getenv("WHATSAPP_NOTIFY_ENABLED", "false").lower() == "true"
 
-async def send_whatsapp_message(phone: str, message: str) -> bool:
+async def send_whatsapp_message(phone: str, message: str, client: Optional[httpx.AsyncClient] = None) -> bool:
     """
     Kirim pesan WhatsApp ke nomor tertentu
     
     Args:
         phone: Nomor telepon (format: 628xxx atau 08xxx)
         message: Isi pesan
+        client: httpx client yang dipakai bersama (opsional, untuk batch)
         
     Returns:
         bool: True jika berhasil, False jika gagal
     """
+    if client is None:
+        async with httpx.AsyncClient(timeout=30.0) as own_client:
+            return await send_whatsapp_message(phone, message, own_client)
     try:
         # Normalisasi nomor telepon
         phone_clean = phone.replace("+", "").replace("-", "").replace(" ", "")
         if phone_clean.startswith("0"):
             phone_clean = "62" + phone_clean[1:]
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                f"{WHATSAPP_BOT_URL}/send-message",
-                json={"phone": phone_clean, "message": message}
-            )
-            
-            if response.status_code == 200:
-                logger.info(f"✅ Pesan WA berhasil dikirim ke {phone_clean}")
-                return True
-            else:
-                logger.error(f"❌ Gagal kirim WA: {response.text}")
-                return False
+        response = await client.post(
+            f"{WHATSAPP_BOT_URL}/send-message",
+            json={"phone": phone_clean, "message": message}
+        )
+        
+        if response.status_code == 200:
+            logger.info(f"✅ Pesan WA berhasil dikirim ke {phone_clean}")
+            return True
+        else:
+            logger.error(f"❌ Gagal kirim WA: {response.text}")
+            return False
                 
     except Exception as e:
         logger.error(f"❌ Error kirim WA ke {phone}: {str(e)}")
         return False
 
+async def send_whatsapp_batch(messages: list, concurrency: int = 4, per_second: Optional[float] = None) -> int:
+    """
+    Kirim banyak pesan WA lewat satu koneksi HTTP, maksimal `concurrency` sekaligus
+    
+    Args:
+        messages: list of (phone, message)
+        per_second: batas laju pengiriman (opsional), supaya nomor bot tidak diblokir
+        
+    Returns:
+        int: jumlah pesan yang berhasil dikirim
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    interval = 1 / per_second if per_second else 0
+    async with httpx.AsyncClient(timeout=30.0) as client:
+        async def send_one(index, phone, message):
+            if interval:
+                await asyncio.sleep(index * interval)
+            async with semaphore:
+                return await send_whatsapp_message(phone, message, client)
+        results = await asyncio.gather(*[send_one(i, phone, message) for i, (phone, message) in enumerate(messages)])
+    return sum(1 for ok in results if ok)
+
 async def check_whatsapp_status() -> dict:
     """Cek status WhatsApp bot"""
     try:
@@ -96,6 +125,25 @@ Kami tunggu kedatangan Anda! 😊
 
 _Cafe Loreomah - Suasana Sejuk Pedesaan_"""
 
+def format_reservation_reminder_message(name: str, date: str, time: str, guests: int) -> str:
+    """Format pesan pengingat H-1 reservasi"""
+    return f"""⏰ *Pengingat Reservasi*
+
+Halo {name}! 👋
+
+Sekadar mengingatkan, Anda punya reservasi di Cafe Loreomah:
+
+• Tanggal: {date}
+• Waktu: {time}
+• Jumlah Tamu: {guests} orang
+
+Jika ada perubahan, mohon kabari kami minimal 2 jam sebelumnya:
+📞 0821-4243-3998
+
+Sampai jumpa! 😊
+
+_Cafe Loreomah - Suasana Sejuk Pedesaan_"""
+
 def format_reservation_declined_message(name: str, date: str, time: str) -> str:
     """Format pesan reservasi ditolak"""
     return f"""❌ *Reservasi Tidak Dapat Diproses*
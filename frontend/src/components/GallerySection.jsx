@@ -1,5 +1,6 @@
 import React, { useEffect, useState } from 'react';
 import API from '../api/api';
+import ResponsiveImage from './ResponsiveImage';
 import { Dialog, DialogContent, DialogClose } from '../components/ui/dialog';
 
 const GallerySection = () => {
@@ -44,7 +45,7 @@ const GallerySection = () => {
               onKeyDown={(e) => { if (e.key === 'Enter') setSelected(item); }}
             >
               {item.image_url ? (
-                <img src={`http://localhost:8000${item.image_url}`} alt={item.title || ''} className="w-full h-full object-cover transition-transform duration-500 group-hover:scale-110" />
+                <ResponsiveImage src={item.image_url} variants={item.image_variants} sizes="(min-width: 1024px) 17vw, (min-width: 640px) 33vw, 50vw" alt={item.title || ''} className="w-full h-full object-cover transition-transform duration-500 group-hover:scale-110" />
               ) : (
                 <div className="w-full h-full bg-gray-100 flex items-center justify-center">No image</div>
               )}
@@ -58,7 +59,7 @@ const GallerySection = () => {
           {selected && (
             <DialogContent className="max-w-4xl w-full bg-transparent p-0 shadow-none">
               <div className="relative bg-black rounded flex items-center justify-center">
-                <img src={`http://localhost:8000${selected.image_url}`} alt={selected.title || ''} className="w-full max-h-[80vh] object-contain mx-auto" />
+                <ResponsiveImage src={selected.image_url} variants={selected.image_variants} alt={selected.title || ''} className="w-full max-h-[80vh] object-contain mx-auto" />
                 <div className="absolute right-3 top-3">
                   <DialogClose />
                 </div>
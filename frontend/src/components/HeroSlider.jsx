@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from "react";
 import { ChevronLeft, ChevronRight } from "lucide-react";
 import API from '../api/api';
+import ResponsiveImage from './ResponsiveImage';
 
 const HeroSlider = () => {
   const [sliders, setSliders] = useState([]);
@@ -66,8 +67,9 @@ const HeroSlider = () => {
           }`}
         >
           <div className="absolute inset-0">
-            <img
-              src={`http://localhost:8000${slide.image}`}
+            <ResponsiveImage
+              src={slide.image}
+              variants={slide.image_variants}
               alt={slide.title}
               className="w-full h-full object-cover"
             />
@@ -1,6 +1,7 @@
 import React, { useEffect, useState } from "react";
 import { useNavigate } from "react-router-dom";
 import API from "../api/api"; // pastikan ini sudah ada seperti di AdminDashboard
+import ResponsiveImage from "./ResponsiveImage";
 
 const MenuSection = () => {
   const navigate = useNavigate();
@@ -49,8 +50,10 @@ const MenuSection = () => {
               onClick={() => navigate(`/menu/${category.name.toLowerCase()}`)}
             >
               <div className="relative overflow-hidden rounded-lg shadow-lg mb-3 sm:mb-4 h-48 sm:h-56 md:h-64">
-                <img
-                  src={`http://localhost:8000${category.image_url}`}
+                <ResponsiveImage
+                  src={category.image_url}
+                  variants={category.image_variants}
+                  sizes="(min-width: 1024px) 25vw, (min-width: 640px) 50vw, 100vw"
                   alt={category.title}
                   className="w-full h-full object-cover transition-transform duration-500 group-hover:scale-110"
                 />
@@ -0,0 +1,40 @@
+import React from 'react';
+
+const API_BASE = process.env.REACT_APP_BACKEND_URL || 'http://localhost:8000';
+
+const MIME = { avif: 'image/avif', webp: 'image/webp', jpeg: 'image/jpeg' };
+
+// URL upload dari backend bisa relatif (/uploads/...) atau sudah penuh (http...)
+export const assetUrl = (url) => (url && url.startsWith('/') ? `${API_BASE}${url}` : url);
+
+const srcSet = (files) => files.map((f) => `${assetUrl(f.url)} ${f.width}w`).join(', ');
+
+// Gambar upload (slider / gallery / kategori) dengan turunan image_variants dari
+// backend: browser memilih format (AVIF/WebP/JPEG) dan lebar yang paling pas.
+// Dokumen lama tanpa image_variants tetap memakai file original.
+const ResponsiveImage = ({ src, variants, sizes = '100vw', alt = '', ...props }) => {
+  const formats = variants?.formats || {};
+  const jpeg = formats.jpeg || [];
+  if (!jpeg.length) {
+    return <img src={assetUrl(src)} alt={alt} {...props} />;
+  }
+  return (
+    // display: contents supaya class ukuran (w-full h-full) di <img> tetap berlaku
+    <picture style={{ display: 'contents' }}>
+      {['avif', 'webp'].filter((name) => formats[name]?.length).map((name) => (
+        <source key={name} type={MIME[name]} srcSet={srcSet(formats[name])} sizes={sizes} />
+      ))}
+      <img
+        src={assetUrl(jpeg[jpeg.length - 1].url)}
+        srcSet={srcSet(jpeg)}
+        sizes={sizes}
+        width={variants.width}
+        height={variants.height}
+        alt={alt}
+        {...props}
+      />
+    </picture>
+  );
+};
+
+export default ResponsiveImage;
@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import API from '../api/api';
+import { assetUrl } from './ResponsiveImage';
 
 const StorySection = () => {
   const [storyData, setStoryData] = useState({
@@ -9,8 +10,8 @@ const StorySection = () => {
   });
 
   useEffect(() => {
-    API.get('/api/settings/')
-      .then(res => setStoryData(res.data.story || storyData))
+    API.get('/api/settings/story')
+      .then(res => setStoryData(res.data || storyData))
       .catch(err => console.error('Failed to load story settings:', err));
   }, []);
 
@@ -35,7 +36,7 @@ const StorySection = () => {
           <div className="flex justify-center lg:justify-end">
             <div className="relative w-full max-w-md">
               <img
-                src={storyData.image}
+                src={assetUrl(storyData.image)}
                 alt="Cafe Loreomah Story"
                 className="w-full h-auto rounded-lg shadow-2xl"
               />
@@ -19,8 +19,8 @@ const AboutPage = () => {
   };
 
   useEffect(() => {
-    API.get('/api/settings/')
-      .then(res => setAboutData(res.data.about || aboutData))
+    API.get('/api/settings/about')
+      .then(res => setAboutData(res.data || aboutData))
       .catch(err => console.error('Failed to load about settings:', err));
   }, []);
 
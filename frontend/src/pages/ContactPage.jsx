@@ -30,8 +30,8 @@ const ContactPage = () => {
 
   // Fetch contact settings
   useEffect(() => {
-    API.get('/api/settings/')
-      .then(res => setContactData(res.data.contact || contactData))
+    API.get('/api/settings/contact')
+      .then(res => setContactData(res.data || contactData))
       .catch(err => console.error('Failed to load contact settings:', err));
   }, []);
 
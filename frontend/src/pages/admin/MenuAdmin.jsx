@@ -25,24 +25,18 @@ const MenuAdmin = () => {
 
   const fetchCategories = async () => {
     try {
-      const res = await API.get("/api/menu-categories/");
-      setCategories(res.data);
+      // Satu request: semua kategori beserta item-nya
+      const res = await API.get("/api/menu");
+      const menuCategories = res.data.categories || [];
+      setCategories(menuCategories);
       // Initialize per-category item form state
       const initForms = {};
-      res.data.forEach(cat => {
+      const itemsMap = {};
+      menuCategories.forEach(cat => {
         initForms[cat.name.toLowerCase()] = { name: "", price: "", description: "" };
+        itemsMap[cat.name.toLowerCase()] = cat.items || [];
       });
       setNewItemsForm(initForms);
-      // Fetch items for each category
-      const itemsMap = {};
-      await Promise.all(res.data.map(async (cat) => {
-        try {
-          const itemsRes = await API.get(`/api/menu-items/${cat.name.toLowerCase()}/`);
-          itemsMap[cat.name.toLowerCase()] = itemsRes.data || [];
-        } catch (e) {
-          itemsMap[cat.name.toLowerCase()] = [];
-        }
-      }));
       setCategoryItems(itemsMap);
     } catch (error) {
       console.error("Gagal memuat kategori:", error);
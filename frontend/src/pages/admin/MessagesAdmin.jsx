@@ -11,15 +11,20 @@ import API from "../../api/api";
 const MessagesAdmin = () => {
   const { toast } = useToast();
   const [messages, setMessages] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [unreadCount, setUnreadCount] = useState(0);
   const [loading, setLoading] = useState(false);
   const [selectedMessage, setSelectedMessage] = useState(null);
   const [deleteTarget, setDeleteTarget] = useState(null);
 
-  const fetchMessages = async () => {
+  const fetchMessages = async (cursor = null) => {
     setLoading(true);
     try {
-      const res = await API.get("/api/messages/");
-      setMessages(res.data.messages || []);
+      const res = await API.get("/api/messages/", { params: cursor ? { cursor } : {} });
+      const page = res.data.messages || [];
+      setMessages((prev) => (cursor ? [...prev, ...page] : page));
+      setNextCursor(res.data.next_cursor || null);
+      setUnreadCount(res.data.unread || 0);
     } catch (error) {
       console.error("Gagal memuat pesan:", error);
       toast({ title: "Gagal memuat pesan", variant: "destructive" });
@@ -32,6 +37,17 @@ const MessagesAdmin = () => {
     fetchMessages();
   }, []);
 
+  // Daftar hanya berisi cuplikan; isi lengkap diambil saat pesan dibuka
+  const openMessage = async (msg) => {
+    setSelectedMessage(msg);
+    try {
+      const res = await API.get(`/api/messages/${msg.id}`);
+      setSelectedMessage((current) => (current?.id === msg.id ? res.data : current));
+    } catch (error) {
+      console.error("Gagal memuat isi pesan:", error);
+    }
+  };
+
   const handleMarkAsRead = async (messageId) => {
     try {
       await API.patch(`/api/messages/${messageId}/read`);
@@ -73,8 +89,6 @@ const MessagesAdmin = () => {
     });
   };
 
-  const unreadCount = messages.filter(m => !m.is_read).length;
-
   return (
     <>
       <Card>
@@ -91,7 +105,7 @@ const MessagesAdmin = () => {
           <CardDescription className="text-xs sm:text-sm">Lihat dan kelola pesan dari pelanggan.</CardDescription>
         </CardHeader>
         <CardContent className="p-3 sm:p-6">
-          {loading ? (
+          {loading && messages.length === 0 ? (
             <p className="text-center text-gray-500 text-sm">Memuat pesan...</p>
           ) : messages.length === 0 ? (
             <div className="text-center py-8 sm:py-12">
@@ -106,7 +120,7 @@ const MessagesAdmin = () => {
                   className={`p-3 sm:p-4 border rounded-lg cursor-pointer transition-colors ${
                     msg.is_read ? "bg-gray-50" : "bg-blue-50 border-blue-200"
                   } hover:shadow-md`}
-                  onClick={() => setSelectedMessage(msg)}
+                  onClick={() => openMessage(msg)}
                 >
                   <div className="flex justify-between items-start mb-1.5 sm:mb-2">
                     <div className="flex-1 min-w-0">
@@ -137,9 +151,16 @@ const MessagesAdmin = () => {
                       </Button>
                     </div>
                   </div>
-                  <p className="text-[10px] sm:text-sm text-gray-700 line-clamp-2">{msg.message}</p>
+                  <p className="text-[10px] sm:text-sm text-gray-700 line-clamp-2">{msg.snippet}</p>
                 </div>
               ))}
+              {nextCursor && (
+                <div className="text-center pt-2">
+                  <Button variant="outline" size="sm" disabled={loading} onClick={() => fetchMessages(nextCursor)}>
+                    {loading ? "Memuat..." : "Muat lebih banyak"}
+                  </Button>
+                </div>
+              )}
             </div>
           )}
         </CardContent>
@@ -174,7 +195,7 @@ const MessagesAdmin = () => {
             </div>
             <div className="border-t pt-3 sm:pt-4">
               <p className="text-gray-500 text-xs sm:text-sm mb-2">Pesan:</p>
-              <p className="text-gray-800 whitespace-pre-wrap text-xs sm:text-sm">{selectedMessage?.message}</p>
+              <p className="text-gray-800 whitespace-pre-wrap text-xs sm:text-sm">{selectedMessage?.message ?? selectedMessage?.snippet}</p>
             </div>
           </div>
           <DialogFooter className="flex-col sm:flex-row gap-2">
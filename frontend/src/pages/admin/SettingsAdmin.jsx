@@ -6,6 +6,7 @@ import { Card } from "../../components/ui/card";
 import { Tabs, TabsContent, TabsList, TabsTrigger } from "../../components/ui/tabs";
 import { Settings, Save, Phone, MapPin, Instagram, Facebook, Mail } from "lucide-react";
 import API from "../../api/api";
+import { assetUrl } from "../../components/ResponsiveImage";
 import { useToast } from "../../hooks/use-toast";
 
 const SettingsAdmin = () => {
@@ -93,6 +94,27 @@ const SettingsAdmin = () => {
     }));
   };
 
+  const uploadStoryImage = async (file) => {
+    if (!file) return;
+    const formData = new FormData();
+    formData.append("image", file);
+    setLoading(true);
+    try {
+      const res = await API.post("/api/settings/story/image", formData);
+      handleStoryChange("image", res.data.story.image);
+      toast({ title: "Berhasil", description: "Gambar cerita berhasil diupload" });
+    } catch (err) {
+      console.error("Failed to upload story image:", err);
+      toast({
+        title: "Error",
+        description: err.response?.data?.detail || "Gagal mengupload gambar",
+        variant: "destructive"
+      });
+    } finally {
+      setLoading(false);
+    }
+  };
+
   const handleParagraphChange = (index, value) => {
     setSettings(prev => {
       const newParagraphs = [...prev.story.paragraphs];
@@ -351,8 +373,15 @@ const SettingsAdmin = () => {
                   onChange={(e) => handleStoryChange("image", e.target.value)}
                   placeholder="http://localhost:8000/uploads/sliders/..."
                 />
+                <Input
+                  type="file"
+                  accept="image/*"
+                  className="mt-2"
+                  disabled={loading}
+                  onChange={(e) => uploadStoryImage(e.target.files?.[0])}
+                />
                 {settings.story.image && (
-                  <img src={settings.story.image} alt="Preview" className="mt-2 w-40 h-40 object-cover rounded border" />
+                  <img src={assetUrl(settings.story.image)} alt="Preview" className="mt-2 w-40 h-40 object-cover rounded border" />
                 )}
               </div>
               
@@ -0,0 +1,45 @@
+"""
+Shared fixtures: backend modules on sys.path (they import each other as
+top-level modules, like server.py does) and an in-memory Motor database
+(mongomock-motor) so routers can be exercised without a running mongod.
+"""
+from pathlib import Path
+import sys
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from fastapi import FastAPI  # noqa: E402
+from mongomock_motor import AsyncMongoMockClient  # noqa: E402
+import httpx  # noqa: E402
+
+import http_cache  # noqa: E402
+
+
+@pytest.fixture
+def db():
+    return AsyncMongoMockClient()["loreomah_test"]
+
+
+@pytest.fixture(autouse=True)
+def _reset_http_cache():
+    # Versions and cached bodies are per process; every test starts from a fresh database
+    http_cache.versions._versions.clear()
+    http_cache._bodies.clear()
+    yield
+
+
+@pytest.fixture
+def make_client(db):
+    """Factory for an AsyncClient on an app with only the given routers and app.state.db = db."""
+
+    def factory(*routers, overrides: dict | None = None) -> httpx.AsyncClient:
+        app = FastAPI()
+        app.state.db = db
+        for router in routers:
+            app.include_router(router)
+        app.dependency_overrides.update(overrides or {})
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+    return factory
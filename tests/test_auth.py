@@ -0,0 +1,85 @@
+"""
+Cached auth claims: a role change made elsewhere (another worker, or directly
+in the database) is picked up once AUTH_CLAIMS_TTL has passed, because the
+role is then read from the database again instead of the principal cache.
+"""
+import asyncio
+import time
+
+import pytest
+
+import auth
+import cache
+
+ADMIN = "admin@loreomah.test"
+
+
+@pytest.fixture(autouse=True)
+def _fresh_auth_cache():
+    auth._claims_cache.clear()
+    auth._principal_cache.clear()
+    yield
+    auth._claims_cache.clear()
+    auth._principal_cache.clear()
+
+
+def _later(monkeypatch, seconds: float):
+    # Caches compare against time.monotonic(); move only their clock forward
+    now = time.monotonic() + seconds
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now)
+
+
+def test_demoted_admin_loses_access_after_claims_ttl(db, make_client, monkeypatch):
+    token = auth.create_access_token({"sub": ADMIN, "role": "admin"})
+    headers = {"Authorization": f"Bearer {token}"}
+
+    async def request():
+        async with make_client(auth.router) as client:
+            return (await client.get("/auth/cache-stats", headers=headers)).status_code
+
+    async def demote():
+        # Another worker (or a manual edit) changes the role; this worker's caches are untouched
+        await db["users"].update_one({"email": ADMIN}, {"$set": {"role": "user"}})
+
+    asyncio.run(db["users"].insert_one({"email": ADMIN, "role": "admin"}))
+    assert asyncio.run(request()) == 200
+    asyncio.run(demote())
+
+    # Principal cache (AUTH_PRINCIPAL_TTL) is still fresh, claims are not
+    assert auth.AUTH_CLAIMS_TTL < auth.AUTH_PRINCIPAL_TTL
+    _later(monkeypatch, auth.AUTH_CLAIMS_TTL + 0.1)
+
+    assert asyncio.run(request()) == 403
+
+
+def test_deleted_user_token_stops_working_after_claims_ttl(db, make_client, monkeypatch):
+    token = auth.create_access_token({"sub": ADMIN, "role": "admin"})
+    headers = {"Authorization": f"Bearer {token}"}
+
+    async def request():
+        async with make_client(auth.router) as client:
+            return (await client.get("/auth/me", headers=headers)).status_code
+
+    asyncio.run(db["users"].insert_one({"email": ADMIN, "role": "admin"}))
+    assert asyncio.run(request()) == 200
+    asyncio.run(db["users"].delete_one({"email": ADMIN}))
+    _later(monkeypatch, auth.AUTH_CLAIMS_TTL + 0.1)
+
+    assert asyncio.run(request()) == 404
+
+
+def test_otp_endpoints_answer_503_when_the_email_queue_is_full(db, make_client, monkeypatch):
+    monkeypatch.setattr(auth, "send_otp_email", lambda *args: False)
+
+    async def scenario():
+        async with make_client(auth.router) as client:
+            register = await client.post("/auth/user/register", json={"email": "guest@example.com", "password": "rahasia123"})
+            resend = await client.post("/auth/resend-otp", json={"email": "guest@example.com"})
+        return register, resend, await db["users"].find_one({"email": "guest@example.com"})
+
+    register, resend, user = asyncio.run(scenario())
+
+    assert (register.status_code, resend.status_code) == (503, 503)
+    assert register.headers["Retry-After"] == resend.headers["Retry-After"]
+    # The account and its OTP are kept, so registering or resending again works
+    assert user["otp_code"] and not user["email_verified"]
@@ -0,0 +1,123 @@
+"""
+Slot capacity: reserve_seats never overbooks under concurrent calls, and
+ensure_slot_counters makes reservations that existed before capacity tracking
+hold their seats.
+"""
+from datetime import datetime, timedelta
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+import availability
+
+SLOT = "2030-01-07T10:00"
+
+
+async def _booked(db, slot: str = SLOT) -> int:
+    doc = await db[availability.SLOTS_COLLECTION].find_one({"_id": slot})
+    return (doc or {}).get("booked", 0)
+
+
+async def _attempt(db, guests: int, slot: str = SLOT):
+    try:
+        await availability.reserve_seats(db, slot, guests)
+        return "ok"
+    except HTTPException as e:
+        return e.status_code
+
+
+@pytest.fixture
+def capacity(monkeypatch):
+    monkeypatch.setattr(availability, "RESERVATION_SEATS_PER_SLOT", 10)
+    return 10
+
+
+def test_concurrent_bookings_never_exceed_capacity(db, capacity):
+    async def scenario():
+        results = await asyncio.gather(*(_attempt(db, 1) for _ in range(15)))
+        return results, await _booked(db)
+
+    results, booked = asyncio.run(scenario())
+
+    assert results.count("ok") == capacity
+    assert results.count(409) == 5
+    assert booked == capacity
+
+
+def test_last_seats_go_to_only_one_of_two_concurrent_bookings(db, capacity):
+    async def scenario():
+        await availability.reserve_seats(db, SLOT, 7)
+        results = await asyncio.gather(_attempt(db, 3), _attempt(db, 3))
+        return results, await _booked(db)
+
+    results, booked = asyncio.run(scenario())
+
+    assert sorted(results, key=str) == [409, "ok"]
+    assert booked == capacity
+
+
+def test_party_larger_than_slot_is_rejected(db, capacity):
+    assert asyncio.run(_attempt(db, capacity + 1)) == 409
+    assert asyncio.run(_booked(db)) == 0
+
+
+def _visit_in_days(days: int, hour: int = 10) -> str:
+    # Naive ISO string = WIB, like legacy reservations sent by the browser
+    day = datetime.now(availability.WIB).date() + timedelta(days=days)
+    return f"{day.isoformat()}T{hour:02d}:30"
+
+
+def test_ensure_slot_counters_counts_legacy_reservations(db, capacity):
+    visit = _visit_in_days(3)
+    slot = f"{visit[:10]}T10:00"
+
+    async def scenario():
+        # Counters already exist (e.g. built by another worker) but legacy reservations hold no seats yet
+        await db[availability.SLOTS_COLLECTION].insert_one({"_id": slot, "booked": 2, "date": slot[:10]})
+        await db["reservations"].insert_many([
+            {"id": "future", "status": "confirmed", "guests": 4, "date": visit},
+            {"id": "cancelled", "status": "cancelled", "guests": 5, "date": visit},
+            {"id": "past", "status": "pending", "guests": 3, "date": _visit_in_days(-3)},
+            {"id": "closed", "status": "pending", "guests": 3, "date": _visit_in_days(3, hour=23)},
+        ])
+        assigned = await availability.ensure_slot_counters(db)
+        again = await availability.ensure_slot_counters(db)
+        slots = {doc["id"]: doc.get("slot") async for doc in db["reservations"].find({})}
+        return assigned, again, slots, await _booked(db, slot)
+
+    assigned, again, slots, booked = asyncio.run(scenario())
+
+    assert assigned == 1
+    assert again == 0
+    assert slots == {"future": slot, "cancelled": None, "past": None, "closed": None}
+    assert booked == 6
+
+    # The last seats are now really taken
+    async def book_rest():
+        return await _attempt(db, 5, slot), await _attempt(db, 4, slot)
+
+    assert asyncio.run(book_rest()) == (409, "ok")
+
+
+def test_ensure_slot_counters_rebuilds_on_first_start(db, monkeypatch):
+    rebuilt = []
+
+    async def fake_rebuild(db, reservations_collection="reservations"):
+        rebuilt.append(reservations_collection)
+        return 1
+
+    # The $merge pipeline itself needs a real mongod
+    monkeypatch.setattr(availability, "rebuild_slot_counters", fake_rebuild)
+
+    async def scenario():
+        empty = await availability.ensure_slot_counters(db)
+        await db["reservations"].insert_one({"id": "r1", "status": "pending", "guests": 2, "date": _visit_in_days(1)})
+        assigned = await availability.ensure_slot_counters(db)
+        return empty, assigned
+
+    empty, assigned = asyncio.run(scenario())
+
+    assert empty == 0
+    assert assigned == 1
+    assert rebuilt == ["reservations"]
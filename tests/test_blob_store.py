@@ -0,0 +1,171 @@
+"""
+Blob store reference counting and garbage collection: identical uploads share
+one blob, replacing the story image releases the old one, and a put() racing
+collect_garbage() ends with the file on disk. The story image write is
+rejected when its blob can no longer be retained.
+"""
+from datetime import datetime, timedelta
+import asyncio
+import io
+import time
+
+import pytest
+from PIL import Image
+
+import blob_store
+import images
+from auth import require_admin
+from routers import settings_router
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(images, "UPLOAD_ROOT", tmp_path)
+    monkeypatch.setattr(blob_store, "BLOB_DIR", tmp_path / "uploads" / "blobs")
+    blob_store.BLOB_DIR.mkdir(parents=True)
+
+    async def no_variants(image_url):
+        # Rendering derivatives needs the process pool; refcounts don't care
+        return {"width": 1, "height": 1, "formats": {}}
+
+    monkeypatch.setattr(images, "build_variants", no_variants)
+    return tmp_path
+
+
+def _png(path, color):
+    buffer = io.BytesIO()
+    Image.new("RGB", (4, 4), color).save(buffer, "PNG")
+    path.write_bytes(buffer.getvalue())
+    return path
+
+
+async def _refs(db, url: str):
+    doc = await db[blob_store.COLLECTION_NAME].find_one({"_id": blob_store.blob_id(url)})
+    return doc and doc["refs"]
+
+
+async def _expire(db, url: str):
+    # Lewati masa tenggang GC
+    await db[blob_store.COLLECTION_NAME].update_one(
+        {"_id": blob_store.blob_id(url)}, {"$set": {"updated_at": datetime.utcnow() - timedelta(days=1)}}
+    )
+
+
+def test_identical_uploads_share_one_blob(db, store):
+    async def scenario():
+        first = await blob_store.put_file(db, _png(store / "a.png", "red"))
+        second = await blob_store.put_file(db, _png(store / "b.png", "red"))
+        other = await blob_store.put_file(db, _png(store / "c.png", "blue"))
+        return first, second, other, await _refs(db, first["image_url"]), await _refs(db, other["image_url"])
+
+    first, second, other, shared_refs, other_refs = asyncio.run(scenario())
+
+    assert first["image_url"] == second["image_url"]
+    assert other["image_url"] != first["image_url"]
+    assert (shared_refs, other_refs) == (2, 1)
+    assert images.path_for(first["image_url"]).exists()
+    assert list(blob_store.BLOB_DIR.glob(".*.part")) == []
+
+
+def test_gc_keeps_referenced_blobs_and_collects_released_ones(db, store, monkeypatch):
+    monkeypatch.setattr(blob_store, "BLOB_GC_GRACE_SECONDS", 0)
+
+    async def scenario():
+        kept = await blob_store.put_file(db, _png(store / "a.png", "red"))
+        dropped = await blob_store.put_file(db, _png(store / "b.png", "blue"))
+        await blob_store.release(db, dropped["image_url"])
+        await asyncio.sleep(0.01)
+        return kept, dropped, await blob_store.collect_garbage(db)
+
+    kept, dropped, removed = asyncio.run(scenario())
+
+    assert removed == 1
+    assert images.path_for(kept["image_url"]).exists()
+    assert not images.path_for(dropped["image_url"]).exists()
+    assert asyncio.run(_refs(db, dropped["image_url"])) is None
+
+
+def test_replacing_story_image_releases_the_old_blob(db, store, make_client):
+    async def scenario():
+        old = await blob_store.put_file(db, _png(store / "a.png", "red"))
+        new = await blob_store.put_file(db, _png(store / "b.png", "blue"))
+        # Taruh old sebagai gambar cerita; referensi dari put_file diserahkan ke settings
+        await settings_router._write(db, {"story": {"title": "Cerita", "paragraphs": [], "image": old["image_url"]}},
+                                     retained=old["image_url"])
+        async with make_client(settings_router.router, overrides={require_admin: lambda: {"role": "admin"}}) as client:
+            response = await client.put("/api/settings/story", json={
+                "title": "Cerita", "paragraphs": [], "image": new["image_url"],
+            })
+            # Menyimpan ulang gambar yang sama tidak menambah referensi
+            again = await client.put("/api/settings/story", json={
+                "title": "Cerita baru", "paragraphs": [], "image": new["image_url"],
+            })
+        return (response.status_code, again.status_code,
+                await _refs(db, old["image_url"]), await _refs(db, new["image_url"]))
+
+    status, again, old_refs, new_refs = asyncio.run(scenario())
+
+    assert (status, again) == (200, 200)
+    assert old_refs == 0
+    # put_file's own reference plus the one settings now holds
+    assert new_refs == 2
+
+
+def test_story_image_whose_blob_is_gone_is_rejected(db, store, make_client, monkeypatch):
+    monkeypatch.setattr(blob_store, "BLOB_GC_GRACE_SECONDS", 0)
+
+    async def scenario():
+        gone = await blob_store.put_file(db, _png(store / "a.png", "red"))
+        await blob_store.release(db, gone["image_url"])
+        await asyncio.sleep(0.01)
+        await blob_store.collect_garbage(db)
+        async with make_client(settings_router.router, overrides={require_admin: lambda: {"role": "admin"}}) as client:
+            response = await client.put("/api/settings/story", json={
+                "title": "Cerita", "paragraphs": [], "image": gone["image_url"],
+            })
+        stored = await db[settings_router.COLLECTION_NAME].find_one({})
+        return response.status_code, stored, await _refs(db, gone["image_url"])
+
+    status, stored, refs = asyncio.run(scenario())
+
+    assert status == 409
+    # Nothing was written and no reference was created for the missing blob
+    assert stored is None
+    assert refs is None
+
+
+def test_put_racing_gc_waits_and_restores_the_file(db, store, monkeypatch):
+    # Default grace period: the in-flight .part file of put() must not be swept
+    remove_files = blob_store._remove_files
+
+    def slow_remove(doc):
+        remove_files(doc)
+        # Jendela antara tanda deleting dan delete_one, tempat put() bisa menyelip
+        time.sleep(0.3)
+
+    monkeypatch.setattr(blob_store, "_remove_files", slow_remove)
+
+    async def scenario():
+        first = await blob_store.put_file(db, _png(store / "a.png", "red"))
+        url = first["image_url"]
+        await blob_store.release(db, url)
+        await _expire(db, url)
+        gc = asyncio.create_task(blob_store.collect_garbage(db))
+        while not await db[blob_store.COLLECTION_NAME].find_one({"_id": blob_store.blob_id(url), "deleting": True}):
+            await asyncio.sleep(0.01)
+        # A blob being deleted can't be retained, only uploaded again
+        retained = await blob_store.retain(db, url)
+        again = await blob_store.put_file(db, _png(store / "b.png", "red"))
+        removed = await gc
+        doc = await db[blob_store.COLLECTION_NAME].find_one({"_id": blob_store.blob_id(url)})
+        return url, retained, again, removed, doc
+
+    url, retained, again, removed, doc = asyncio.run(scenario())
+
+    assert retained is False
+    assert removed == 1
+    assert again["image_url"] == url
+    assert doc["refs"] == 1
+    assert "deleting" not in doc
+    # put() stored the file again after GC removed it
+    assert images.path_for(url).exists()
@@ -0,0 +1,124 @@
+"""
+EmailDispatcher against a local SMTP sink (aiosmtpd): session reuse, retry
+with backoff, and a bounded queue that rejects instead of blocking.
+"""
+from email.message import EmailMessage
+from pathlib import Path
+import asyncio
+import socket
+import sys
+import time
+
+import pytest
+from aiosmtpd.controller import Controller
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import email_dispatcher  # noqa: E402
+from email_dispatcher import EmailDispatcher  # noqa: E402
+
+
+class SinkHandler:
+    """Records delivered messages and the SMTP session (= connection) they arrived on."""
+
+    def __init__(self, fail_first: int = 0):
+        self.fail_first = fail_first
+        self.attempts = 0
+        self.sessions = []
+        self.recipients = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.attempts += 1
+        if self.attempts <= self.fail_first:
+            return "451 Temporary failure, try again"
+        self.sessions.append(id(session))
+        self.recipients.extend(envelope.rcpt_tos)
+        return "250 OK"
+
+
+def _free_port() -> int:
+    # Controller.start() connects to its own port to check it is up, so port 0 doesn't work
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def sink(monkeypatch):
+    handler = SinkHandler()
+    port = _free_port()
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    monkeypatch.setattr(email_dispatcher, "SMTP_HOST", "127.0.0.1")
+    monkeypatch.setattr(email_dispatcher, "SMTP_PORT", port)
+    monkeypatch.setattr(email_dispatcher, "SMTP_STARTTLS", False)
+    monkeypatch.setattr(email_dispatcher, "SMTP_USE_AUTH", False)
+    monkeypatch.setattr(email_dispatcher, "SMTP_TIMEOUT", 5.0)
+    monkeypatch.setattr(email_dispatcher, "EMAIL_RETRY_BACKOFF", 0.05)
+    yield handler
+    controller.stop()
+
+
+def _message(to: str) -> EmailMessage:
+    msg = EmailMessage()
+    msg["From"] = "noreply@loreomah.test"
+    msg["To"] = to
+    msg["Subject"] = "Test"
+    msg.set_content("Halo")
+    return msg
+
+
+async def _send_all(dispatcher: EmailDispatcher, recipients: list) -> list:
+    results = [dispatcher.enqueue(_message(to)) for to in recipients]
+    await dispatcher.stop(timeout=10)
+    return results
+
+
+def test_reuses_one_session_per_worker(sink):
+    dispatcher = EmailDispatcher(workers=1, queue_size=10)
+    recipients = [f"guest{i}@loreomah.test" for i in range(5)]
+
+    assert asyncio.run(_send_all(dispatcher, recipients)) == [True] * 5
+
+    assert sink.recipients == recipients
+    assert len(set(sink.sessions)) == 1
+    assert dispatcher.stats()["sent"] == 5
+
+
+def test_retries_with_backoff(sink):
+    sink.fail_first = 2
+    dispatcher = EmailDispatcher(workers=1, queue_size=10)
+
+    started = time.monotonic()
+    asyncio.run(_send_all(dispatcher, ["guest@loreomah.test"]))
+    elapsed = time.monotonic() - started
+
+    assert sink.recipients == ["guest@loreomah.test"]
+    assert dispatcher.retries == 2
+    assert dispatcher.sent == 1
+    assert dispatcher.failed == 0
+    # Backoff 0.05s lalu 0.1s (eksponensial)
+    assert elapsed >= 0.15
+
+
+def test_gives_up_after_max_retries(sink, monkeypatch):
+    monkeypatch.setattr(email_dispatcher, "EMAIL_MAX_RETRIES", 1)
+    sink.fail_first = 5
+    dispatcher = EmailDispatcher(workers=1, queue_size=10)
+
+    asyncio.run(_send_all(dispatcher, ["guest@loreomah.test"]))
+
+    assert sink.attempts == 2
+    assert dispatcher.failed == 1
+    assert dispatcher.sent == 0
+
+
+def test_enqueue_returns_false_when_queue_full(sink):
+    dispatcher = EmailDispatcher(workers=1, queue_size=2)
+
+    # Workers only run once we await, so the third email finds the queue full
+    results = asyncio.run(_send_all(dispatcher, ["a@loreomah.test", "b@loreomah.test", "c@loreomah.test"]))
+
+    assert results == [True, True, False]
+    assert dispatcher.dropped == 1
+    assert sink.recipients == ["a@loreomah.test", "b@loreomah.test"]
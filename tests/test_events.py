@@ -0,0 +1,121 @@
+"""
+EventHub change stream recovery: a lost resume token reopens the stream and
+asks clients to resync; other failures are retried instead of stopping the hub.
+"""
+import asyncio
+
+from pymongo.errors import OperationFailure
+
+import events
+from events import EventHub
+
+
+class FakeStream:
+    def __init__(self, changes):
+        self.changes = changes
+        self.resume_token = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.changes:
+            # Stream stays open with nothing new
+            await asyncio.Event().wait()
+        change = self.changes.pop(0)
+        self.resume_token = {"_data": change["documentKey"]["_id"]}
+        return change
+
+
+class FakeDB:
+    """db.watch() raises the queued errors first, then streams `changes`."""
+
+    def __init__(self, errors, changes):
+        self.errors = list(errors)
+        self.changes = changes
+        self.resume_after = []
+
+    def watch(self, pipeline, full_document=None, resume_after=None):
+        self.resume_after.append(resume_after)
+        if self.errors:
+            raise self.errors.pop(0)
+        return FakeStream(self.changes)
+
+
+def _change(object_id: str, email: str) -> dict:
+    return {
+        "operationType": "insert",
+        "ns": {"coll": "reservations"},
+        "documentKey": {"_id": object_id},
+        "fullDocument": {"id": object_id, "user_email": email, "status": "pending"},
+    }
+
+
+POLL = 0.01
+
+
+async def _run_hub(hub, db, until):
+    hub.start(db)
+    try:
+        for _ in range(200):
+            if until():
+                return
+            await asyncio.sleep(POLL)
+        raise AssertionError("hub did not reach the expected state")
+    finally:
+        await hub.stop()
+
+
+def test_history_lost_drops_token_and_asks_clients_to_resync():
+    async def scenario():
+        hub = EventHub()
+        hub._resume_token = {"_data": "old"}
+        sub, _, _ = hub.subscribe("admin@loreomah.test", is_admin=True)
+        epoch = hub.epoch
+        db = FakeDB([OperationFailure("history lost", code=286)], [_change("r1", "guest@loreomah.test")])
+        await _run_hub(hub, db, lambda: hub.published == 1)
+        return hub, sub, db, epoch
+
+    hub, sub, db, epoch = asyncio.run(scenario())
+
+    assert db.resume_after == [{"_data": "old"}, None]
+    assert sub.queue.get_nowait() == (None, None)
+    assert sub.resync_reason == "history_lost"
+    _, event = sub.queue.get_nowait()
+    assert event["id"] == "r1"
+    # Last-Event-ID from before the gap can't be replayed any more
+    assert hub.epoch != epoch
+
+
+def test_other_failures_are_retried_with_backoff(monkeypatch):
+    monkeypatch.setattr(events, "EVENTS_RETRY_MAX_SECONDS", 0.05)
+    sleeps = []
+    real_sleep = asyncio.sleep
+
+    async def fast_sleep(delay):
+        if delay != POLL:
+            sleeps.append(delay)
+        await real_sleep(0)
+
+    async def scenario():
+        hub = EventHub()
+        db = FakeDB(
+            [OperationFailure("not primary", code=10107), OperationFailure("interrupted", code=11601)],
+            [_change("r1", "guest@loreomah.test")],
+        )
+        monkeypatch.setattr(events.asyncio, "sleep", fast_sleep)
+        await _run_hub(hub, db, lambda: hub.published == 1)
+        return hub
+
+    hub = asyncio.run(scenario())
+
+    assert hub.restarts == 2
+    assert hub.mode == "stopped"
+    # Second delay doubled, then capped at EVENTS_RETRY_MAX_SECONDS
+    assert sleeps == [1.0, 0.05]
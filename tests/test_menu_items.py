@@ -0,0 +1,62 @@
+"""
+Menu item lookup per category when two legacy category names clash on the
+same slug (backfill gives the second one a suffix, e.g. coffee-2).
+"""
+import asyncio
+
+from routers import menu_item_router
+from slugs import backfill_category_slugs, backfill_slugs
+
+
+async def _seed_clashing_categories(db):
+    await db["menu_categories"].insert_many([
+        {"id": "c1", "name": "Coffee"},
+        {"id": "c2", "name": "coffee"},
+    ])
+    await db["menu_items"].insert_many([
+        {"id": "i1", "name": "Espresso", "category": "Coffee"},
+        {"id": "i2", "name": "Kopi Susu", "category": "coffee"},
+        {"id": "i3", "name": "Es Kopi", "category": "coffee"},
+    ])
+    await backfill_slugs(db["menu_categories"], "name", "slug", unique=True)
+    await backfill_category_slugs(db["menu_items"], db["menu_categories"])
+
+
+async def _names(client, category: str) -> list:
+    response = await client.get(f"/api/menu-items/{category}/")
+    assert response.status_code == 200
+    return sorted(item["name"] for item in response.json())
+
+
+def test_backfill_suffixes_clashing_category_and_its_items(db):
+    async def scenario():
+        await _seed_clashing_categories(db)
+        slugs = {doc["name"]: doc["slug"] async for doc in db["menu_categories"].find({})}
+        items = {doc["id"]: doc["category_slug"] async for doc in db["menu_items"].find({})}
+        return slugs, items
+
+    slugs, items = asyncio.run(scenario())
+
+    assert slugs == {"Coffee": "coffee", "coffee": "coffee-2"}
+    assert items == {"i1": "coffee", "i2": "coffee-2", "i3": "coffee-2"}
+
+
+def test_items_of_suffixed_category_are_found_by_slug_and_name(db, make_client):
+    async def scenario():
+        await _seed_clashing_categories(db)
+        async with make_client(menu_item_router.router) as client:
+            return (
+                await _names(client, "coffee-2"),
+                await _names(client, "coffee"),
+                await _names(client, "Coffee"),
+                await _names(client, "COFFEE"),
+            )
+
+    by_suffixed_slug, by_suffixed_name, by_name, by_other_spelling = asyncio.run(scenario())
+
+    assert by_suffixed_slug == ["Es Kopi", "Kopi Susu"]
+    # "coffee" is also the slug of "Coffee"; the exact name wins
+    assert by_suffixed_name == ["Es Kopi", "Kopi Susu"]
+    assert by_name == ["Espresso"]
+    # No exact name or stored slug: falls back to slugify()
+    assert by_other_spelling == ["Espresso"]
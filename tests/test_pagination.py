@@ -0,0 +1,55 @@
+"""
+Cursor tokens come from the client: decode_cursor only accepts plain sort
+values, so a crafted cursor can't smuggle query operators into keyset_filter.
+"""
+from datetime import datetime
+import base64
+
+import pytest
+from bson import ObjectId, json_util
+from fastapi import HTTPException
+
+from pagination import decode_cursor, encode_cursor, keyset_filter
+
+FIELDS = ["created_at", "id"]
+
+
+def _token(values) -> str:
+    return base64.urlsafe_b64encode(json_util.dumps(values).encode()).decode().rstrip("=")
+
+
+@pytest.mark.parametrize("values", [
+    [datetime(2030, 1, 7, 10, 0), "r1"],
+    [3, 1.5],
+    [ObjectId(), "r2"],
+])
+def test_cursor_round_trips_sort_values(values):
+    doc = dict(zip(FIELDS, values))
+    assert decode_cursor(encode_cursor(doc, FIELDS), FIELDS) == values
+
+
+@pytest.mark.parametrize("values", [
+    [{"$gt": ""}, "r1"],
+    [datetime(2030, 1, 7), {"$ne": None}],
+    [["a"], "r1"],
+    [None, "r1"],
+    ["r1"],
+])
+def test_cursor_with_non_scalar_values_is_rejected(values):
+    with pytest.raises(HTTPException) as raised:
+        decode_cursor(_token(values), FIELDS)
+    assert raised.value.status_code == 400
+
+
+def test_garbage_cursor_is_rejected():
+    with pytest.raises(HTTPException) as raised:
+        decode_cursor("not-base64-json", FIELDS)
+    assert raised.value.status_code == 400
+
+
+def test_keyset_filter_for_descending_order():
+    when = datetime(2030, 1, 7)
+    assert keyset_filter(FIELDS, [when, "r1"]) == {"$or": [
+        {"created_at": {"$lt": when}},
+        {"created_at": when, "id": {"$lt": "r1"}},
+    ]}
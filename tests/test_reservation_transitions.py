@@ -0,0 +1,135 @@
+"""
+Reservation status state machine (ALLOWED_TRANSITIONS): allowed moves apply
+once and bump the version, everything else is a 409, and when nothing matched
+the slow path tells 404 / 403 / version conflict apart.
+"""
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+import availability
+from auth import get_user_from_token, require_admin
+from routers import reservation_router
+from routers.reservation_router import ALLOWED_TRANSITIONS, transition_reservation
+
+OWNER = "guest@loreomah.test"
+SLOT = "2030-01-07T10:00"
+STATUSES = ("pending", "confirmed", "declined", "cancelled")
+
+
+async def _seed(db, status: str = "pending", version: int | None = 0, **extra) -> dict:
+    doc = {"id": "r1", "user_email": OWNER, "status": status, "guests": 2, **extra}
+    if version is not None:
+        doc["version"] = version
+    await db[reservation_router.COLLECTION_NAME].insert_one(doc)
+    return doc
+
+
+async def _stored(db) -> dict:
+    return await db[reservation_router.COLLECTION_NAME].find_one({"id": "r1"}, {"_id": 0})
+
+
+async def _status_code(call) -> int:
+    try:
+        await call
+    except HTTPException as e:
+        return e.status_code
+    return 200
+
+
+@pytest.mark.parametrize("source,target", [
+    (source, target) for source in STATUSES for target in STATUSES if source != target
+])
+def test_transition_matrix(db, source, target):
+    async def scenario():
+        await _seed(db, source)
+        code = await _status_code(transition_reservation(db, "r1", target))
+        return code, await _stored(db)
+
+    code, stored = asyncio.run(scenario())
+
+    if target in ALLOWED_TRANSITIONS.get(source, ()):
+        assert code == 200
+        assert (stored["status"], stored["version"]) == (target, 1)
+    else:
+        assert code == 409
+        assert (stored["status"], stored["version"]) == (source, 0)
+
+
+def test_repeated_transition_is_returned_unchanged(db):
+    async def scenario():
+        await _seed(db, "pending")
+        first = await transition_reservation(db, "r1", "confirmed")
+        again = await transition_reservation(db, "r1", "confirmed")
+        return first, again
+
+    (first, changed), (again, changed_again) = asyncio.run(scenario())
+
+    assert (changed, changed_again) == (True, False)
+    assert first["version"] == again["version"] == 1
+
+
+def test_expected_version_mismatch_is_a_conflict(db):
+    async def scenario():
+        await _seed(db, "pending", version=3)
+        stale = await _status_code(transition_reservation(db, "r1", "confirmed", expected_version=2))
+        unchanged = await _stored(db)
+        current = await _status_code(transition_reservation(db, "r1", "confirmed", expected_version=3))
+        return stale, unchanged, current, await _stored(db)
+
+    stale, unchanged, current, stored = asyncio.run(scenario())
+
+    assert stale == 409
+    assert (unchanged["status"], unchanged["version"]) == ("pending", 3)
+    assert current == 200
+    assert (stored["status"], stored["version"]) == ("confirmed", 4)
+
+
+def test_documents_without_version_match_expected_version_zero(db):
+    async def scenario():
+        await _seed(db, "pending", version=None)
+        code = await _status_code(transition_reservation(db, "r1", "declined", expected_version=0))
+        return code, await _stored(db)
+
+    code, stored = asyncio.run(scenario())
+
+    assert code == 200
+    assert (stored["status"], stored["version"]) == ("declined", 1)
+
+
+def test_declining_releases_the_held_seats(db):
+    async def scenario():
+        await availability.reserve_seats(db, SLOT, 2)
+        await _seed(db, "pending", slot=SLOT)
+        await transition_reservation(db, "r1", "declined")
+        doc = await db[availability.SLOTS_COLLECTION].find_one({"_id": SLOT})
+        return doc["booked"]
+
+    assert asyncio.run(scenario()) == 0
+
+
+@pytest.fixture
+def client(make_client):
+    return make_client(reservation_router.router, overrides={
+        require_admin: lambda: {"email": "admin@loreomah.test", "role": "admin"},
+        get_user_from_token: lambda: {"email": "other@loreomah.test", "role": "user"},
+    })
+
+
+def test_endpoints_report_not_found_forbidden_and_conflicts(db, client):
+    async def scenario():
+        await _seed(db, "confirmed", version=1)
+        async with client:
+            return {
+                "missing": (await client.put("/api/reservations/nope/confirm")).status_code,
+                "not_owner": (await client.put("/api/reservations/r1/cancel")).status_code,
+                "stale": (await client.put("/api/reservations/r1/decline", params={"expected_version": 0})).status_code,
+                "disallowed": (await client.put("/api/reservations/r1/decline")).status_code,
+                "unchanged": (await client.put("/api/reservations/r1/confirm")).status_code,
+            }
+
+    codes = asyncio.run(scenario())
+
+    assert codes == {"missing": 404, "not_owner": 403, "stale": 409, "disallowed": 409, "unchanged": 200}
+    assert asyncio.run(_stored(db))["version"] == 1